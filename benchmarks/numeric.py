@@ -0,0 +1,112 @@
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+import polars as pl
+
+from euro_converter.calculator import ConversionType, NumericMode
+from euro_converter.cache.data import get_scaled_rate
+from euro_converter.calculator.scaled import (
+    get_decimal_result,
+    with_scaled_product,
+    with_scaled_quotient,
+)
+from euro_converter.calculator.utils import DECIMAL_TYPE, get_rounded
+from .suite import get_calculator, get_values
+
+
+def get_rates(days: int, seed: int = 0) -> pl.DataFrame:
+    rng = random.Random(seed)
+    dates = [date(2000, 1, 3) + timedelta(days=day) for day in range(days)]
+    return pl.DataFrame(
+        {
+            "date": dates,
+            "USD": [f"{rng.uniform(0.8, 1.6):.4f}" for _ in dates],
+            "IDR": [f"{rng.uniform(9000, 18000):.2f}" for _ in dates],
+        }
+    ).with_columns(pl.exclude("date").cast(DECIMAL_TYPE))
+
+
+def get_best_time(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_arithmetic(values: pl.DataFrame, decimals: int, repeat: int):
+    # Only the conversion and rounding, without sorting and joining rates.
+    rng = random.Random(2)
+    data = values.with_columns(
+        pl.Series(
+            "rate", [f"{rng.uniform(0.8, 1.6):.4f}" for _ in range(len(values))]
+        ).cast(DECIMAL_TYPE)
+    )
+    scaled = data.select(get_scaled_rate(pl.col("value", "rate")).name.keep())
+    for name, expression, with_scaled_result in [
+        ("to", pl.col("value") * pl.col("rate"), with_scaled_product),
+        ("from", pl.col("value") / pl.col("rate"), with_scaled_quotient),
+    ]:
+        decimal_time = get_best_time(
+            lambda: data.select(get_rounded(expression, decimals)), repeat
+        )
+        scaled_time = get_best_time(
+            lambda: with_scaled_result(
+                scaled.lazy(), "result", "value", "rate", decimals
+            )
+            .select(get_decimal_result(pl.col("result"), decimals))
+            .collect(),
+            repeat,
+        )
+        print(
+            f"{name:<5} only  decimal {decimal_time * 1000:7.1f} ms  "
+            f"scaled {scaled_time * 1000:7.1f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare Decimal and scaled integer batch conversions."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--decimals", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rates = get_rates(9000)
+    values = get_values(rates, args.rows)
+    calculators = {mode: get_calculator(rates, mode) for mode in NumericMode}
+    print(f"{args.rows} rows, rounded to {args.decimals} decimals")
+    for conversion_type in ConversionType:
+        for currency in ["USD", "IDR"]:
+            results = [
+                calculator.convert_frame(
+                    conversion_type, currency, values, decimals=args.decimals
+                )
+                for calculator in calculators.values()
+            ]
+            assert results[0].equals(results[1])
+            timings = {
+                mode: get_best_time(
+                    lambda: calculator.convert_frame(
+                        conversion_type, currency, values, decimals=args.decimals
+                    ),
+                    args.repeat,
+                )
+                for mode, calculator in calculators.items()
+            }
+            print(
+                f"{conversion_type.value:<5} {currency}  "
+                + "  ".join(
+                    f"{mode.value} {timing * 1000:7.1f} ms"
+                    for mode, timing in timings.items()
+                )
+            )
+    run_arithmetic(values, args.decimals, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import random
+import string
+import time
+from datetime import date, timedelta
+from io import BytesIO
+from typing import Callable
+
+from euro_converter.calculator.utils import get_parsed_rates_df
+from euro_converter.ecb.parser import parse_xml, parse_xml_df
+
+XML_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<gesmes:Envelope xmlns:gesmes="http://www.gesmes.org/xml/2002-08-01"'
+    ' xmlns="http://www.ecb.int/vocabulary/2002-08-01/eurofxref">'
+    "<gesmes:subject>Reference rates</gesmes:subject><Cube>\n"
+)
+XML_FOOTER = "</Cube></gesmes:Envelope>\n"
+
+
+def get_synthetic_hist(days: int, currencies: int, seed: int = 0) -> bytes:
+    # Similar to eurofxref-hist.xml: newest day first, some currencies discontinued.
+    rng = random.Random(seed)
+    names = sorted(
+        {"".join(rng.choices(string.ascii_uppercase, k=3)) for _ in range(currencies)}
+    )
+    discontinued = {name: rng.randrange(days) for name in names[: len(names) // 4]}
+    rates = {name: rng.uniform(0.1, 20000) for name in names}
+    parts = [XML_HEADER]
+    day = date(2024, 1, 10)
+    for row in range(days):
+        parts.append(f'<Cube time="{day.isoformat()}">')
+        for name in names:
+            if discontinued.get(name, days) > row:
+                rate = rates[name] * rng.uniform(0.99, 1.01)
+                parts.append(f'<Cube currency="{name}" rate="{rate:.5g}"/>')
+        parts.append("</Cube>\n")
+        day -= timedelta(days=1 if day.weekday() else 3)
+    parts.append(XML_FOOTER)
+    return "".join(parts).encode()
+
+
+def parse_dicts(data: bytes):
+    return get_parsed_rates_df(parse_xml(BytesIO(data)))
+
+
+def parse_columns(data: bytes):
+    return get_parsed_rates_df(parse_xml_df(BytesIO(data)))
+
+
+def run(name: str, func: Callable, data: bytes, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{name:<10} best {best * 1000:8.1f} ms of {repeat}")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the ECB XML parsers.")
+    parser.add_argument("--days", type=int, default=6500)
+    parser.add_argument("--currencies", type=int, default=41)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = get_synthetic_hist(args.days, args.currencies)
+    print(f"Synthetic history: {len(data) / 1e6:.1f} MB, {args.days} days")
+    assert parse_dicts(data).equals(parse_columns(data))
+    dicts = run("dicts", parse_dicts, data, args.repeat)
+    columns = run("columns", parse_columns, data, args.repeat)
+    print(f"Speedup: {dicts / columns:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import BytesIO
+from typing import Callable, Optional
+from unittest import mock
+
+import polars as pl
+
+from euro_converter.cache import RatesCache, RatesCacheData
+from euro_converter.cache.data import get_decimal_rate
+from euro_converter.cache.filecache import FileCache
+from euro_converter.cache.mapped import MappedFileCache
+from euro_converter.cache.partitioned import PartitionedFileCache
+from euro_converter.cache.redis import RedisRatesCache
+from euro_converter.calculator import ConversionType, CurrencyCalculator, NumericMode
+from euro_converter.calculator.utils import get_parsed_rates_df
+from euro_converter.ecb.parser import parse_xml, parse_xml_df
+from tests.cache.local_redis import LocalRedis
+from .parser import get_synthetic_hist
+
+SIZES = [1, 1_000, 100_000, 1_000_000, 10_000_000]
+HIST_DAYS = 6500
+INCREMENTAL_DAYS = 64
+CURRENCIES = 41
+SINGLE_LOOKUPS = 1000
+VALUE = Decimal("100.00")
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+class FeedResponse(BytesIO):
+    # Replaces the raw HTTP response returned by `get_data`.
+    status = 200
+
+
+class Suite:
+    def __init__(self, repeat: int):
+        self.repeat = repeat
+        self.results: dict[str, float] = {}
+
+    def time(
+        self,
+        name: str,
+        func: Callable,
+        setup: Optional[Callable] = None,
+        number: int = 1,
+    ) -> float:
+        # Best time of a single call, over `repeat` runs of `number` calls.
+        timings = []
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append((time.perf_counter() - start) / number)
+        best = self.results[name] = min(timings)
+        print(f"{name:<45} {format_time(best):>12}")
+        return best
+
+
+def format_time(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+def get_values(rates: pl.DataFrame, rows: int, seed: int = 1) -> pl.DataFrame:
+    # Random dates of the rates and values with two decimals, generated within polars.
+    dates = rates["date"]
+    positions = pl.int_range(0, rows, dtype=pl.UInt64, eager=True).hash(seed)
+    cents = pl.int_range(0, rows, dtype=pl.UInt64, eager=True).hash(seed + 1)
+    return pl.DataFrame(
+        {
+            "date": dates.gather(positions % len(dates)),
+            "value": (cents % 20_000_000).cast(pl.Int64) - 10_000_000,
+        }
+    ).with_columns(get_decimal_rate(pl.col("value") * 10_000).alias("value"))
+
+
+def get_calculator(
+    rates: pl.DataFrame, numeric_mode: NumericMode = NumericMode.DECIMAL
+) -> CurrencyCalculator:
+    cache = RatesCache()
+    cache.data = RatesCacheData(
+        rates=rates, last_update=datetime.utcnow(), last_timestamps={}
+    )
+    return CurrencyCalculator(
+        cache, refresh_in_background=True, numeric_mode=numeric_mode
+    )
+
+
+def run_parser(suite: Suite, hist: bytes):
+    suite.time("parse/dicts", lambda: get_parsed_rates_df(parse_xml(BytesIO(hist))))
+    suite.time(
+        "parse/columns", lambda: get_parsed_rates_df(parse_xml_df(BytesIO(hist)))
+    )
+
+
+def run_single(suite: Suite, rates: pl.DataFrame):
+    calculator = get_calculator(rates)
+    rng = random.Random(2)
+    dates = rates["date"].to_list()
+    currencies = [column for column in rates.columns if column != "date"]
+    lookups = [
+        (rng.choice(currencies), rng.choice(currencies), rng.choice(dates))
+        for _ in range(SINGLE_LOOKUPS)
+    ]
+    # Lookups are repeated, so that memoized rates are included.
+    lookups = iter(lookups * (suite.repeat + 1))
+
+    def convert():
+        currency, _, currency_date = next(lookups)
+        calculator.convert(ConversionType.TO, currency, currency_date, VALUE)
+
+    def convert_cross():
+        source, target, currency_date = next(lookups)
+        calculator.convert_cross(source, target, currency_date, VALUE)
+
+    suite.time("single/convert", convert, number=SINGLE_LOOKUPS // 2)
+    suite.time("single/convert_cross", convert_cross, number=SINGLE_LOOKUPS // 2)
+
+
+def run_batch(
+    suite: Suite, rates: pl.DataFrame, sizes: list[int], modes: list[NumericMode]
+):
+    currencies = [column for column in rates.columns if column != "date"]
+    source, target = currencies[-2:]
+    for mode in modes:
+        calculator = get_calculator(rates, mode)
+        for size in sizes:
+            values = get_values(rates, size)
+            for conversion_type in ConversionType:
+                suite.time(
+                    f"batch/{mode.value}/{conversion_type.value}/{size}",
+                    lambda: calculator.convert_frame(conversion_type, source, values),
+                )
+            suite.time(
+                f"batch/{mode.value}/cross/{size}",
+                lambda: calculator.convert_frame_cross(source, target, values),
+            )
+
+
+def run_update(suite: Suite, hist: bytes, incremental: bytes):
+    calculator = get_calculator(pl.DataFrame({"date": []}, schema={"date": pl.Date}))
+    feed = hist
+
+    def get_data(update_type, timestamps=None, session=None, url=None):
+        return FeedResponse(feed), None
+
+    with mock.patch("euro_converter.ecb.update.get_data", get_data):
+        calculator.data = None
+        calculator.update()
+        full_data = calculator.data
+
+        def reset_full():
+            calculator.data = None
+
+        def reset_incremental():
+            # Last updated two days ago, so that the 90 day history is requested.
+            calculator.data = replace(
+                full_data, last_update=datetime.utcnow() - timedelta(days=2)
+            )
+
+        suite.time("update/full", calculator.update, setup=reset_full)
+        feed = incremental
+        suite.time("update/incremental", calculator.update, setup=reset_incremental)
+
+
+def run_cache(
+    suite: Suite, name: str, get_cache: Callable[[], RatesCache], data: RatesCacheData
+):
+    incremental = data.rates.tail(INCREMENTAL_DAYS)
+    cache = get_cache()
+
+    def save():
+        cache.data = data
+        cache.save()
+
+    def save_incremental():
+        cache.data = data
+        cache.save(incremental)
+
+    def load():
+        # A new instance, so that nothing is skipped as unchanged.
+        get_cache().load()
+
+    suite.time(f"cache/{name}/save", save)
+    suite.time(f"cache/{name}/load", load)
+    suite.time(f"cache/{name}/save_incremental", save_incremental, setup=save)
+    suite.time(f"cache/{name}/load_incremental", load)
+
+
+def run_caches(suite: Suite, data: RatesCacheData, redis_url: Optional[str]):
+    with tempfile.TemporaryDirectory() as path:
+        file_names = {
+            "data_name": os.path.join(path, "data.parquet"),
+            "timestamps_name": os.path.join(path, "last_timestamps.json"),
+            "lock_name": os.path.join(path, "update.lock"),
+        }
+        run_cache(suite, "file", lambda: FileCache(**file_names), data)
+        file_names["data_name"] = os.path.join(path, "data.arrow")
+        run_cache(suite, "mapped", lambda: MappedFileCache(**file_names), data)
+        file_names["data_name"] = os.path.join(path, "partitions")
+        run_cache(
+            suite, "partitioned", lambda: PartitionedFileCache(**file_names), data
+        )
+
+    def get_redis_cache() -> RedisRatesCache:
+        cache = RedisRatesCache(updates_channel=None)
+        cache.cache = client
+        return cache
+
+    if redis_url:
+        import redis
+
+        client = redis.Redis.from_url(redis_url)
+    else:
+        client = LocalRedis()
+    run_cache(suite, "redis", get_redis_cache, data)
+
+
+def get_baseline_filename(name: str) -> str:
+    return os.path.join(BASELINES_DIR, f"{name}.json")
+
+
+def save_baseline(name: str, args: argparse.Namespace, results: dict[str, float]):
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    baseline = {
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "platform": platform.platform(),
+        "args": {key: value for key, value in vars(args).items() if key != "save"},
+        "results": results,
+    }
+    filename = get_baseline_filename(name)
+    with open(filename, "w") as f:
+        json.dump(baseline, f, indent=2)
+    print(f"Saved baseline {filename}")
+
+
+def compare_baseline(name: str, results: dict[str, float], threshold: float) -> bool:
+    # Returns whether any case is slower than the baseline by more than the threshold.
+    with open(get_baseline_filename(name)) as f:
+        baseline = json.load(f)
+    print(
+        f"\nCompared to {name} ({baseline['created']}, "
+        f"Python {baseline['python']}, polars {baseline['polars']})"
+    )
+    regressed = False
+    for case, current in results.items():
+        previous = baseline["results"].get(case)
+        if previous is None:
+            continue
+        ratio = current / previous
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressed = True
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(
+            f"{case:<45} {format_time(previous):>12} {format_time(current):>12}"
+            f" {ratio:6.2f}x{flag}"
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the calculator, parser and cache backends."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=SIZES, help="Batch sizes in rows."
+    )
+    parser.add_argument(
+        "--max-rows", type=int, help="Skip batch sizes above this number of rows."
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--numeric-modes",
+        nargs="+",
+        choices=[mode.value for mode in NumericMode],
+        default=[NumericMode.DECIMAL.value],
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=["parser", "single", "batch", "update", "cache"],
+        help="Run only these groups of cases.",
+    )
+    parser.add_argument(
+        "--redis-url", help="Use a Redis server instead of the local stand-in."
+    )
+    parser.add_argument("--save", metavar="NAME", help="Store the results as baseline.")
+    parser.add_argument("--compare", metavar="NAME", help="Compare with a baseline.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative slowdown reported as regression.",
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit with status 1 if a case regressed.",
+    )
+    args = parser.parse_args()
+
+    groups = set(args.only or ["parser", "single", "batch", "update", "cache"])
+    sizes = [size for size in args.sizes if not args.max_rows or size <= args.max_rows]
+    suite = Suite(args.repeat)
+    hist = get_synthetic_hist(HIST_DAYS, CURRENCIES)
+    incremental = get_synthetic_hist(INCREMENTAL_DAYS, CURRENCIES)
+    rates = get_parsed_rates_df(parse_xml_df(BytesIO(hist)))
+    print(
+        f"Synthetic history: {len(hist) / 1e6:.1f} MB, {len(rates)} days, "
+        f"{len(rates.columns) - 1} currencies"
+    )
+
+    if "parser" in groups:
+        run_parser(suite, hist)
+    if "single" in groups:
+        run_single(suite, rates)
+    if "batch" in groups:
+        modes = [NumericMode(mode) for mode in args.numeric_modes]
+        run_batch(suite, rates, sizes, modes)
+    if "update" in groups:
+        run_update(suite, hist, incremental)
+    if "cache" in groups:
+        data = RatesCacheData(
+            rates=rates, last_update=datetime.utcnow(), last_timestamps={}
+        )
+        run_caches(suite, data, args.redis_url)
+
+    if args.save:
+        save_baseline(args.save, args, suite.results)
+    if args.compare:
+        regressed = compare_baseline(args.compare, suite.results, args.threshold)
+        if regressed and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
 from datetime import datetime
-from typing import Optional
+from typing import AsyncIterator, Callable, ContextManager, Optional
 
 import polars as pl
 
@@ -9,12 +11,49 @@ from ..ecb import UpdateTimestamps
 
 class RatesCache:
     def __init__(self):
-        self.data: Optional[RatesCacheData] = None
+        self._data: Optional[RatesCacheData] = None
+        # Changes whenever the data is replaced, so that derived lookups can be invalidated.
+        self.generation = 0
+
+    @property
+    def data(self) -> Optional[RatesCacheData]:
+        return self._data
+
+    @data.setter
+    def data(self, value: Optional[RatesCacheData]):
+        self._data = value
+        self.generation += 1
 
     def load(self) -> None:
         pass
 
-    def save(self) -> None:
+    def save(self, updated: Optional[pl.DataFrame] = None) -> None:
+        pass
+
+    def update_lock(self) -> ContextManager:
+        return nullcontext()
+
+    # Async variants for the event loop. Unless a backend has an async client, the blocking
+    # implementations run in a thread.
+    async def load_async(self) -> None:
+        await asyncio.to_thread(self.load)
+
+    async def save_async(self, updated: Optional[pl.DataFrame] = None) -> None:
+        await asyncio.to_thread(self.save, updated)
+
+    @asynccontextmanager
+    async def update_lock_async(self) -> AsyncIterator[None]:
+        lock = self.update_lock()
+        await asyncio.to_thread(lock.__enter__)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(lock.__exit__, None, None, None)
+
+    async def listen(self, on_update: Optional[Callable[[], None]] = None) -> None:
+        pass
+
+    def compact(self) -> None:
         pass
 
 
@@ -33,32 +72,42 @@ class StoredRatesCache(RatesCache):
     ) -> None:
         raise NotImplementedError()
 
+    @staticmethod
+    def get_cache_data(
+        data: pl.DataFrame, timestamp_dict: dict[str, str | dict[str, dict[str, str]]]
+    ) -> RatesCacheData:
+        return RatesCacheData(
+            rates=data,
+            last_update=datetime.fromisoformat(timestamp_dict["last_update"]),
+            last_timestamps={
+                key: UpdateTimestamps(**values)
+                for key, values in timestamp_dict["last_headers"].items()
+            },
+        )
+
     def load(self) -> None:
         data = self.load_data()
         timestamp_dict = self.load_timestamps()
         if data is not None and timestamp_dict:
-            self.data = RatesCacheData(
-                rates=data,
-                last_update=datetime.fromisoformat(timestamp_dict["last_update"]),
-                last_timestamps={
-                    key: UpdateTimestamps(**values)
-                    for key, values in timestamp_dict["last_headers"].items()
-                },
-            )
-
-    def save(self) -> None:
+            self.data = self.get_cache_data(data, timestamp_dict)
+
+    @staticmethod
+    def get_timestamp_dict(
+        data: RatesCacheData,
+    ) -> dict[str, str | dict[str, dict[str, str]]]:
+        return {
+            "last_update": data.last_update.isoformat(),
+            "last_headers": {
+                key: {
+                    attr: getattr(timestamps, attr)
+                    for attr in ["modified_since", "etag"]
+                    if getattr(timestamps, attr)
+                }
+                for key, timestamps in data.last_timestamps.items()
+            },
+        }
+
+    def save(self, updated: Optional[pl.DataFrame] = None) -> None:
         data = self.data
         self.save_data(data.rates)
-        self.save_timestamps(
-            {
-                "last_update": data.last_update.isoformat(),
-                "last_headers": {
-                    key: {
-                        attr: getattr(timestamps, attr)
-                        for attr in ["modified_since", "etag"]
-                        if getattr(timestamps, attr)
-                    }
-                    for key, timestamps in data.last_timestamps.items()
-                },
-            },
-        )
+        self.save_timestamps(self.get_timestamp_dict(data))
@@ -5,9 +5,55 @@ import polars as pl
 
 from ..ecb import UpdateTimestamps
 
+# Without this, polars reads Decimal columns from Parquet and Arrow data as Float64.
+pl.Config.activate_decimals(True)
+
+DECIMAL_TYPE = pl.Decimal(12, 6)
+# Rates can also be held as integers scaled by 10^6, e.g. where Decimal columns are not supported.
+SCALED_RATE_TYPE = pl.Int64
+_SCALE_FACTOR = pl.lit(str(10**DECIMAL_TYPE.scale)).cast(pl.Decimal(None, 0))
+
 
 @dataclass
 class RatesCacheData:
     rates: pl.DataFrame
     last_update: datetime
     last_timestamps: dict[str, UpdateTimestamps]
+
+
+def get_scaled_rate(rate: pl.Expr) -> pl.Expr:
+    return (rate * _SCALE_FACTOR).cast(SCALED_RATE_TYPE)
+
+
+def get_decimal_rate(scaled_rate: pl.Expr) -> pl.Expr:
+    return (
+        scaled_rate.cast(pl.Decimal(None, DECIMAL_TYPE.scale)) / _SCALE_FACTOR
+    ).cast(DECIMAL_TYPE)
+
+
+def get_rate_column(rates: pl.DataFrame, currency: str) -> pl.Expr:
+    if rates.schema[currency] == SCALED_RATE_TYPE:
+        return get_decimal_rate(pl.col(currency))
+    return pl.col(currency)
+
+
+def get_scaled_rate_column(rates: pl.DataFrame, currency: str) -> pl.Expr:
+    if rates.schema[currency] == SCALED_RATE_TYPE:
+        return pl.col(currency)
+    return get_scaled_rate(pl.col(currency))
+
+
+def get_scaled_rates(rates: pl.DataFrame) -> pl.DataFrame:
+    return rates.with_columns(
+        get_scaled_rate(pl.col(col_name))
+        for col_name, dtype in rates.schema.items()
+        if isinstance(dtype, pl.Decimal)
+    )
+
+
+def get_decimal_rates(rates: pl.DataFrame) -> pl.DataFrame:
+    return rates.with_columns(
+        get_decimal_rate(pl.col(col_name))
+        for col_name, dtype in rates.schema.items()
+        if dtype == SCALED_RATE_TYPE
+    )
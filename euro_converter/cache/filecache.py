@@ -1,25 +1,96 @@
+import fcntl
 import json
+import logging
 import os
-from typing import Optional
+import time
+from contextlib import contextmanager, suppress
+from typing import Iterator, Optional
 
 import polars as pl
 
+from .. import metrics
 from .base import StoredRatesCache
 
+log = logging.getLogger(__name__)
+
+MAX_LOAD_ATTEMPTS = 4
+# Doubled after every attempt.
+LOAD_RETRY_DELAY = 0.05
+
+
+@contextmanager
+def replace_file(filename: str) -> Iterator[str]:
+    # Readers either see the previous or the new file, never a partially written one.
+    temp_filename = f"{filename}.{os.getpid()}.tmp"
+    try:
+        yield temp_filename
+        os.replace(temp_filename, filename)
+    finally:
+        with suppress(FileNotFoundError):
+            os.remove(temp_filename)
+
+
+def wait_for_retry(attempt: int) -> None:
+    # Gives a process that is saving time to finish writing all files.
+    if attempt:
+        time.sleep(LOAD_RETRY_DELAY * 2 ** (attempt - 1))
+
+
+def get_file_state(filename: str) -> Optional[list[int]]:
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return [stat.st_ino, stat.st_mtime_ns, stat.st_size]
+
 
 class FileCache(StoredRatesCache):
     def __init__(
         self,
         data_name: str = "data.parquet",
         timestamps_name: str = "last_timestamps.json",
+        lock_name: str = "update.lock",
     ):
         super().__init__()
         self.data_filename = data_name
         self.timestamps_filename = timestamps_name
+        self.lock_filename = lock_name
+        self.loaded_state: Optional[list[int]] = None
+
+    def load(self) -> None:
+        for attempt in range(MAX_LOAD_ATTEMPTS):
+            wait_for_retry(attempt)
+            state = get_file_state(self.data_filename)
+            if state is None:
+                return
+            if state == self.loaded_state and self.data is not None:
+                return
+            timestamp_dict = self.load_timestamps()
+            # The timestamps file names the data file it was written with. If another process
+            # is saving at the same time, they may not match yet.
+            data_state = timestamp_dict.get("data_state") if timestamp_dict else None
+            if data_state is not None and data_state != state:
+                continue
+            data = self.load_data()
+            if get_file_state(self.data_filename) != state:
+                continue
+            if data is not None and timestamp_dict:
+                self.data = self.get_cache_data(data, timestamp_dict)
+                self.loaded_state = state
+            return
+        log.warning("Cache files were changed while loading, keeping previous data.")
+
+    def save(self, updated: Optional[pl.DataFrame] = None) -> None:
+        super().save(updated)
+        self.loaded_state = get_file_state(self.data_filename)
 
     def load_data(self) -> Optional[pl.DataFrame]:
         if os.path.isfile(self.data_filename):
-            return pl.read_parquet(self.data_filename)
+            data = pl.read_parquet(self.data_filename)
+            metrics.observe_cache_bytes(
+                type(self).__name__, "load", os.path.getsize(self.data_filename)
+            )
+            return data
         else:
             return None
 
@@ -31,10 +102,26 @@ class FileCache(StoredRatesCache):
             return None
 
     def save_data(self, data: pl.DataFrame) -> None:
-        data.write_parquet(self.data_filename)
+        with replace_file(self.data_filename) as temp_filename:
+            data.write_parquet(temp_filename)
+            metrics.observe_cache_bytes(
+                type(self).__name__, "save", os.path.getsize(temp_filename)
+            )
 
     def save_timestamps(
         self, timestamps: dict[str, str | dict[str, dict[str, str]]]
     ) -> None:
-        with open(self.timestamps_filename, "w") as cf:
-            json.dump(timestamps, cf)
+        # Data is saved first, so this refers to the file just written.
+        timestamps = {**timestamps, "data_state": get_file_state(self.data_filename)}
+        with replace_file(self.timestamps_filename) as temp_filename:
+            with open(temp_filename, "w") as cf:
+                json.dump(timestamps, cf)
+
+    @contextmanager
+    def update_lock(self) -> Iterator[None]:
+        with open(self.lock_filename, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,50 @@
+import os
+from typing import Optional
+
+import polars as pl
+
+from .. import metrics
+from .data import get_scaled_rates
+from .filecache import FileCache, replace_file
+
+
+class MappedFileCache(FileCache):
+    def __init__(
+        self,
+        data_name: str = "data.arrow",
+        timestamps_name: str = "last_timestamps.json",
+        lock_name: str = "update.lock",
+    ):
+        super().__init__(
+            data_name=data_name, timestamps_name=timestamps_name, lock_name=lock_name
+        )
+
+    def save(self, updated: Optional[pl.DataFrame] = None) -> None:
+        super().save(updated)
+        # The saving process reads the mapped file as well, instead of keeping its own copy of
+        # the rates.
+        self.loaded_state = None
+        self.load()
+
+    def load_data(self) -> Optional[pl.DataFrame]:
+        if os.path.isfile(self.data_filename):
+            # Uncompressed IPC files are mapped without copying, so all processes on a host
+            # share the same pages. Decimal columns cannot be mapped, therefore rates are stored
+            # as scaled integers.
+            data = pl.read_ipc(self.data_filename, memory_map=True, rechunk=False)
+            metrics.observe_cache_bytes(
+                type(self).__name__, "load", os.path.getsize(self.data_filename)
+            )
+            return data
+        else:
+            return None
+
+    def save_data(self, data: pl.DataFrame) -> None:
+        # Processes that still have the previous file mapped keep reading it until they reload.
+        with replace_file(self.data_filename) as temp_filename:
+            get_scaled_rates(data).rechunk().write_ipc(
+                temp_filename, compression="uncompressed"
+            )
+            metrics.observe_cache_bytes(
+                type(self).__name__, "save", os.path.getsize(temp_filename)
+            )
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+from contextlib import suppress
+from typing import Iterable, Optional
+
+import polars as pl
+
+from .. import metrics
+from .filecache import (
+    FileCache,
+    MAX_LOAD_ATTEMPTS,
+    get_file_state,
+    replace_file,
+    wait_for_retry,
+)
+
+log = logging.getLogger(__name__)
+
+
+class PartitionedFileCache(FileCache):
+    def __init__(
+        self,
+        data_name: str = "data",
+        timestamps_name: str = "last_timestamps.json",
+        lock_name: str = "update.lock",
+        compact_after: int | str = 30,
+    ):
+        super().__init__(
+            data_name=data_name, timestamps_name=timestamps_name, lock_name=lock_name
+        )
+        # Number of log files after which they are merged into the yearly segments.
+        self.compact_after = int(compact_after)
+        self.partitions: Optional[dict] = None
+
+    def _get_path(self, filename: str) -> str:
+        return os.path.join(self.data_filename, filename)
+
+    def _get_size(self, filenames: Iterable[str]) -> int:
+        return sum(os.path.getsize(self._get_path(filename)) for filename in filenames)
+
+    def _read_partitions(self, partitions: dict) -> pl.DataFrame:
+        segments = [
+            pl.read_parquet(self._get_path(filename))
+            for _, filename in sorted(partitions["segments"].items())
+        ]
+        rates = pl.concat(segments)
+        for filename in partitions["log"]:
+            updated = pl.read_parquet(self._get_path(filename))
+            rates = rates.update(updated, on="date", how="outer")
+        return rates.sort("date")
+
+    def _write_segments(
+        self,
+        rates: pl.DataFrame,
+        generation: int,
+        years: Optional[Iterable[int]] = None,
+    ) -> dict[str, str]:
+        by_year = rates.with_columns(pl.col("date").dt.year().alias("year"))
+        if years is not None:
+            by_year = by_year.filter(pl.col("year").is_in(list(years)))
+        segments = {}
+        for (year,), segment in by_year.partition_by(["year"], as_dict=True).items():
+            filename = f"{year}.{generation}.parquet"
+            segment.drop("year").write_parquet(self._get_path(filename))
+            segments[str(year)] = filename
+        return segments
+
+    def _remove_files(self, filenames: Iterable[str]) -> None:
+        # Other processes may still be reading these; they retry with the new partitions.
+        for filename in filenames:
+            with suppress(FileNotFoundError):
+                os.remove(self._get_path(filename))
+
+    def load(self) -> None:
+        for attempt in range(MAX_LOAD_ATTEMPTS):
+            wait_for_retry(attempt)
+            state = get_file_state(self.timestamps_filename)
+            if state is None:
+                return
+            if state == self.loaded_state and self.data is not None:
+                return
+            timestamp_dict = self.load_timestamps()
+            partitions = timestamp_dict.get("partitions") if timestamp_dict else None
+            if not partitions:
+                return
+            try:
+                data = self._read_partitions(partitions)
+                size = self._get_size(
+                    [*partitions["segments"].values(), *partitions["log"]]
+                )
+            except FileNotFoundError:
+                continue
+            metrics.observe_cache_bytes(type(self).__name__, "load", size)
+            self.data = self.get_cache_data(data, timestamp_dict)
+            self.partitions = partitions
+            self.loaded_state = state
+            return
+        log.warning("Cache files were changed while loading, keeping previous data.")
+
+    def save(self, updated: Optional[pl.DataFrame] = None) -> None:
+        data = self.data
+        partitions = self.partitions
+        os.makedirs(self.data_filename, exist_ok=True)
+        generation = partitions["generation"] + 1 if partitions else 1
+        obsolete = []
+        if updated is None or partitions is None:
+            if partitions:
+                obsolete = [*partitions["segments"].values(), *partitions["log"]]
+            segments = self._write_segments(data.rates, generation)
+            self.partitions = {
+                "generation": generation,
+                "segments": segments,
+                "log": [],
+            }
+            written = segments.values()
+        else:
+            # Incremental updates only append the changed rows; they are merged on load.
+            filename = f"log.{generation}.parquet"
+            updated.write_parquet(self._get_path(filename))
+            self.partitions = {
+                **partitions,
+                "generation": generation,
+                "log": [*partitions["log"], filename],
+            }
+            written = [filename]
+        metrics.observe_cache_bytes(
+            type(self).__name__, "save", self._get_size(written)
+        )
+        self.save_timestamps(self.get_timestamp_dict(data))
+        self.loaded_state = get_file_state(self.timestamps_filename)
+        self._remove_files(obsolete)
+
+    def save_timestamps(
+        self, timestamps: dict[str, str | dict[str, dict[str, str]]]
+    ) -> None:
+        timestamps = {**timestamps, "partitions": self.partitions}
+        with replace_file(self.timestamps_filename) as temp_filename:
+            with open(temp_filename, "w") as cf:
+                json.dump(timestamps, cf)
+
+    def compact(self) -> None:
+        self.load()
+        partitions = self.partitions
+        if not partitions or len(partitions["log"]) < self.compact_after:
+            return
+        years = set()
+        for filename in partitions["log"]:
+            updated = pl.read_parquet(self._get_path(filename), columns=["date"])
+            years.update(updated["date"].dt.year().unique().to_list())
+        generation = partitions["generation"] + 1
+        segments = self._write_segments(self.data.rates, generation, years)
+        self.partitions = {
+            "generation": generation,
+            "segments": {**partitions["segments"], **segments},
+            "log": [],
+        }
+        self.save_timestamps(self.get_timestamp_dict(self.data))
+        self.loaded_state = get_file_state(self.timestamps_filename)
+        self._remove_files(
+            [
+                *(
+                    partitions["segments"][year]
+                    for year in segments
+                    if year in partitions["segments"]
+                ),
+                *partitions["log"],
+            ]
+        )
+        log.info("Compacted %d log files.", len(partitions["log"]))
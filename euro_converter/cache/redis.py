@@ -1,10 +1,20 @@
+import asyncio
+import logging
+import sys
 from io import BytesIO
-from typing import Optional
+from typing import Callable, Optional
 
 import redis
 import polars as pl
+from redis import asyncio as async_redis
+from redis.asyncio.lock import Lock as AsyncLock
+from redis.lock import Lock
 
+from .. import metrics
 from .base import StoredRatesCache
+from ..ecb import UpdateType
+
+log = logging.getLogger(__name__)
 
 
 class RedisRatesCache(StoredRatesCache):
@@ -13,44 +23,198 @@ class RedisRatesCache(StoredRatesCache):
         data_key: str = "data",
         last_update_key: str = "last_update",
         headers_key_prefix: str = "last_headers_",
+        lock_key: str = "update_lock",
+        lock_timeout: float | str = 300,
+        generation_key: str = "generation",
+        updates_channel: Optional[str] = "rates_updates",
         **kwargs,
     ):
         super().__init__()
         self.cache = redis.Redis(**kwargs)
+        # Used on the event loop. Connections are only opened on the first command.
+        self.async_cache = async_redis.Redis(**kwargs)
+        self.connection_kwargs = kwargs
         self.data_key = data_key
         self.last_update_key = last_update_key
         self.headers_key_prefix = headers_key_prefix
+        self.lock_key = lock_key
+        # Expiry of the lock, in case the process holding it does not release it.
+        self.lock_timeout = float(lock_timeout)
+        self.generation_key = generation_key
+        self.updates_channel = updates_channel
+        self.loaded_generation: Optional[bytes] = None
+
+    def _is_loaded(self, generation: Optional[bytes]) -> bool:
+        # Incremented on every save, so that unchanged data is not downloaded again.
+        return (
+            generation is not None
+            and generation == self.loaded_generation
+            and self.data is not None
+        )
+
+    def _queue_load(self, client: redis.Redis) -> None:
+        # Read in one transaction, so that data and timestamps always belong to the same save,
+        # and to the generation stored with them.
+        client.get(self.generation_key)
+        client.get(self.data_key)
+        self._queue_timestamps(client)
+
+    def _set_loaded(self, results: list) -> None:
+        generation, bin_data, *timestamps = results
+        data = self._read_data(bin_data)
+        timestamp_dict = self._read_timestamps(timestamps)
+        if data is not None and timestamp_dict:
+            self.data = self.get_cache_data(data, timestamp_dict)
+            self.loaded_generation = generation
+
+    def load(self) -> None:
+        if self._is_loaded(self.cache.get(self.generation_key)):
+            return
+        pipeline = self.cache.pipeline(transaction=True)
+        self._queue_load(pipeline)
+        self._set_loaded(pipeline.execute())
+
+    async def load_async(self) -> None:
+        if self._is_loaded(await self.async_cache.get(self.generation_key)):
+            return
+        async with self.async_cache.pipeline(transaction=True) as pipeline:
+            self._queue_load(pipeline)
+            results = await pipeline.execute()
+        # Reading the data is blocking.
+        await asyncio.to_thread(self._set_loaded, results)
+
+    def _queue_save(self, client: redis.Redis, bin_data: bytes) -> None:
+        # Data, timestamps and generation are written in one transaction, so that readers never
+        # see new data under the previous generation, or partly written timestamps.
+        client.set(self.data_key, bin_data)
+        self._write_timestamps(client, self.get_timestamp_dict(self.data))
+        client.incr(self.generation_key)
+
+    def save(self, updated: Optional[pl.DataFrame] = None) -> None:
+        pipeline = self.cache.pipeline(transaction=True)
+        self._queue_save(pipeline, self._get_bin_data(self.data.rates))
+        generation = pipeline.execute()[-1]
+        self.loaded_generation = str(generation).encode()
+        if self.updates_channel:
+            self.cache.publish(self.updates_channel, generation)
+
+    async def save_async(self, updated: Optional[pl.DataFrame] = None) -> None:
+        # Writing the data is blocking.
+        bin_data = await asyncio.to_thread(self._get_bin_data, self.data.rates)
+        async with self.async_cache.pipeline(transaction=True) as pipeline:
+            self._queue_save(pipeline, bin_data)
+            generation = (await pipeline.execute())[-1]
+        self.loaded_generation = str(generation).encode()
+        if self.updates_channel:
+            await self.async_cache.publish(self.updates_channel, generation)
 
     def load_data(self) -> Optional[pl.DataFrame]:
-        if self.cache.exists(self.data_key):
-            bin_data = BytesIO(self.cache.get(self.data_key))
-            return pl.read_parquet(bin_data)
-        else:
-            return None
+        return self._read_data(self.cache.get(self.data_key))
 
     def load_timestamps(self) -> Optional[dict[str, str | dict[str, dict[str, str]]]]:
-        if self.last_update_key:
-            return {
-                "last_update": self.cache.get(self.last_update_key).decode(),
-                "last_headers": {
-                    key.decode().removeprefix(self.headers_key_prefix): {
-                        k.decode(): v.decode()
-                        for k, v in self.cache.hgetall(key).items()
-                    }
-                    for key in self.cache.keys(f"{self.headers_key_prefix}*")
-                },
-            }
-        else:
+        pipeline = self.cache.pipeline(transaction=False)
+        self._queue_timestamps(pipeline)
+        return self._read_timestamps(pipeline.execute())
+
+    def _read_data(self, bin_data: Optional[bytes]) -> Optional[pl.DataFrame]:
+        if bin_data is None:
             return None
+        metrics.observe_cache_bytes(type(self).__name__, "load", len(bin_data))
+        return pl.read_parquet(BytesIO(bin_data))
 
-    def save_data(self, data: pl.DataFrame) -> None:
+    def _queue_timestamps(self, client: redis.Redis) -> None:
+        if not self.last_update_key:
+            return
+        client.get(self.last_update_key)
+        for update_type in UpdateType:
+            client.hgetall(f"{self.headers_key_prefix}{update_type.value}")
+
+    def _read_timestamps(
+        self, results: list
+    ) -> Optional[dict[str, str | dict[str, dict[str, str]]]]:
+        if not results or results[0] is None:
+            return None
+        last_update, *headers = results
+        return {
+            "last_update": last_update.decode(),
+            "last_headers": {
+                update_type.value: {k.decode(): v.decode() for k, v in values.items()}
+                for update_type, values in zip(UpdateType, headers)
+                if values
+            },
+        }
+
+    def _get_bin_data(self, data: pl.DataFrame) -> bytes:
         bin_data = BytesIO()
         data.write_parquet(bin_data)
-        self.cache.set(self.data_key, bin_data.getvalue())
+        metrics.observe_cache_bytes(type(self).__name__, "save", bin_data.tell())
+        return bin_data.getvalue()
+
+    def _write_timestamps(
+        self,
+        client: redis.Redis,
+        timestamps: dict[str, str | dict[str, dict[str, str]]],
+    ) -> None:
+        client.set(self.last_update_key, timestamps["last_update"])
+        for key, value in timestamps["last_headers"].items():
+            client.hset(f"{self.headers_key_prefix}{key}", mapping=value)
+
+    def save_data(self, data: pl.DataFrame) -> None:
+        self.cache.set(self.data_key, self._get_bin_data(data))
 
     def save_timestamps(
         self, timestamps: dict[str, str | dict[str, dict[str, str]]]
     ) -> None:
-        self.cache.set(self.last_update_key, timestamps["last_update"])
-        for key, value in timestamps["last_headers"].items():
-            self.cache.hset(f"{self.headers_key_prefix}{key}", mapping=value)
+        self._write_timestamps(self.cache, timestamps)
+
+    def update_lock(self) -> Lock:
+        return self.cache.lock(
+            self.lock_key,
+            timeout=self.lock_timeout,
+            blocking_timeout=self.lock_timeout,
+        )
+
+    def update_lock_async(self) -> AsyncLock:
+        # Same lock as `update_lock`, waited for on the event loop.
+        return self.async_cache.lock(
+            self.lock_key,
+            timeout=self.lock_timeout,
+            blocking_timeout=self.lock_timeout,
+        )
+
+    async def _handle_update(
+        self, message: dict, on_update: Optional[Callable[[], None]]
+    ) -> None:
+        if message["data"] == self.loaded_generation:
+            return
+
+        try:
+            await self.load_async()
+            if on_update is not None:
+                # Preparing lookups is blocking.
+                await asyncio.to_thread(on_update)
+        except Exception:
+            exc = sys.exc_info()
+            log.warning("Failed to load updated data from cache.", exc_info=exc)
+
+    async def listen(self, on_update: Optional[Callable[[], None]] = None) -> None:
+        # Waits for notifications on the event loop, instead of polling in a thread.
+        if not self.updates_channel:
+            return
+        client = async_redis.Redis(**self.connection_kwargs)
+        try:
+            while True:
+                try:
+                    async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                        await pubsub.subscribe(self.updates_channel)
+                        async for message in pubsub.listen():
+                            if message["type"] == "message":
+                                await self._handle_update(message, on_update)
+                except Exception:
+                    exc = sys.exc_info()
+                    log.warning(
+                        "Error while listening for cache updates.", exc_info=exc
+                    )
+                    await asyncio.sleep(1.0)
+        finally:
+            await client.aclose()
@@ -1 +1,9 @@
-from .calc import ConversionType, CurrencyCalculator
+from .calc import (
+    ConversionType,
+    CurrencyCalculator,
+    NumericMode,
+    RatesUnavailableError,
+    UnknownCurrencyError,
+)
+from .index import AggregatePeriod
+from .utils import RoundingMode
@@ -1,28 +1,62 @@
+import asyncio
 import enum
 import logging
 import sys
+import threading
+from dataclasses import replace
 from datetime import date, timedelta, datetime
 from decimal import Decimal
-from typing import Optional
+from functools import partial
+from typing import Callable, Optional
 
 import polars as pl
 
+from .. import metrics
+from ..profiling import get_profile
 from ..cache import RatesCache, RatesCacheData
-from ..ecb import update_from_ecb, UpdateType, get_update_type
+from ..cache.data import (
+    get_decimal_rates,
+    get_scaled_rate,
+)
+from ..ecb import (
+    update_from_ecb,
+    update_from_ecb_async,
+    UpdateType,
+    UpdateTimestamps,
+    get_update_type,
+)
+from .index import AggregatePeriod, DEFAULT_MEMO_SIZE, RatesIndex, RatesMemo
+from .scaled import (
+    MAX_SCALED_DECIMALS,
+    get_decimal_result,
+    with_scaled_cross,
+    with_scaled_product,
+    with_scaled_quotient,
+)
 from .utils import (
     get_parsed_rates_df,
-    get_single_df,
-    get_multi_df,
+    get_mixed_df,
+    get_values_df,
+    get_result_df,
     get_result_list,
+    get_rounded,
     get_single_result,
+    RoundingMode,
+    get_single_product,
+    get_single_quotient,
+    get_single_cross,
+    MIXED_RESULT_TYPE,
 )
 
 log = logging.getLogger(__name__)
 
 
-CONVERT_TO = pl.col("value") * pl.col("rate")
-CONVERT_FROM = pl.col("value") / pl.col("rate")
-CACHE_TIMEOUT = timedelta(hours=1)
+class RatesUnavailableError(Exception):
+    pass
+
+
+class UnknownCurrencyError(Exception):
+    pass
 
 
 class ConversionType(enum.Enum):
@@ -30,10 +64,83 @@ class ConversionType(enum.Enum):
     TO = "to"
 
 
+class NumericMode(enum.Enum):
+    DECIMAL = "decimal"
+    SCALED = "scaled"
+
+
+CONVERT_TO = pl.col("value") * pl.col("rate")
+CONVERT_FROM = pl.col("value") / pl.col("rate")
+CONVERT_CROSS = pl.col("value") * pl.col("target_rate") / pl.col("source_rate")
+CONVERT_MIXED = (
+    pl.when(pl.col("conversion_type") == ConversionType.FROM.value)
+    .then(CONVERT_FROM.cast(MIXED_RESULT_TYPE))
+    .otherwise(CONVERT_TO.cast(MIXED_RESULT_TYPE))
+)
+CONVERT_SINGLE_TO = get_single_product
+CONVERT_SINGLE_FROM = get_single_quotient
+CONVERT_SCALED_TO = partial(
+    with_scaled_product, alias="result", value="scaled_value", rate="rate"
+)
+CONVERT_SCALED_FROM = partial(
+    with_scaled_quotient, alias="result", value="scaled_value", rate="rate"
+)
+CONVERT_SCALED_CROSS = partial(
+    with_scaled_cross,
+    alias="result",
+    value="scaled_value",
+    source_rate="source_rate",
+    target_rate="target_rate",
+)
+CACHE_TIMEOUT = timedelta(hours=1)
+
+
+def with_scaled_mixed(
+    frame: pl.LazyFrame, decimals: int, rounding: RoundingMode
+) -> pl.LazyFrame:
+    frame = with_scaled_product(
+        frame, "to_result", "scaled_value", "rate", decimals, rounding
+    )
+    frame = with_scaled_quotient(
+        frame, "from_result", "scaled_value", "rate", decimals, rounding
+    )
+    return frame.with_columns(
+        pl.when(pl.col("conversion_type") == ConversionType.FROM.value)
+        .then(pl.col("from_result"))
+        .otherwise(pl.col("to_result"))
+        .alias("result"),
+        (pl.col("to_result_overflow") | pl.col("from_result_overflow")).alias(
+            "result_overflow"
+        ),
+    ).drop("to_result", "from_result", "to_result_overflow", "from_result_overflow")
+
+
+def collect(frame: pl.LazyFrame) -> pl.DataFrame:
+    profile = get_profile()
+    if profile is None:
+        return frame.collect()
+    return profile.collect(frame, metrics.get_operation())
+
+
 class CurrencyCalculator:
-    def __init__(self, cache: RatesCache):
+    def __init__(
+        self,
+        cache: RatesCache,
+        refresh_in_background: bool = False,
+        full_update_csv: bool = False,
+        numeric_mode: NumericMode = NumericMode.DECIMAL,
+        rounding_mode: RoundingMode = RoundingMode.HALF_EVEN,
+        rates_memo_size: int = DEFAULT_MEMO_SIZE,
+    ):
         self.cache = cache
+        self.refresh_in_background = refresh_in_background
+        self.full_update_csv = full_update_csv
+        self.numeric_mode = numeric_mode
+        self.rounding_mode = rounding_mode
         self.last_cache_check = None
+        self._index: Optional[RatesIndex] = None
+        self.rates_memo = RatesMemo(rates_memo_size)
+        self._update_lock = threading.Lock()
 
     @property
     def data(self) -> Optional[RatesCacheData]:
@@ -44,67 +151,354 @@ class CurrencyCalculator:
         self.cache.data = value
 
     def _load_cache(self):
+        backend = type(self.cache).__name__
+        generation = self.cache.generation
+        try:
+            with metrics.cache_action(backend, "load"):
+                self.cache.load()
+        except Exception:
+            exc = sys.exc_info()
+            log.warning("Failed to load from cache.", exc_info=exc)
+        if self.cache.generation != generation:
+            metrics.count_cache_reload(backend)
+        self.last_cache_check = datetime.utcnow()
+
+    async def _load_cache_async(self):
+        backend = type(self.cache).__name__
+        generation = self.cache.generation
         try:
-            self.cache.load()
+            with metrics.cache_action(backend, "load"):
+                await self.cache.load_async()
         except Exception:
             exc = sys.exc_info()
             log.warning("Failed to load from cache.", exc_info=exc)
+        if self.cache.generation != generation:
+            metrics.count_cache_reload(backend)
         self.last_cache_check = datetime.utcnow()
 
-    def _save_cache(self):
+    def _save_cache(self, updated: Optional[pl.DataFrame] = None):
+        try:
+            with metrics.cache_action(type(self.cache).__name__, "save"):
+                self.cache.save(updated)
+        except Exception:
+            exc = sys.exc_info()
+            log.warning("Failed to update cache.", exc_info=exc)
+
+    async def _save_cache_async(self, updated: Optional[pl.DataFrame] = None):
         try:
-            self.cache.save()
+            with metrics.cache_action(type(self.cache).__name__, "save"):
+                await self.cache.save_async(updated)
         except Exception:
             exc = sys.exc_info()
             log.warning("Failed to update cache.", exc_info=exc)
 
     def update(self) -> bool:
-        data = self.data
+        requested = datetime.utcnow()
+        with metrics.operation("update"), self._update_lock, self.cache.update_lock():
+            # Only one process performs the update; others wait for it to publish the result.
+            with metrics.stage("check_cache"):
+                self._load_cache()
+            data = self.data
+            if data and data.last_update >= requested:
+                log.info("Rates have been updated by another process.")
+                return False
+            return self._update()
+
+    async def update_async(self) -> bool:
+        # Same as `update`, with the download and cache access on the event loop. Only parsing
+        # and merging the rates run in threads.
+        requested = datetime.utcnow()
+        with metrics.operation("update", on_event_loop=True):
+            # Also excludes updates in other threads, e.g. from a conversion without any rates.
+            await asyncio.to_thread(self._update_lock.acquire)
+            try:
+                async with self.cache.update_lock_async():
+                    with metrics.stage("check_cache"):
+                        await self._load_cache_async()
+                    data = self.data
+                    if data and data.last_update >= requested:
+                        log.info("Rates have been updated by another process.")
+                        return False
+                    return await self._update_async()
+            finally:
+                self._update_lock.release()
+
+    def _get_update_request(
+        self, data: Optional[RatesCacheData]
+    ) -> tuple[UpdateType, Optional[UpdateTimestamps]]:
         update_type = get_update_type(data.last_update if data else None)
-        if update_type is not UpdateType.FULL:
-            timestamps = data.last_timestamps.get(update_type.value)
-        else:
-            timestamps = None
+        # Full updates are conditional as well, if there is data from a previous one.
+        timestamps = data.last_timestamps.get(update_type.value) if data else None
+        return update_type, timestamps
 
-        updated_data, response_timestamps = update_from_ecb(update_type, timestamps)
-        if updated_data is None:
-            if data and response_timestamps:
-                data.last_timestamps[update_type.value] = response_timestamps
+    def _update(self) -> bool:
+        data = self.data
+        update_type, timestamps = self._get_update_request(data)
+        updated_data, response_timestamps = update_from_ecb(
+            update_type, timestamps, full_update_csv=self.full_update_csv
+        )
+        updated_df = self._merge_update(
+            data, update_type, updated_data, response_timestamps
+        )
+        if updated_df is None:
             return False
+        with metrics.stage("save"):
+            self._save_cache(None if update_type is UpdateType.FULL else updated_df)
+        return True
 
-        updated_df = get_parsed_rates_df(updated_data)
-        now = datetime.utcnow()
-        if update_type is UpdateType.FULL:
-            self.data = RatesCacheData(
-                rates=updated_df,
-                last_update=now,
-                last_timestamps={},
+    async def _update_async(self) -> bool:
+        data = self.data
+        update_type, timestamps = self._get_update_request(data)
+        updated_data, response_timestamps = await update_from_ecb_async(
+            update_type, timestamps, full_update_csv=self.full_update_csv
+        )
+        updated_df = await asyncio.to_thread(
+            self._merge_update, data, update_type, updated_data, response_timestamps
+        )
+        if updated_df is None:
+            return False
+        with metrics.stage("save"):
+            await self._save_cache_async(
+                None if update_type is UpdateType.FULL else updated_df
             )
-            log.info("Created new dataframe.")
-        else:
-            if response_timestamps:
-                data.last_timestamps[update_type.value] = response_timestamps
-            data.rates = data.rates.update(updated_df, on="date", how="outer").sort("date")
-            data.last_update = now
-            log.info("Merged updated dataframe.")
-        self.last_cache_check = now
-        self._save_cache()
         return True
 
-    def _check_cache(self) -> None:
+    def _merge_update(
+        self,
+        data: Optional[RatesCacheData],
+        update_type: UpdateType,
+        updated_data: Optional[pl.DataFrame],
+        response_timestamps: Optional[UpdateTimestamps],
+    ) -> Optional[pl.DataFrame]:
+        # Data is replaced rather than modified, so that requests can continue on the previous
+        # snapshot while an update is running. Returns the parsed update, if there was one.
+        if updated_data is None:
+            if data and response_timestamps:
+                self.data = replace(
+                    data,
+                    last_timestamps={
+                        **data.last_timestamps,
+                        update_type.value: response_timestamps,
+                    },
+                )
+            return None
+
+        with metrics.stage("merge"):
+            updated_df = get_parsed_rates_df(updated_data)
+            now = datetime.utcnow()
+            if update_type is UpdateType.FULL:
+                self.data = RatesCacheData(
+                    rates=updated_df,
+                    last_update=now,
+                    last_timestamps=(
+                        {update_type.value: response_timestamps}
+                        if response_timestamps
+                        else {}
+                    ),
+                )
+                log.info("Created new dataframe.")
+            else:
+                last_timestamps = dict(data.last_timestamps)
+                if response_timestamps:
+                    last_timestamps[update_type.value] = response_timestamps
+                rates = get_decimal_rates(data.rates)
+                self.data = RatesCacheData(
+                    rates=rates.update(updated_df, on="date", how="outer").sort("date"),
+                    last_update=now,
+                    last_timestamps=last_timestamps,
+                )
+                log.info("Merged updated dataframe.")
+        self.last_cache_check = now
+        return updated_df
+
+    def compact(self) -> None:
+        with self._update_lock, self.cache.update_lock():
+            self.cache.compact()
+
+    def refresh(self, update: bool = True) -> bool:
+        if not update:
+            self._load_cache()
+            if self.data:
+                return False
+        return self.update()
+
+    async def refresh_async(self, update: bool = True) -> bool:
+        if not update:
+            await self._load_cache_async()
+            if self.data:
+                return False
+        return await self.update_async()
+
+    @property
+    def needs_cache_check(self) -> bool:
+        # Whether the next conversion loads from the cache or updates first, i.e. blocks on I/O.
+        # Until any rates are available, every conversion tries to get them.
+        if self.data is None:
+            return True
+        if self.refresh_in_background:
+            return False
         now = datetime.utcnow()
-        if not self.last_cache_check or self.last_cache_check + CACHE_TIMEOUT < now:
+        return not self.last_cache_check or self.last_cache_check + CACHE_TIMEOUT < now
+
+    @property
+    def index_ready(self) -> bool:
+        # Whether lookups were built for the current data, so that single conversions are cheap.
+        index = self._index
+        return index is not None and index.generation == self.cache.generation
+
+    def _check_cache(self) -> None:
+        if self.needs_cache_check:
             self._load_cache()
             if not self.data:
-                self.update()
+                try:
+                    self.update()
+                except Exception:
+                    exc = sys.exc_info()
+                    log.warning("Failed to update rates.", exc_info=exc)
+
+    def _get_index(self) -> RatesIndex:
+        with metrics.stage("check_cache"):
+            self._check_cache()
+        # Read before the data, so that a concurrent replacement leads to another rebuild.
+        generation = self.cache.generation
+        data = self.data
+        if data is None:
+            raise RatesUnavailableError("No rates have been loaded yet.")
+        rates = data.rates
+        index = self._index
+        if index is None or index.generation != generation:
+            index = self._index = RatesIndex(rates, generation)
+        return index
+
+    @staticmethod
+    def _check_currencies(index: RatesIndex, *currencies: str) -> None:
+        unknown = [
+            currency for currency in currencies if currency not in index.currencies
+        ]
+        if unknown:
+            raise UnknownCurrencyError(
+                f"Unknown currency: {', '.join(sorted(set(unknown)))}"
+            )
 
-    def _merge_into(self, data: pl.DataFrame, currency: str) -> pl.DataFrame:
-        self._check_cache()
-        date_rates = self.data.rates.lazy().select(
-            pl.col("date"), pl.col(currency).alias("rate")
-        ).set_sorted("date")
-        merged = data.lazy().join_asof(date_rates, on="date")
-        return merged.collect()
+    def _get_rate(self, currency: str, currency_date: date) -> Optional[int]:
+        index = self._get_index()
+        self._check_currencies(index, currency)
+        with metrics.stage("lookup"):
+            return self.rates_memo.get_rate(index, currency, currency_date)
+
+    @property
+    def ready(self) -> bool:
+        return self.data is not None
+
+    def load(self, update: bool = True) -> bool:
+        # Loads the rates before the first request, and updates them if the cache is empty.
+        self._load_cache()
+        if not self.data and update:
+            self.update()
+        self.prepare_index()
+        return self.ready
+
+    async def load_async(self, update: bool = True) -> bool:
+        await self._load_cache_async()
+        if not self.data and update:
+            await self.update_async()
+        # Building the lookups is blocking.
+        await asyncio.to_thread(self.prepare_index)
+        return self.ready
+
+    def prepare_index(self) -> None:
+        if not self.data:
+            return
+        self._get_index().prepare()
+
+    def prepare_aggregates(self) -> None:
+        if not self.data:
+            return
+        self._get_index().prepare_aggregates()
+
+    def get_rates(
+        self,
+        currency: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Optional[list[tuple[date, Decimal]]]:
+        index = self._get_index()
+        currency = currency.upper()
+        if currency not in index.currencies:
+            return None
+        return index.get_rates(currency, start, end).rows()
+
+    def get_rate_aggregates(
+        self,
+        currency: str,
+        period: AggregatePeriod,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Optional[list[tuple[date, Decimal, Decimal, Decimal]]]:
+        index = self._get_index()
+        currency = currency.upper()
+        if currency not in index.currencies:
+            return None
+        return index.get_aggregates(currency, period, start, end).rows()
+
+    def _merge_into(
+        self, data: pl.DataFrame, scaled: bool = False, **rate_columns: str
+    ) -> pl.LazyFrame:
+        # Rates are gathered by their positions in the calendar of the index, in the order of
+        # the data, instead of sorting the data for an as-of join.
+        index = self._get_index()
+        self._check_currencies(index, *rate_columns.values())
+        with metrics.stage("join"):
+            positions = index.get_positions(data["date"])
+            data = data.with_columns(
+                index.gather_rates(currency, positions, scaled).alias(column_name)
+                for column_name, currency in rate_columns.items()
+            )
+        if scaled:
+            data = data.with_columns(
+                get_scaled_rate(pl.col("value")).alias("scaled_value")
+            )
+        return data.lazy()
+
+    def _use_scaled(self, decimals: Optional[int]) -> bool:
+        # Without rounding, results can exceed the range of scaled integers.
+        return (
+            self.numeric_mode is NumericMode.SCALED
+            and decimals is not None
+            and 0 <= decimals <= MAX_SCALED_DECIMALS
+        )
+
+    def _merge_result(
+        self,
+        data: pl.DataFrame,
+        expression: pl.Expr,
+        with_scaled_result: Callable[..., pl.LazyFrame],
+        decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
+        **rate_columns: str,
+    ) -> pl.DataFrame:
+        rounding = rounding or self.rounding_mode
+        # In scaled mode, results are rounded to the given decimals.
+        if self._use_scaled(decimals):
+            merged = self._merge_into(data, scaled=True, **rate_columns)
+            with metrics.stage("calculate"):
+                result = collect(
+                    with_scaled_result(merged, decimals=decimals, rounding=rounding)
+                )
+            if not result["result_overflow"].any():
+                return result.drop("scaled_value", "result_overflow").with_columns(
+                    get_decimal_result(pl.col("result"), decimals)
+                )
+            log.info("Results exceed the scaled range, converting as Decimal.")
+        result = self._merge_into(data, **rate_columns).with_columns(
+            expression.alias("result")
+        )
+        if decimals is not None:
+            result = result.with_columns(
+                get_rounded(pl.col("result"), decimals, rounding)
+            )
+        with metrics.stage("calculate"):
+            return collect(result)
 
     def convert(
         self,
@@ -113,14 +507,43 @@ class CurrencyCalculator:
         currency_date: date,
         value: Decimal,
         decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
     ):
-        data = get_single_df(currency_date, value)
+        if conversion_type is ConversionType.FROM:
+            convert_func = CONVERT_SINGLE_FROM
+        else:
+            convert_func = CONVERT_SINGLE_TO
+        with metrics.operation("convert"):
+            rate = self._get_rate(currency.upper(), currency_date)
+            with metrics.stage("calculate"):
+                return get_single_result(
+                    convert_func(value, rate),
+                    decimals=decimals,
+                    rounding=rounding or self.rounding_mode,
+                )
+
+    def _convert(
+        self,
+        conversion_type: ConversionType,
+        currency: str,
+        data: pl.DataFrame,
+        decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
+    ) -> pl.DataFrame:
         if conversion_type is ConversionType.FROM:
             expression = CONVERT_FROM
+            with_scaled_result = CONVERT_SCALED_FROM
         else:
             expression = CONVERT_TO
-        merged = self._merge_into(data, currency.upper())
-        return get_single_result(merged.select(expression), decimals=decimals)
+            with_scaled_result = CONVERT_SCALED_TO
+        return self._merge_result(
+            data,
+            expression,
+            with_scaled_result,
+            decimals,
+            rounding,
+            rate=currency.upper(),
+        )
 
     def convert_multiple(
         self,
@@ -129,12 +552,150 @@ class CurrencyCalculator:
         values: list[tuple[date, Decimal]],
         keep_order: bool = True,
         decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
     ):
-        data = get_multi_df(values, add_row_index=keep_order)
-        if conversion_type is ConversionType.FROM:
-            expression = CONVERT_FROM
-        else:
-            expression = CONVERT_TO
-        merged = self._merge_into(data, currency.upper())
-        result = merged.with_columns(expression.alias("result"))
-        return get_result_list(result, restore_sort=keep_order, decimals=decimals)
+        with metrics.operation("convert_multiple"):
+            with metrics.stage("read"):
+                data = get_values_df(values)
+            result = self.convert_frame(
+                conversion_type, currency, data, keep_order, decimals, rounding
+            )
+            with metrics.stage("write"):
+                return get_result_list(result)
+
+    def convert_frame(
+        self,
+        conversion_type: ConversionType,
+        currency: str,
+        data: pl.DataFrame,
+        keep_order: bool = True,
+        decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
+    ) -> pl.DataFrame:
+        with metrics.operation("convert_frame"):
+            metrics.observe_batch(len(data))
+            result = self._convert(conversion_type, currency, data, decimals, rounding)
+            with metrics.stage("sort"):
+                return get_result_df(result, sort_dates=not keep_order)
+
+    def convert_cross(
+        self,
+        source_currency: str,
+        target_currency: str,
+        currency_date: date,
+        value: Decimal,
+        decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
+    ):
+        with metrics.operation("convert_cross"):
+            source_rate = self._get_rate(source_currency.upper(), currency_date)
+            target_rate = self._get_rate(target_currency.upper(), currency_date)
+            with metrics.stage("calculate"):
+                result = get_single_cross(value, source_rate, target_rate)
+                return get_single_result(
+                    result, decimals=decimals, rounding=rounding or self.rounding_mode
+                )
+
+    def _convert_cross(
+        self,
+        source_currency: str,
+        target_currency: str,
+        data: pl.DataFrame,
+        decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
+    ) -> pl.DataFrame:
+        return self._merge_result(
+            data,
+            CONVERT_CROSS,
+            CONVERT_SCALED_CROSS,
+            decimals,
+            rounding,
+            source_rate=source_currency.upper(),
+            target_rate=target_currency.upper(),
+        )
+
+    def convert_multiple_cross(
+        self,
+        source_currency: str,
+        target_currency: str,
+        values: list[tuple[date, Decimal]],
+        keep_order: bool = True,
+        decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
+    ):
+        with metrics.operation("convert_multiple_cross"):
+            with metrics.stage("read"):
+                data = get_values_df(values)
+            result = self.convert_frame_cross(
+                source_currency, target_currency, data, keep_order, decimals, rounding
+            )
+            with metrics.stage("write"):
+                return get_result_list(result)
+
+    def convert_frame_cross(
+        self,
+        source_currency: str,
+        target_currency: str,
+        data: pl.DataFrame,
+        keep_order: bool = True,
+        decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
+    ) -> pl.DataFrame:
+        with metrics.operation("convert_frame_cross"):
+            metrics.observe_batch(len(data))
+            result = self._convert_cross(
+                source_currency, target_currency, data, decimals, rounding
+            )
+            with metrics.stage("sort"):
+                return get_result_df(result, sort_dates=not keep_order)
+
+    def _convert_mixed(
+        self,
+        values: list[tuple[ConversionType, str, date, Decimal]],
+        decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
+    ) -> pl.DataFrame:
+        if not values:
+            return pl.DataFrame(schema={"date": pl.Date, "result": MIXED_RESULT_TYPE})
+        with metrics.stage("read"):
+            data = get_mixed_df(
+                [
+                    (conversion_type.value, currency, currency_date, value)
+                    for conversion_type, currency, currency_date, value in values
+                ]
+            )
+        # All currencies are checked before any of them is converted.
+        self._check_currencies(self._get_index(), *data["currency"].unique())
+        results = [
+            self._merge_result(
+                currency_data,
+                CONVERT_MIXED,
+                with_scaled_mixed,
+                decimals,
+                rounding,
+                rate=currency,
+            )
+            for (currency,), currency_data in data.partition_by(
+                ["currency"], as_dict=True
+            ).items()
+        ]
+        with metrics.stage("sort"):
+            return get_result_df(pl.concat(results), restore_sort=True)
+
+    def convert_mixed_frame(
+        self,
+        values: list[tuple[ConversionType, str, date, Decimal]],
+        decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
+    ) -> pl.DataFrame:
+        with metrics.operation("convert_mixed"):
+            metrics.observe_batch(len(values))
+            return self._convert_mixed(values, decimals, rounding)
+
+    def convert_mixed(
+        self,
+        values: list[tuple[ConversionType, str, date, Decimal]],
+        decimals: Optional[int] = None,
+        rounding: Optional[RoundingMode] = None,
+    ):
+        return self.convert_mixed_frame(values, decimals, rounding).rows()
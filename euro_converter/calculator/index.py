@@ -0,0 +1,244 @@
+import enum
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+
+import polars as pl
+
+from ..cache.data import (
+    DECIMAL_TYPE,
+    SCALED_RATE_TYPE,
+    get_decimal_rate,
+    get_rate_column,
+    get_scaled_rate_column,
+)
+from .utils import get_rounded
+
+
+DEFAULT_MEMO_SIZE = 4096
+CALENDAR_TYPE = pl.UInt32
+EPOCH = date(1970, 1, 1)
+
+
+class AggregatePeriod(enum.Enum):
+    MONTH = "month"
+    YEAR = "year"
+
+
+PERIOD_INTERVALS = {
+    AggregatePeriod.MONTH: "1mo",
+    AggregatePeriod.YEAR: "1y",
+}
+
+
+def get_period_start(period: AggregatePeriod, day: date) -> date:
+    if period is AggregatePeriod.YEAR:
+        return day.replace(month=1, day=1)
+    return day.replace(day=1)
+
+
+def get_date_range(
+    df: pl.DataFrame, dates: list[date], start: Optional[date], end: Optional[date]
+) -> pl.DataFrame:
+    # Rows between both dates (inclusive), looked up in the sorted dates of the frame.
+    offset = 0 if start is None else bisect_left(dates, start)
+    stop = len(dates) if end is None else bisect_right(dates, end)
+    return df.slice(offset, max(stop - offset, 0))
+
+
+def get_calendar(days: pl.Series) -> pl.Series:
+    # One entry per calendar day from the first to the last of the given (sorted) days, holding
+    # the position of the last day on or before it. Same as the backward as-of join.
+    first_day = days[0]
+    positions = pl.int_range(0, len(days), dtype=CALENDAR_TYPE, eager=True)
+    return (
+        pl.repeat(None, days[-1] - first_day + 1, dtype=CALENDAR_TYPE, eager=True)
+        .scatter(days - first_day, positions)
+        .fill_null(strategy="forward")
+    )
+
+
+class RatesIndex:
+    def __init__(self, rates: pl.DataFrame, generation: int = 0):
+        self.rates = rates
+        self.generation = generation
+        self.dates: list[date] = rates["date"].to_list()
+        self.currencies = [column for column in rates.columns if column != "date"]
+        # Dates as days since the epoch, the physical representation of pl.Date.
+        days = rates["date"].cast(pl.Int32)
+        self.first_day: Optional[int] = days[0] if len(days) else None
+        self.calendar = get_calendar(days) if len(days) else None
+        self._scaled_columns: dict[str, pl.Series] = {}
+        self._aggregates: dict[AggregatePeriod, tuple[list[date], pl.DataFrame]] = {}
+        self._aggregate_lock = threading.Lock()
+
+    def prepare(self) -> None:
+        # Builds the scaled rates of all currencies, which is otherwise done on first use.
+        for currency in self.currencies:
+            self.get_scaled_column(currency)
+
+    def get_scaled_column(self, currency: str) -> pl.Series:
+        scaled_column = self._scaled_columns.get(currency)
+        if scaled_column is None:
+            # Rates stored as scaled integers are not copied, so that e.g. a memory map is
+            # shared by all processes.
+            scaled_column = self.rates.select(
+                get_scaled_rate_column(self.rates, currency).alias(currency)
+            ).to_series()
+            self._scaled_columns[currency] = scaled_column
+        return scaled_column
+
+    def gather_rates(
+        self, currency: str, positions: pl.Series, scaled: bool = False
+    ) -> pl.Series:
+        if scaled:
+            return self.get_scaled_column(currency).gather(positions)
+        rates = self.rates.get_column(currency)
+        if rates.dtype != SCALED_RATE_TYPE:
+            return rates.gather(positions)
+        # Converted for this batch only, instead of keeping a copy of the column in each
+        # process. Whichever of the column and the gathered rates is shorter is converted.
+        gather_first = len(positions) < len(rates)
+        if gather_first:
+            rates = rates.gather(positions)
+        rates = rates.to_frame().select(get_decimal_rate(pl.col(currency))).to_series()
+        return rates if gather_first else rates.gather(positions)
+
+    def get_positions(self, dates: pl.Series) -> pl.Series:
+        if self.calendar is None:
+            return pl.repeat(None, len(dates), dtype=CALENDAR_TYPE, eager=True)
+        offset = pl.col("date").cast(pl.Int32) - self.first_day
+        # Dates before the first one have no rates, dates after the last one use its rates.
+        calendar_offset = (
+            pl.when(offset >= 0)
+            .then(offset.clip(upper_bound=len(self.calendar) - 1))
+            .cast(CALENDAR_TYPE)
+        )
+        offsets = pl.DataFrame({"date": dates}).select(calendar_offset).to_series()
+        return self.calendar.gather(offsets)
+
+    def get_position(self, currency_date: date) -> Optional[int]:
+        if self.calendar is None:
+            return None
+        offset = (currency_date - EPOCH).days - self.first_day
+        if offset < 0:
+            return None
+        return self.calendar[min(offset, len(self.calendar) - 1)]
+
+    def get_rate(self, currency: str, currency_date: date) -> Optional[int]:
+        position = self.get_position(currency_date)
+        if position is None:
+            return None
+        return self.get_scaled_column(currency)[position]
+
+    def get_rates(
+        self, currency: str, start: Optional[date], end: Optional[date]
+    ) -> pl.DataFrame:
+        return (
+            get_date_range(self.rates, self.dates, start, end)
+            .select(pl.col("date"), get_rate_column(self.rates, currency).alias("rate"))
+            .drop_nulls("rate")
+        )
+
+    def _get_aggregates(
+        self, period: AggregatePeriod
+    ) -> tuple[list[date], pl.DataFrame]:
+        # Computed for all currencies at once, the first time they are requested for this data.
+        with self._aggregate_lock:
+            aggregates = self._aggregates.get(period)
+            if aggregates is None:
+                df = self._compute_aggregates(period)
+                aggregates = self._aggregates[period] = df["date"].to_list(), df
+        return aggregates
+
+    def prepare_aggregates(self) -> None:
+        for period in AggregatePeriod:
+            self._get_aggregates(period)
+
+    def _compute_aggregates(self, period: AggregatePeriod) -> pl.DataFrame:
+        expressions = []
+        for currency in self.currencies:
+            rate = get_rate_column(self.rates, currency)
+            mean = rate.sum() / rate.is_not_null().sum().cast(pl.Decimal(None, 0))
+            expressions.extend(
+                [
+                    rate.min().alias(f"{currency}_min"),
+                    rate.max().alias(f"{currency}_max"),
+                    get_rounded(mean, DECIMAL_TYPE.scale)
+                    .cast(DECIMAL_TYPE)
+                    .alias(f"{currency}_mean"),
+                ]
+            )
+        return (
+            self.rates.lazy()
+            .set_sorted("date")
+            .group_by_dynamic("date", every=PERIOD_INTERVALS[period])
+            .agg(expressions)
+            .collect()
+        )
+
+    def get_aggregates(
+        self,
+        currency: str,
+        period: AggregatePeriod,
+        start: Optional[date],
+        end: Optional[date],
+    ) -> pl.DataFrame:
+        period_dates, aggregates = self._get_aggregates(period)
+        # Periods that overlap with the range, aggregated over all of their dates.
+        if start is not None:
+            start = get_period_start(period, start)
+        return (
+            get_date_range(aggregates, period_dates, start, end)
+            .select(
+                pl.col("date"),
+                pl.col(f"{currency}_min").alias("min"),
+                pl.col(f"{currency}_max").alias("max"),
+                pl.col(f"{currency}_mean").alias("mean"),
+            )
+            .drop_nulls("min")
+        )
+
+
+class RatesMemo:
+    # Least recently used rates by currency and requested date, for the index of one generation.
+    def __init__(self, max_size: int = DEFAULT_MEMO_SIZE):
+        self.max_size = max_size
+        self.generation: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._rates: OrderedDict[tuple[str, date], Optional[int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_rate(
+        self, index: RatesIndex, currency: str, currency_date: date
+    ) -> Optional[int]:
+        key = currency, currency_date
+        with self._lock:
+            if self.generation != index.generation:
+                self._rates.clear()
+                self.generation = index.generation
+            elif key in self._rates:
+                self._rates.move_to_end(key)
+                self.hits += 1
+                return self._rates[key]
+            self.misses += 1
+        rate = index.get_rate(currency, currency_date)
+        with self._lock:
+            if self.generation == index.generation and self.max_size > 0:
+                self._rates[key] = rate
+                if len(self._rates) > self.max_size:
+                    self._rates.popitem(last=False)
+        return rate
+
+    def get_stats(self) -> dict[str, Optional[int]]:
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "size": len(self._rates),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
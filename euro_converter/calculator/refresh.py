@@ -0,0 +1,35 @@
+import asyncio
+import logging
+import sys
+from datetime import timedelta
+
+from .calc import CurrencyCalculator
+
+log = logging.getLogger(__name__)
+
+
+async def refresh_periodically(
+    calculator: CurrencyCalculator,
+    interval: timedelta,
+    update: bool = True,
+    delay: timedelta = timedelta(0),
+) -> None:
+    await asyncio.sleep(delay.total_seconds())
+    while True:
+        try:
+            await calculator.refresh_async(update)
+        except Exception:
+            exc = sys.exc_info()
+            log.warning("Failed to refresh rates.", exc_info=exc)
+        try:
+            await asyncio.to_thread(calculator.compact)
+        except Exception:
+            exc = sys.exc_info()
+            log.warning("Failed to compact cache.", exc_info=exc)
+        try:
+            await asyncio.to_thread(calculator.prepare_index)
+            await asyncio.to_thread(calculator.prepare_aggregates)
+        except Exception:
+            exc = sys.exc_info()
+            log.warning("Failed to prepare rate lookups.", exc_info=exc)
+        await asyncio.sleep(interval.total_seconds())
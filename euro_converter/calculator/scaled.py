@@ -0,0 +1,182 @@
+from typing import Optional
+
+import polars as pl
+
+from ..cache.data import DECIMAL_TYPE, SCALED_RATE_TYPE
+from .utils import DIVISION_EXTRA_SCALE, RoundingMode
+
+# Intermediate results exceed 64 bits, so they are split into limbs of this base. Remainders of
+# divisions by a rate (< 10^12) times the base then still fit into a 64-bit integer.
+LIMB_DIGITS = 6
+LIMB_BASE = 10**LIMB_DIGITS
+# Results can be rounded to at most this many decimals in scaled mode.
+MAX_SCALED_DECIMALS = DECIMAL_TYPE.scale
+# Scales of the Decimal results, which are reproduced before rounding.
+PRODUCT_SCALE = 2 * DECIMAL_TYPE.scale
+QUOTIENT_SCALE = DECIMAL_TYPE.scale + DIVISION_EXTRA_SCALE
+CROSS_SCALE = 2 * DECIMAL_TYPE.scale + DIVISION_EXTRA_SCALE
+
+
+class _LimbCalculation:
+    # Intermediate values are stored as columns, so that expressions are not repeated in
+    # dependent steps.
+    def __init__(self, frame: pl.LazyFrame, prefix: str):
+        self.frame = frame
+        self.prefix = prefix
+        self.columns: list[str] = []
+
+    def add(self, *expressions: pl.Expr) -> list[pl.Expr]:
+        names = [
+            f"{self.prefix}{len(self.columns) + index}"
+            for index in range(len(expressions))
+        ]
+        self.frame = self.frame.with_columns(
+            expression.alias(name) for expression, name in zip(expressions, names)
+        )
+        self.columns.extend(names)
+        return [pl.col(name) for name in names]
+
+    def split(self, value: pl.Expr) -> list[pl.Expr]:
+        return self.add(value // LIMB_BASE, value % LIMB_BASE)
+
+    def normalize(self, limbs: list[pl.Expr]) -> list[pl.Expr]:
+        # Limbs are most significant first and not negative.
+        normalized = []
+        carry = None
+        for limb in reversed(limbs):
+            if carry is not None:
+                limb = limb + carry
+            digit, carry = self.add(limb % LIMB_BASE, limb // LIMB_BASE)
+            normalized.append(digit)
+        return [carry, *reversed(normalized)]
+
+    def divide(
+        self, limbs: list[pl.Expr], divisor: pl.Expr
+    ) -> tuple[list[pl.Expr], pl.Expr]:
+        quotient = []
+        remainder = None
+        for limb in limbs:
+            current = limb if remainder is None else remainder * LIMB_BASE + limb
+            digit, remainder = self.add(current // divisor, current % divisor)
+            quotient.append(digit)
+        return quotient, remainder
+
+
+def _with_rounded(
+    frame: pl.LazyFrame,
+    alias: str,
+    factors: list[str],
+    divisor: Optional[str],
+    scale: int,
+    decimals: int,
+    rounding: RoundingMode,
+) -> pl.LazyFrame:
+    # Reproduces the Decimal result `floor(product(factors) * 10^shift / divisor)` at the given
+    # scale, and rounds it like `get_rounded`. Adds the columns `alias` with the result scaled by
+    # 10^decimals, and `{alias}_overflow` for rows where it does not fit into 64 bits.
+    calc = _LimbCalculation(frame, f"_{alias}_")
+    value = pl.col(factors[0])
+    negative, magnitude = calc.add(value < 0, value.abs())
+    shift = scale - len(factors) * DECIMAL_TYPE.scale
+    if divisor:
+        shift += DECIMAL_TYPE.scale
+    if len(factors) == 2:
+        high, low = calc.split(magnitude)
+        rate_high, rate_low = calc.split(pl.col(factors[1]))
+        limbs = [high * rate_high, high * rate_low + low * rate_high, low * rate_low]
+        limbs = [limb * 10 ** (shift % LIMB_DIGITS) for limb in limbs]
+        limbs = calc.normalize(limbs)
+    else:
+        # Values are below 10^12, so this still fits before splitting.
+        limbs = calc.split(magnitude * 10 ** (shift % LIMB_DIGITS))
+    limbs.extend(pl.lit(0, SCALED_RATE_TYPE) for _ in range(shift // LIMB_DIGITS))
+    correction = None
+    if divisor:
+        limbs, remainder = calc.divide(limbs, pl.col(divisor))
+        # Decimal quotients are rounded toward negative infinity, i.e. away from zero here.
+        (correction,) = calc.add((negative & (remainder != 0)).cast(SCALED_RATE_TYPE))
+
+    # Splits the result into the digits that are kept and the ones that are rounded off. The
+    # latter are below 10^16 and fit into a single integer.
+    exponent = scale - decimals
+    low_limb_count, low_digits = divmod(exponent, LIMB_DIGITS)
+    if not low_digits:
+        low_limb_count, low_digits = low_limb_count - 1, LIMB_DIGITS
+    split_position = len(limbs) - low_limb_count - 1
+    *high_limbs, split_limb = limbs[: split_position + 1]
+    low = split_limb % 10**low_digits
+    for limb in limbs[split_position + 1 :]:
+        low = low * LIMB_BASE + limb
+    high_limbs = [pl.lit(0, SCALED_RATE_TYPE)] * (3 - len(high_limbs)) + high_limbs
+    *overflow_limbs, limb_2, limb_1, limb_0 = high_limbs
+    high, low = calc.add(
+        ((limb_2 * LIMB_BASE + limb_1) * LIMB_BASE + limb_0)
+        * 10 ** (LIMB_DIGITS - low_digits)
+        + split_limb // 10**low_digits,
+        low if correction is None else low + correction,
+    )
+    half = 5 * 10 ** (exponent - 1)
+    if rounding is RoundingMode.HALF_UP:
+        round_up = low >= half
+    else:
+        round_up = (low > half) | ((low == half) & (high % 2 == 1))
+    rounded = high + round_up.cast(SCALED_RATE_TYPE)
+    return calc.frame.with_columns(
+        pl.when(negative).then(-rounded).otherwise(rounded).alias(alias),
+        pl.any_horizontal(
+            limb_2 >= 10**low_digits,
+            *(limb != 0 for limb in overflow_limbs),
+        ).alias(f"{alias}_overflow"),
+    ).drop(calc.columns)
+
+
+def with_scaled_product(
+    frame: pl.LazyFrame,
+    alias: str,
+    value: str,
+    rate: str,
+    decimals: int,
+    rounding: RoundingMode = RoundingMode.HALF_EVEN,
+) -> pl.LazyFrame:
+    return _with_rounded(
+        frame, alias, [value, rate], None, PRODUCT_SCALE, decimals, rounding
+    )
+
+
+def with_scaled_quotient(
+    frame: pl.LazyFrame,
+    alias: str,
+    value: str,
+    rate: str,
+    decimals: int,
+    rounding: RoundingMode = RoundingMode.HALF_EVEN,
+) -> pl.LazyFrame:
+    return _with_rounded(
+        frame, alias, [value], rate, QUOTIENT_SCALE, decimals, rounding
+    )
+
+
+def with_scaled_cross(
+    frame: pl.LazyFrame,
+    alias: str,
+    value: str,
+    source_rate: str,
+    target_rate: str,
+    decimals: int,
+    rounding: RoundingMode = RoundingMode.HALF_EVEN,
+) -> pl.LazyFrame:
+    return _with_rounded(
+        frame,
+        alias,
+        [value, target_rate],
+        source_rate,
+        CROSS_SCALE,
+        decimals,
+        rounding,
+    )
+
+
+def get_decimal_result(scaled: pl.Expr, decimals: int) -> pl.Expr:
+    result_type = pl.Decimal(None, decimals)
+    factor = pl.lit(str(10**decimals)).cast(pl.Decimal(None, 0))
+    return (scaled.cast(result_type) / factor).cast(result_type)
@@ -1,51 +1,157 @@
+import enum
 from datetime import date
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_EVEN, ROUND_HALF_UP
 from typing import Iterable, Any, Optional
 
 import polars as pl
 
+from ..cache.data import DECIMAL_TYPE
 
-DECIMAL_TYPE = pl.Decimal(12, 6)
+# Digits that polars adds to the scale of the dividend in Decimal divisions.
+DIVISION_EXTRA_SCALE = 4
+# Common type of results when conversions from and to EUR are mixed in one column.
+MIXED_RESULT_TYPE = pl.Decimal(None, 2 * DECIMAL_TYPE.scale)
 
 
-def get_single_df(currency_date: date, value: Decimal):
+class RoundingMode(enum.Enum):
+    HALF_EVEN = "half_even"
+    HALF_UP = "half_up"
+
+
+DECIMAL_ROUNDING = {
+    RoundingMode.HALF_EVEN: ROUND_HALF_EVEN,
+    RoundingMode.HALF_UP: ROUND_HALF_UP,
+}
+
+
+def get_unscaled(value: Decimal) -> int:
+    # Truncates digits beyond the scale, like a cast to DECIMAL_TYPE.
+    return int(value.scaleb(DECIMAL_TYPE.scale))
+
+
+def _get_quotient(unscaled: int, scale: int, scaled_rate: int) -> Decimal:
+    # Floor division, as in polars.
+    quotient = (
+        unscaled * 10 ** (DIVISION_EXTRA_SCALE + DECIMAL_TYPE.scale) // scaled_rate
+    )
+    return Decimal(f"{quotient}E-{scale + DIVISION_EXTRA_SCALE}")
+
+
+def get_single_product(value: Decimal, scaled_rate: Optional[int]) -> Optional[Decimal]:
+    if scaled_rate is None:
+        return None
+    product = get_unscaled(value) * scaled_rate
+    return Decimal(f"{product}E-{2 * DECIMAL_TYPE.scale}")
+
+
+def get_single_quotient(
+    value: Decimal, scaled_rate: Optional[int]
+) -> Optional[Decimal]:
+    if scaled_rate is None:
+        return None
+    return _get_quotient(get_unscaled(value), DECIMAL_TYPE.scale, scaled_rate)
+
+
+def get_single_cross(
+    value: Decimal,
+    scaled_source_rate: Optional[int],
+    scaled_target_rate: Optional[int],
+) -> Optional[Decimal]:
+    if scaled_source_rate is None or scaled_target_rate is None:
+        return None
+    product = get_unscaled(value) * scaled_target_rate
+    return _get_quotient(product, 2 * DECIMAL_TYPE.scale, scaled_source_rate)
+
+
+def get_values_df(data: list[[date, Decimal]]) -> pl.DataFrame:
     return pl.DataFrame(
-        {"date": [currency_date], "value": [value]},
-        schema={"date": pl.Date, "value": DECIMAL_TYPE},
-    ).set_sorted("date")
+        data, schema={"date": pl.Date, "value": DECIMAL_TYPE}, orient="row"
+    )
 
 
-def get_multi_df(data: list[[date, Decimal]], add_row_index: bool = False) -> pl.DataFrame:
+def get_mixed_df(data: list[tuple[str, str, date, Decimal]]) -> pl.DataFrame:
     df = pl.DataFrame(
-        data, schema={"date": pl.Date, "value": DECIMAL_TYPE}, orient="row"
+        data,
+        schema={
+            "conversion_type": pl.Utf8,
+            "currency": pl.Utf8,
+            "date": pl.Date,
+            "value": DECIMAL_TYPE,
+        },
+        orient="row",
     )
-    if add_row_index:
-        df = df.with_row_count("idx")
-    return df.sort("date")
+    return df.with_row_index("idx").with_columns(pl.col("currency").str.to_uppercase())
 
 
-def get_single_result(df: pl.DataFrame, decimals: Optional[int] = None) -> Decimal:
-    result = df.item(0, 0)
+def get_single_result(
+    result: Optional[Decimal],
+    decimals: Optional[int] = None,
+    rounding: RoundingMode = RoundingMode.HALF_EVEN,
+) -> Optional[Decimal]:
+    if result is None:
+        return None
     if decimals is not None:
-        return round(result, decimals)
-    else:
-        return result
+        result = result.quantize(
+            Decimal(1).scaleb(-decimals), rounding=DECIMAL_ROUNDING[rounding]
+        )
+        if decimals < 0:
+            # Without exponent notation, e.g. 20 instead of 2E+1, like the results of batches.
+            result = result.quantize(Decimal(1))
+    # Decimal columns cannot hold a negative zero, so it is not returned here either, and
+    # single conversions have the same results as batches.
+    if result.is_zero():
+        return result.copy_abs()
+    return result
 
 
-def get_result_list(
-    df: pl.DataFrame, restore_sort=False, decimals: Optional[int] = None
-) -> list[tuple[date, Decimal]]:
+def get_result_df(
+    df: pl.DataFrame, restore_sort=False, sort_dates=False
+) -> pl.DataFrame:
     if restore_sort:
         df = df.sort("idx")
-    results = df.select(pl.col("date"), pl.col("result")).rows()
-    if decimals is not None:
-        return [(dt, round(value, decimals)) for dt, value in results]
+    elif sort_dates:
+        df = df.sort("date")
+    return df.select(pl.col("date"), pl.col("result"))
+
+
+def get_rounded(
+    expression: pl.Expr,
+    decimals: int,
+    rounding: RoundingMode = RoundingMode.HALF_EVEN,
+) -> pl.Expr:
+    # Same results as quantize() on Decimal objects, with half ties rounded away from zero
+    # in HALF_UP mode.
+    if decimals < 0:
+        shift = pl.lit(f"{Decimal(1).scaleb(decimals):f}").cast(
+            pl.Decimal(None, -decimals)
+        )
+        factor = pl.lit(str(10**-decimals)).cast(pl.Decimal(None, 0))
+        return get_rounded(expression * shift, 0, rounding) * factor
+    rounded_type = pl.Decimal(None, decimals)
+    truncated = expression.cast(rounded_type)
+    remainder = (expression - truncated).abs()
+    half = pl.lit(f"0.{'0' * decimals}5").cast(pl.Decimal(None, decimals + 1))
+    unit = pl.lit(f"{Decimal(1).scaleb(-decimals):f}").cast(rounded_type)
+    rounded_away = (
+        pl.when(expression < pl.lit("0").cast(rounded_type))
+        .then(truncated - unit)
+        .otherwise(truncated + unit)
+    )
+    if rounding is RoundingMode.HALF_UP:
+        round_away = remainder >= half
     else:
-        # noinspection PyTypeChecker
-        return results
+        two = pl.lit("2").cast(pl.Decimal(None, 0))
+        last_digit_odd = (truncated / two).cast(rounded_type) * two != truncated
+        round_away = (remainder > half) | ((remainder == half) & last_digit_odd)
+    return pl.when(round_away).then(rounded_away).otherwise(truncated)
+
+
+def get_result_list(df: pl.DataFrame) -> list[tuple[date, Decimal]]:
+    # noinspection PyTypeChecker
+    return get_result_df(df).rows()
 
 
-def get_parsed_rates_df(rates: Iterable[dict[str, Any]]) -> pl.DataFrame:
+def get_parsed_rates_df(rates: pl.DataFrame | Iterable[dict[str, Any]]) -> pl.DataFrame:
     df = pl.DataFrame(rates)
     selects = [
         pl.col(col_name).cast(pl.Date if col_name == "date" else DECIMAL_TYPE)
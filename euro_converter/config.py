@@ -1,16 +1,32 @@
 import os
 from dataclasses import dataclass
-from typing import Mapping
+from datetime import timedelta
+from typing import Mapping, Optional
 
 import yaml
 
 from euro_converter.cache import RatesCache
+from euro_converter.calculator import NumericMode, RoundingMode
+from euro_converter.calculator.index import DEFAULT_MEMO_SIZE
 from euro_converter.cache.filecache import FileCache
 
 
+DEFAULT_REFRESH_INTERVAL = timedelta(hours=1)
+
+
 @dataclass
 class AppConfig:
     cache: RatesCache
+    refresh_interval: Optional[timedelta] = DEFAULT_REFRESH_INTERVAL
+    refresh_update: bool = True
+    full_update_csv: bool = False
+    numeric_mode: NumericMode = NumericMode.DECIMAL
+    rounding_mode: RoundingMode = RoundingMode.HALF_EVEN
+    rates_memo_size: int = DEFAULT_MEMO_SIZE
+    metrics: bool = True
+    profiling: bool = False
+    load_on_startup: bool = True
+    calculation_workers: Optional[int] = None
 
 
 def get_removing_prefix(d: Mapping, prefix: str) -> dict:
@@ -22,6 +38,29 @@ def get_removing_prefix(d: Mapping, prefix: str) -> dict:
     }
 
 
+def get_bool(value: Optional[str], default: bool = False) -> bool:
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def get_int(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    return int(value)
+
+
+def get_interval(
+    value: Optional[str], default: Optional[timedelta] = None
+) -> Optional[timedelta]:
+    if value is None:
+        return default
+    seconds = float(value)
+    if seconds <= 0:
+        return None
+    return timedelta(seconds=seconds)
+
+
 def get_config() -> AppConfig:
     config_vars = get_removing_prefix(os.environ, "euro_converter")
     cache_config = config_vars.get("cache")
@@ -29,6 +68,18 @@ def get_config() -> AppConfig:
         if cache_config.lower() == "file":
             file_cache_config = get_removing_prefix(config_vars, "file_cache")
             cache = FileCache(**file_cache_config)
+        elif cache_config.lower() == "mapped":
+            from euro_converter.cache.mapped import MappedFileCache
+
+            mapped_cache_config = get_removing_prefix(config_vars, "mapped_file_cache")
+            cache = MappedFileCache(**mapped_cache_config)
+        elif cache_config.lower() == "partitioned":
+            from euro_converter.cache.partitioned import PartitionedFileCache
+
+            partitioned_cache_config = get_removing_prefix(
+                config_vars, "partitioned_file_cache"
+            )
+            cache = PartitionedFileCache(**partitioned_cache_config)
         elif cache_config.lower() == "redis":
             from euro_converter.cache.redis import RedisRatesCache
 
@@ -40,4 +91,20 @@ def get_config() -> AppConfig:
         cache = RatesCache()
     return AppConfig(
         cache=cache,
+        refresh_interval=get_interval(
+            config_vars.get("refresh_interval"), DEFAULT_REFRESH_INTERVAL
+        ),
+        refresh_update=get_bool(config_vars.get("refresh_update"), True),
+        full_update_csv=get_bool(config_vars.get("full_update_csv")),
+        numeric_mode=NumericMode(
+            config_vars.get("numeric_mode", NumericMode.DECIMAL.value).lower()
+        ),
+        rounding_mode=RoundingMode(
+            config_vars.get("rounding_mode", RoundingMode.HALF_EVEN.value).lower()
+        ),
+        rates_memo_size=int(config_vars.get("rates_memo_size", DEFAULT_MEMO_SIZE)),
+        metrics=get_bool(config_vars.get("metrics"), True),
+        profiling=get_bool(config_vars.get("profiling")),
+        load_on_startup=get_bool(config_vars.get("load_on_startup"), True),
+        calculation_workers=get_int(config_vars.get("calculation_workers")),
     )
@@ -1,2 +1,2 @@
-from .update import update_from_ecb
+from .update import update_from_ecb, update_from_ecb_async
 from .types import UpdateType, UpdateTimestamps, get_update_type
@@ -1,6 +1,7 @@
 from http.client import HTTPResponse
 from typing import Optional
 
+import httpx
 from requests import Session
 
 from .types import UpdateType, UpdateTimestamps
@@ -12,22 +13,34 @@ URLS = {
     UpdateType.INCREMENTAL_90_DAYS: BASE_URL.format("hist-90d"),
     UpdateType.INCREMENTAL_DAILY: BASE_URL.format("daily"),
 }
+FULL_CSV_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist.zip"
 
 default_session = Session()
+# Follows redirects like requests. No connection is opened before the first request, so this
+# can be created before workers are forked.
+default_async_client = httpx.AsyncClient(follow_redirects=True)
 
 
-def get_data(
-    update_type: UpdateType,
-    latest_timestamps: Optional[UpdateTimestamps] = None,
-    session: Optional[Session] = None,
-) -> tuple[HTTPResponse, UpdateTimestamps]:
+def get_request_headers(
+    latest_timestamps: Optional[UpdateTimestamps],
+) -> dict[str, str]:
     request_headers = {}
-    url = URLS[update_type]
     if latest_timestamps is not None:
         if modified_since := latest_timestamps.modified_since:
             request_headers["If-Modified-Since"] = modified_since
         if last_etag := latest_timestamps.etag:
             request_headers["If-None-Match"] = last_etag
+    return request_headers
+
+
+def get_data(
+    update_type: UpdateType,
+    latest_timestamps: Optional[UpdateTimestamps] = None,
+    session: Optional[Session] = None,
+    url: Optional[str] = None,
+) -> tuple[HTTPResponse, UpdateTimestamps]:
+    request_headers = get_request_headers(latest_timestamps)
+    url = url or URLS[update_type]
     session = session or default_session
     response = session.get(url, stream=True, headers=request_headers)
     if not response.ok:
@@ -38,3 +51,24 @@ def get_data(
         response.headers.get("ETag"),
     )
     return response.raw, updated_timestamps
+
+
+async def get_data_async(
+    update_type: UpdateType,
+    latest_timestamps: Optional[UpdateTimestamps] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    url: Optional[str] = None,
+) -> tuple[httpx.Response, UpdateTimestamps]:
+    # The body is read completely, so that it can be parsed outside of the event loop.
+    request_headers = get_request_headers(latest_timestamps)
+    url = url or URLS[update_type]
+    client = client or default_async_client
+    response = await client.get(url, headers=request_headers)
+    # Unlike requests, httpx also raises for a 304 response.
+    if response.is_error:
+        response.raise_for_status()
+    updated_timestamps = UpdateTimestamps(
+        response.headers.get("Last-Modified"),
+        response.headers.get("ETag"),
+    )
+    return response, updated_timestamps
@@ -1,6 +1,14 @@
+import zipfile
 from http.client import HTTPResponse
-from typing import Any, Iterator
+from io import BytesIO
+from typing import Any, BinaryIO, Iterator, Optional
 from xml.etree import ElementTree as ET
+from xml.parsers import expat
+
+import polars as pl
+
+PARSE_BUFFER_SIZE = 1 << 16
+CSV_NULL_VALUES = ["N/A", ""]
 
 
 def parse_xml(data: HTTPResponse) -> Iterator[dict[str, Any]]:
@@ -41,3 +49,83 @@ def parse_xml(data: HTTPResponse) -> Iterator[dict[str, Any]]:
             f"Last parsed data: {current_day_rates}\n"
             f"Cube tag level: {cube_level}"
         )
+
+
+class _ColumnBuffers:
+    def __init__(self):
+        self.dates: list[str] = []
+        self.currencies: dict[str, tuple[list[int], list[str]]] = {}
+
+    def start_element(self, _name: str, attrs: dict[str, str]) -> None:
+        # Only the Cube elements carry these attributes, so the tag is not checked.
+        currency = attrs.get("currency")
+        if currency is not None:
+            if not self.dates:
+                raise ValueError(f"Rate outside of a dated cube: {attrs}")
+            currency_rows = self.currencies.get(currency)
+            if currency_rows is None:
+                currency_rows = self.currencies[currency] = ([], [])
+            currency_rows[0].append(len(self.dates) - 1)
+            currency_rows[1].append(attrs["rate"])
+        elif "time" in attrs:
+            self.dates.append(attrs["time"])
+
+    def get_columns(self) -> dict[str, list[Optional[str]]]:
+        row_count = len(self.dates)
+        columns = {"date": self.dates}
+        for currency, (rows, rates) in self.currencies.items():
+            if len(rows) == row_count:
+                columns[currency] = rates
+            else:
+                # Currencies that have not been quoted on every day.
+                column = [None] * row_count
+                for row, rate in zip(rows, rates):
+                    column[row] = rate
+                columns[currency] = column
+        return columns
+
+
+def parse_xml_df(data: BinaryIO) -> pl.DataFrame:
+    buffers = _ColumnBuffers()
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = buffers.start_element
+    try:
+        while block := data.read(PARSE_BUFFER_SIZE):
+            parser.Parse(block, False)
+        parser.Parse(b"", True)
+    except expat.ExpatError as e:
+        raise ValueError(f"Malformed XML: {e}") from e
+    columns = buffers.get_columns()
+    # Columns are cast together with the cache types, see `get_parsed_rates_df`.
+    return pl.DataFrame(columns, schema={name: pl.Utf8 for name in columns})
+
+
+def _get_csv_rate(column: pl.Expr) -> pl.Expr:
+    rate = column.str.strip_chars()
+    return pl.when(rate.is_in(CSV_NULL_VALUES).not_()).then(rate)
+
+
+def parse_csv_zip(data: BinaryIO) -> pl.DataFrame:
+    # Reading a zip file requires seeking, so the (small) archive is read into memory first.
+    try:
+        with zipfile.ZipFile(BytesIO(data.read())) as archive:
+            csv_names = [name for name in archive.namelist() if name.endswith(".csv")]
+            if len(csv_names) != 1:
+                raise ValueError(
+                    f"Expected one CSV file in archive, found {csv_names}."
+                )
+            csv_data = archive.read(csv_names[0])
+        df = pl.read_csv(BytesIO(csv_data), infer_schema_length=0)
+    except (zipfile.BadZipFile, pl.PolarsError) as e:
+        raise ValueError(f"Malformed CSV archive: {e}") from e
+    # Rows end with a separator, which results in an unnamed empty column.
+    columns = {
+        name: name.strip() for name in df.columns if name.strip() and name != "Date"
+    }
+    return df.select(
+        pl.col("Date").str.strip_chars().alias("date"),
+        *(
+            _get_csv_rate(pl.col(name)).alias(currency)
+            for name, currency in columns.items()
+        ),
+    )
@@ -1,34 +1,85 @@
+import asyncio
 import logging
-from typing import Iterator, Optional, Any
+from io import BytesIO
+from typing import Optional
 
-from .download import get_data
-from .parser import parse_xml
+import polars as pl
+
+from .. import metrics
+from .download import FULL_CSV_URL, get_data, get_data_async
+from .parser import parse_csv_zip, parse_xml_df
 from .types import UpdateType, UpdateTimestamps
 
 log = logging.getLogger(__name__)
 
 
-def update_from_ecb(
-    update_type: UpdateType,
-    request_timestamps: UpdateTimestamps,
-) -> tuple[Optional[Iterator[dict[str, Any]]], UpdateTimestamps]:
+def _log_request(
+    update_type: UpdateType, use_csv: bool, request_timestamps: UpdateTimestamps
+) -> None:
     log.info(
-        "Request %s update. Timestamp: %s; ETag: %s",
+        "Request %s update%s. Timestamp: %s; ETag: %s",
         update_type.value,
+        " from CSV" if use_csv else "",
         request_timestamps.modified_since if request_timestamps else None,
         request_timestamps.etag if request_timestamps else None,
     )
-    response, response_timestamps = get_data(update_type, request_timestamps)
+
+
+def _log_response(
+    update_type: UpdateType, status: int, response_timestamps: UpdateTimestamps
+) -> None:
+    metrics.count_ecb_response(update_type.value, status)
     if response_timestamps:
         log.info(
             "Response %d. Timestamp: %s; ETag: %s",
-            response.status,
+            status,
             response_timestamps.modified_since,
             response_timestamps.etag,
         )
+
+
+def update_from_ecb(
+    update_type: UpdateType,
+    request_timestamps: UpdateTimestamps,
+    full_update_csv: bool = False,
+) -> tuple[Optional[pl.DataFrame], UpdateTimestamps]:
+    use_csv = full_update_csv and update_type is UpdateType.FULL
+    _log_request(update_type, use_csv, request_timestamps)
+    with metrics.stage("download"):
+        response, response_timestamps = get_data(
+            update_type, request_timestamps, url=FULL_CSV_URL if use_csv else None
+        )
+    _log_response(update_type, response.status, response_timestamps)
     if response.status == 304:
         log.info("Skipping update.")
         return None, response_timestamps
     else:
         log.info("Received update.")
-        return parse_xml(response), response_timestamps
+        parse = parse_csv_zip if use_csv else parse_xml_df
+        # The body is streamed, so this includes most of the transfer.
+        with metrics.stage("parse"):
+            return parse(response), response_timestamps
+
+
+async def update_from_ecb_async(
+    update_type: UpdateType,
+    request_timestamps: UpdateTimestamps,
+    full_update_csv: bool = False,
+) -> tuple[Optional[pl.DataFrame], UpdateTimestamps]:
+    use_csv = full_update_csv and update_type is UpdateType.FULL
+    _log_request(update_type, use_csv, request_timestamps)
+    with metrics.stage("download"):
+        response, response_timestamps = await get_data_async(
+            update_type, request_timestamps, url=FULL_CSV_URL if use_csv else None
+        )
+    _log_response(update_type, response.status_code, response_timestamps)
+    if response.status_code == 304:
+        log.info("Skipping update.")
+        return None, response_timestamps
+    else:
+        log.info("Received update.")
+        parse = parse_csv_zip if use_csv else parse_xml_df
+        # The body has already been downloaded, only parsing is blocking.
+        with metrics.stage("parse"):
+            data = await asyncio.to_thread(parse, BytesIO(response.content))
+        return data, response_timestamps
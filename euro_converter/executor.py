@@ -0,0 +1,37 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+
+class CalculationExecutor:
+    # Runs CPU-bound work outside of the event loop, on at most `max_workers` threads. Further
+    # calls wait in the queue, instead of competing for the CPU in more threads.
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or DEFAULT_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created again after a shutdown, e.g. when the app is started more than once in tests.
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="calculation"
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        # Context variables, e.g. for metrics and profiling, are passed on to the thread.
+        call = partial(copy_context().run, func, *args, **kwargs)
+        return await loop.run_in_executor(self._get_executor(), call)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
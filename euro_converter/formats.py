@@ -0,0 +1,388 @@
+import enum
+import json
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from io import BytesIO
+from typing import Annotated, AsyncIterator, Optional, Sequence
+
+import polars as pl
+from fastapi.exceptions import RequestValidationError
+from pydantic import AfterValidator, Field, TypeAdapter, ValidationError
+from starlette.responses import StreamingResponse
+from starlette.types import Scope, Receive, Send
+
+from euro_converter.calculator.utils import DECIMAL_TYPE, get_values_df
+
+
+# Values that fit the decimal type of batches, instead of being truncated, or failing when the
+# frame is built. Trailing zeros beyond the scale are only removed by some of the validators.
+BatchValue = Annotated[
+    Decimal,
+    Field(max_digits=DECIMAL_TYPE.precision, decimal_places=DECIMAL_TYPE.scale),
+    AfterValidator(
+        lambda value: value.quantize(Decimal(1).scaleb(-DECIMAL_TYPE.scale))
+    ),
+]
+DATES_VALUES_ADAPTER = TypeAdapter(list[tuple[date, BatchValue]])
+DATES_VALUES_COLUMNS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "dates": {"type": "array", "items": {"type": "string", "format": "date"}},
+        "values": {
+            "type": "array",
+            "items": {"anyOf": [{"type": "number"}, {"type": "string"}]},
+        },
+    },
+    "required": ["dates", "values"],
+}
+STREAM_CHUNK_ROWS = 10_000
+CSV_HEADER = b"date,value\n"
+# Fixed-point numbers with non-zero digits beyond the scale of the decimal type.
+EXCESS_SCALE_PATTERN = rf"\.\d{{{DECIMAL_TYPE.scale}}}\d*[1-9]"
+
+
+class StreamFormat(enum.Enum):
+    NDJSON = "application/x-ndjson"
+    CSV = "text/csv"
+
+
+class FrameFormat(enum.Enum):
+    JSON = "application/json"
+    ARROW_STREAM = "application/vnd.apache.arrow.stream"
+    ARROW_FILE = "application/vnd.apache.arrow.file"
+    PARQUET = "application/vnd.apache.parquet"
+
+
+class FormatError(ValueError):
+    pass
+
+
+@dataclass
+class LineChunk:
+    lines: list[bytes]
+    # Numbers of the lines in the stream, starting at 1, which skip blank lines.
+    line_numbers: list[int]
+
+
+class BodyStreamingResponse(StreamingResponse):
+    # Streams results while the request body is still being read. The default implementation
+    # would consume body messages from `receive` while waiting for a disconnect.
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def get_stream_format(content_type: Optional[str]) -> StreamFormat:
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    if media_type == StreamFormat.CSV.value:
+        return StreamFormat.CSV
+    return StreamFormat.NDJSON
+
+
+def _get_media_types(header: Optional[str]) -> list[str]:
+    return [
+        media_range.split(";", 1)[0].strip().lower()
+        for media_range in (header or "").split(",")
+    ]
+
+
+def get_request_frame_format(content_type: Optional[str]) -> FrameFormat:
+    media_type = _get_media_types(content_type)[0]
+    for frame_format in FrameFormat:
+        if frame_format.value == media_type:
+            return frame_format
+    return FrameFormat.JSON
+
+
+def get_response_frame_format(accept: Optional[str]) -> FrameFormat:
+    for media_type in _get_media_types(accept):
+        for frame_format in FrameFormat:
+            if frame_format.value == media_type:
+                return frame_format
+    return FrameFormat.JSON
+
+
+async def iter_line_chunks(
+    byte_stream: AsyncIterator[bytes], chunk_rows: int = STREAM_CHUNK_ROWS
+) -> AsyncIterator[list[bytes]]:
+    pending = b""
+    lines = []
+    line_numbers = []
+    line_count = 0
+    async for block in byte_stream:
+        *complete, pending = (pending + block).split(b"\n")
+        for line in complete:
+            line_count += 1
+            if line.strip():
+                lines.append(line)
+                line_numbers.append(line_count)
+        while len(lines) >= chunk_rows:
+            yield LineChunk(lines[:chunk_rows], line_numbers[:chunk_rows])
+            lines = lines[chunk_rows:]
+            line_numbers = line_numbers[chunk_rows:]
+    if pending.strip():
+        lines.append(pending)
+        line_numbers.append(line_count + 1)
+    if lines:
+        yield LineChunk(lines, line_numbers)
+
+
+def _get_fixed_point(value: Optional[str]) -> Optional[str]:
+    try:
+        number = Decimal(value.strip())
+    except (AttributeError, InvalidOperation):
+        return None
+    return f"{number:f}" if number.is_finite() else None
+
+
+def _get_location(index: int, line_numbers: Optional[Sequence[int]]) -> str:
+    if line_numbers is None:
+        return f"index {index}"
+    return f"line {line_numbers[index]}"
+
+
+def _cast_values_df(
+    df: pl.DataFrame, line_numbers: Optional[Sequence[int]] = None
+) -> pl.DataFrame:
+    value = pl.col("value").str.strip_chars().cast(DECIMAL_TYPE, strict=False)
+    result = df.select(
+        pl.col("date").str.strip_chars().str.to_date("%Y-%m-%d", strict=False),
+        value,
+    )
+    invalid = (df["value"].is_not_null() & result["value"].is_null()).arg_true()
+    if len(invalid):
+        # Polars does not cast numbers in exponent notation, e.g. 1e3, which are parsed like
+        # in the other readers instead.
+        values = df["value"].scatter(
+            invalid, [_get_fixed_point(df["value"][index]) for index in invalid]
+        )
+        result = result.with_columns(values.to_frame().select(value))
+    else:
+        values = df["value"]
+    # Reports the first entry that could not be cast, instead of failing on the column.
+    for column in ("date", "value"):
+        invalid = (df[column].is_not_null() & result[column].is_null()).arg_true()
+        if len(invalid):
+            index = invalid[0]
+            location = _get_location(index, line_numbers)
+            raise FormatError(f"Invalid {column} at {location}: {df[column][index]!r}")
+    # The cast truncates digits beyond the scale, which would silently change the values.
+    excess_scale = values.str.contains(EXCESS_SCALE_PATTERN).fill_null(False).arg_true()
+    if len(excess_scale):
+        index = excess_scale[0]
+        location = _get_location(index, line_numbers)
+        raise FormatError(
+            f"Value at {location} has more than {DECIMAL_TYPE.scale} decimal places: "
+            f"{df['value'][index]!r}"
+        )
+    return result
+
+
+def read_json_columns(columns: dict) -> pl.DataFrame:
+    dates = columns.get("dates")
+    values = columns.get("values")
+    if not isinstance(dates, list) or not isinstance(values, list):
+        raise FormatError("Expected lists of 'dates' and 'values'.")
+    if len(dates) != len(values):
+        raise FormatError(f"Got {len(dates)} dates, but {len(values)} values.")
+    df = pl.DataFrame(
+        {"date": dates, "value": values},
+        schema={"date": pl.Utf8, "value": pl.Utf8},
+    )
+    # Entries that are not strings, or numbers parsed as strings, end up as nulls.
+    for column, entries in (("date", dates), ("value", values)):
+        invalid = df[column].is_null().arg_true()
+        if len(invalid):
+            index = invalid[0]
+            raise FormatError(f"Invalid {column} at index {index}: {entries[index]!r}")
+    return _cast_values_df(df)
+
+
+def read_ndjson_chunk(
+    lines: list[bytes], line_numbers: Optional[Sequence[int]] = None
+) -> pl.DataFrame:
+    dates = []
+    values = []
+    for index, line in enumerate(lines):
+        try:
+            row = json.loads(line, parse_float=str, parse_int=str)
+            if isinstance(row, dict):
+                row = row["date"], row["value"]
+            row_date, row_value = row
+        except (ValueError, KeyError, TypeError) as e:
+            location = _get_location(index, line_numbers)
+            raise FormatError(
+                f"Invalid entry at {location}: {line[:100]!r}: {e}"
+            ) from e
+        dates.append(str(row_date))
+        values.append(str(row_value))
+    return _cast_values_df(
+        pl.DataFrame(
+            {"date": dates, "value": values},
+            schema={"date": pl.Utf8, "value": pl.Utf8},
+        ),
+        line_numbers,
+    )
+
+
+def read_csv_chunk(
+    lines: list[bytes], line_numbers: Optional[Sequence[int]] = None
+) -> pl.DataFrame:
+    try:
+        df = pl.read_csv(
+            BytesIO(b"\n".join(lines)),
+            has_header=False,
+            new_columns=["date", "value"],
+            dtypes=[pl.Utf8, pl.Utf8],
+        )
+    except pl.PolarsError as e:
+        if line_numbers:
+            location = f" in lines {line_numbers[0]}-{line_numbers[-1]}"
+        else:
+            location = ""
+        raise FormatError(f"Invalid CSV data{location}: {e}") from e
+    return _cast_values_df(df, line_numbers)
+
+
+def is_csv_header(line: bytes) -> bool:
+    return line.split(b",", 1)[0].strip().strip(b'"').lower() == b"date"
+
+
+def write_stream_error(stream_format: StreamFormat, message: str) -> bytes:
+    # Ends a stream whose status code has already been sent, as a last record that cannot be
+    # mistaken for a result.
+    if stream_format is StreamFormat.CSV:
+        escaped = message.replace('"', '""')
+        return f'error,"{escaped}"\n'.encode()
+    return (json.dumps({"error": message}) + "\n").encode()
+
+
+def get_decimal_strings(column: str, dtype: pl.Decimal) -> pl.Expr:
+    # Keeps all digits of the scale, which polars omits for integral values.
+    text = pl.col(column).cast(pl.Utf8)
+    if not dtype.scale:
+        return text
+    return (
+        pl.when(text.str.contains(".", literal=True))
+        .then(text)
+        .otherwise(text + f".{'0' * dtype.scale}")
+    )
+
+
+def _get_json_value(df: pl.DataFrame) -> pl.Expr:
+    value = get_decimal_strings("result", df.schema["result"])
+    return pl.concat_str(pl.lit('"'), value, pl.lit('"')).fill_null("null")
+
+
+def _write_joined(df: pl.DataFrame, separator: str, *parts: pl.Expr) -> str:
+    return df.select(pl.concat_str(*parts).str.concat(separator)).item()
+
+
+def write_ndjson_chunk(df: pl.DataFrame) -> bytes:
+    if df.is_empty():
+        return b""
+    return _write_joined(
+        df,
+        "",
+        pl.lit('{"date": "'),
+        pl.col("date").cast(pl.Utf8),
+        pl.lit('", "value": '),
+        _get_json_value(df),
+        pl.lit("}\n"),
+    ).encode()
+
+
+def write_json_results(df: pl.DataFrame) -> bytes:
+    # Same layout as the JSON responses of FastAPI, with decimals at the scale of the result.
+    rows = _write_joined(
+        df,
+        ",",
+        pl.lit('["'),
+        pl.col("date").cast(pl.Utf8),
+        pl.lit('",'),
+        _get_json_value(df),
+        pl.lit("]"),
+    )
+    return f"[{rows}]".encode()
+
+
+def write_csv_chunk(df: pl.DataFrame) -> bytes:
+    if df.is_empty():
+        return b""
+    value = get_decimal_strings("result", df.schema["result"])
+    return _write_joined(
+        df,
+        "",
+        pl.col("date").cast(pl.Utf8),
+        pl.lit(","),
+        value.fill_null(""),
+        pl.lit("\n"),
+    ).encode()
+
+
+def read_json_values(body: bytes) -> list[tuple[date, Decimal]]:
+    try:
+        return DATES_VALUES_ADAPTER.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [
+                {**error, "loc": ("body", *error["loc"])}
+                for error in e.errors(include_url=False)
+            ]
+        )
+
+
+def read_json_frame(body: bytes) -> pl.DataFrame:
+    # Columnar bodies are cast in bulk. Lists of tuples are validated by pydantic.
+    if body.lstrip()[:1] != b"{":
+        return get_values_df(read_json_values(body))
+    try:
+        columns = json.loads(body, parse_float=str, parse_int=str)
+    except ValueError as e:
+        raise FormatError(f"Invalid JSON data: {e}") from e
+    return read_json_columns(columns)
+
+
+def read_frame(body: bytes, frame_format: FrameFormat) -> pl.DataFrame:
+    try:
+        df = FRAME_READERS[frame_format](BytesIO(body))
+    except (pl.PolarsError, OSError) as e:
+        raise FormatError(f"Invalid {frame_format.value} data: {e}") from e
+    missing_columns = {"date", "value"}.difference(df.columns)
+    if missing_columns:
+        raise FormatError(f"Missing columns: {', '.join(sorted(missing_columns))}")
+    date_column = pl.col("date")
+    if df.schema["date"] == pl.Utf8:
+        date_column = date_column.str.to_date("%Y-%m-%d")
+    try:
+        return df.select(date_column.cast(pl.Date), pl.col("value").cast(DECIMAL_TYPE))
+    except pl.PolarsError as e:
+        raise FormatError(f"Invalid date or value: {e}") from e
+
+
+def write_frame(df: pl.DataFrame, frame_format: FrameFormat) -> bytes:
+    buffer = BytesIO()
+    FRAME_WRITERS[frame_format](df, buffer)
+    return buffer.getvalue()
+
+
+FRAME_READERS = {
+    FrameFormat.ARROW_STREAM: pl.read_ipc_stream,
+    FrameFormat.ARROW_FILE: pl.read_ipc,
+    FrameFormat.PARQUET: pl.read_parquet,
+}
+FRAME_WRITERS = {
+    FrameFormat.ARROW_STREAM: pl.DataFrame.write_ipc_stream,
+    FrameFormat.ARROW_FILE: pl.DataFrame.write_ipc,
+    FrameFormat.PARQUET: pl.DataFrame.write_parquet,
+}
+CHUNK_READERS = {
+    StreamFormat.NDJSON: read_ndjson_chunk,
+    StreamFormat.CSV: read_csv_chunk,
+}
+CHUNK_WRITERS = {
+    StreamFormat.NDJSON: write_ndjson_chunk,
+    StreamFormat.CSV: write_csv_chunk,
+}
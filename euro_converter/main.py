@@ -1,86 +1,526 @@
-from datetime import date
+import asyncio
+import logging
+import sys
+from contextlib import asynccontextmanager, suppress
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import Optional
+from functools import partial
+from typing import Callable, Optional, TypeVar
 
 import uvicorn
-from fastapi import FastAPI
+import polars as pl
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
 
-from euro_converter.calculator import CurrencyCalculator, ConversionType
+from euro_converter import metrics, profiling
+from euro_converter.calculator import (
+    AggregatePeriod,
+    CurrencyCalculator,
+    ConversionType,
+    RatesUnavailableError,
+    RoundingMode,
+    UnknownCurrencyError,
+)
+from euro_converter.calculator.refresh import refresh_periodically
+from euro_converter.calculator.utils import get_result_list
 from euro_converter.config import get_config
+from euro_converter.executor import CalculationExecutor
+from euro_converter.formats import (
+    BatchValue,
+    BodyStreamingResponse,
+    CHUNK_READERS,
+    CHUNK_WRITERS,
+    CSV_HEADER,
+    DATES_VALUES_ADAPTER,
+    DATES_VALUES_COLUMNS_SCHEMA,
+    FRAME_READERS,
+    FormatError,
+    FrameFormat,
+    LineChunk,
+    StreamFormat,
+    get_request_frame_format,
+    get_response_frame_format,
+    get_stream_format,
+    is_csv_header,
+    iter_line_chunks,
+    read_frame,
+    read_json_frame,
+    write_frame,
+    write_json_results,
+    write_stream_error,
+)
+
+T = TypeVar("T")
 
+log = logging.getLogger(__name__)
+
+# Nothing is loaded on import: with gunicorn --preload, the module is imported before workers
+# are forked, and polars cannot be used in a child process after its thread pool was started.
 app_config = get_config()
+calculator = CurrencyCalculator(
+    cache=app_config.cache,
+    refresh_in_background=app_config.refresh_interval is not None,
+    full_update_csv=app_config.full_update_csv,
+    numeric_mode=app_config.numeric_mode,
+    rounding_mode=app_config.rounding_mode,
+    rates_memo_size=app_config.rates_memo_size,
+)
+metrics.REGISTRY.enabled = app_config.metrics
+profiles = profiling.ProfileStore()
+executor = CalculationExecutor(app_config.calculation_workers)
+RESULTS_ADAPTER = TypeAdapter(list[tuple[date, Optional[Decimal]]])
+RATES_ADAPTER = TypeAdapter(list[tuple[date, Decimal]])
+AGGREGATES_ADAPTER = TypeAdapter(list[tuple[date, Decimal, Decimal, Decimal]])
+
+
+def get_refresh_delay(interval: timedelta) -> timedelta:
+    data = calculator.data
+    if data is None:
+        return timedelta(0)
+    return max(data.last_update + interval - datetime.utcnow(), timedelta(0))
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Runs in each worker, before it accepts requests.
+    if app_config.load_on_startup:
+        try:
+            await calculator.load_async(app_config.refresh_update)
+        except Exception:
+            exc = sys.exc_info()
+            log.warning("Failed to load rates on startup.", exc_info=exc)
+    tasks = [asyncio.create_task(calculator.cache.listen(calculator.prepare_index))]
+    if app_config.refresh_interval is not None:
+        tasks.append(
+            asyncio.create_task(
+                refresh_periodically(
+                    calculator,
+                    app_config.refresh_interval,
+                    app_config.refresh_update,
+                    get_refresh_delay(app_config.refresh_interval),
+                )
+            )
+        )
+    yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    executor.shutdown()
+
 
 app = FastAPI(
     title="Euro Converter",
     version="0.1.0",
+    lifespan=lifespan,
 )
-calculator = CurrencyCalculator(cache=app_config.cache)
+
+
+async def profile_request(request: Request, call_next) -> Response:
+    if not request.headers.get(profiling.PROFILE_HEADER):
+        return await call_next(request)
+    profile = profiling.RequestProfile(request.method, request.url.path)
+    # Streamed response bodies are still generated after this returns, and are only
+    # included in the stored profile.
+    with profiling.activate(profile):
+        response = await call_next(request)
+    profiles.add(profile)
+    response.headers["Server-Timing"] = profile.get_server_timing()
+    response.headers[profiling.PROFILE_ID_HEADER] = profile.id
+    return response
+
+
+@app.exception_handler(RatesUnavailableError)
+async def rates_unavailable(_request: Request, exc: RatesUnavailableError):
+    # Same status as /ready, e.g. when neither the cache nor the ECB could be read.
+    return JSONResponse({"detail": str(exc)}, status_code=503)
+
+
+@app.exception_handler(UnknownCurrencyError)
+async def unknown_currency(_request: Request, exc: UnknownCurrencyError):
+    return JSONResponse({"detail": str(exc)}, status_code=404)
+
+
+if app_config.profiling:
+    # Not added otherwise, so that requests are not affected at all.
+    app.middleware("http")(profile_request)
+
+BATCH_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            FrameFormat.JSON.value: {
+                "schema": {
+                    "anyOf": [
+                        DATES_VALUES_ADAPTER.json_schema(),
+                        DATES_VALUES_COLUMNS_SCHEMA,
+                    ]
+                }
+            },
+            **{
+                frame_format.value: {"schema": {"type": "string", "format": "binary"}}
+                for frame_format in FRAME_READERS
+            },
+        },
+    },
+}
+
+
+def get_json_response(result: pl.DataFrame) -> Response:
+    return Response(write_json_results(result), media_type=FrameFormat.JSON.value)
+
+
+def get_model_response(adapter: TypeAdapter, content) -> Response:
+    # Same output as the response model, but serialized outside of the event loop.
+    return Response(adapter.dump_json(content), media_type=FrameFormat.JSON.value)
+
+
+async def run_single(func: Callable[..., T], *args, **kwargs) -> T:
+    # Single conversions take microseconds and are answered on the event loop, unless the
+    # rates need to be loaded first, or lookups to be built for replaced data.
+    if calculator.needs_cache_check or not calculator.index_ready:
+        return await executor.run(func, *args, **kwargs)
+    return func(*args, **kwargs)
 
 
 @app.get("/")
-def root() -> str:
+async def root() -> str:
     return "ok"
 
 
+@app.get("/ready")
+async def ready(response: Response) -> bool:
+    is_ready = calculator.ready
+    if not is_ready:
+        response.status_code = 503
+    return is_ready
+
+
+@app.get("/stats")
+async def stats() -> dict[str, dict[str, Optional[int]]]:
+    return {"rates_memo": calculator.rates_memo.get_stats()}
+
+
+@app.get("/metrics")
+async def get_metrics() -> Response:
+    metrics.set_memo_stats(calculator.rates_memo.get_stats())
+    return Response(metrics.REGISTRY.write(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str) -> dict:
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {profile_id}")
+    return profile.to_dict()
+
+
 @app.post("/update")
-def update() -> bool:
-    return calculator.update()
+async def update() -> bool:
+    # Mostly waiting for the download, which does not need to hold a calculation thread.
+    return await calculator.update_async()
 
 
 @app.get("/to-{currency}/{currency_date}/{value}")
-def convert_to_currency(
+async def convert_to_currency(
     currency: str,
     currency_date: date,
     value: Decimal,
     decimals: Optional[int] = 3,
-) -> Decimal:
-    return calculator.convert(
-        ConversionType.TO, currency, currency_date, value, decimals=decimals
+    rounding: Optional[RoundingMode] = None,
+) -> Optional[Decimal]:
+    return await run_single(
+        calculator.convert,
+        ConversionType.TO,
+        currency,
+        currency_date,
+        value,
+        decimals=decimals,
+        rounding=rounding,
     )
 
 
 @app.get("/from-{currency}/{currency_date}/{value}")
-def convert_from_currency(
+async def convert_from_currency(
     currency: str,
     currency_date: date,
     value: Decimal,
     decimals: Optional[int] = 3,
-) -> Decimal:
-    return calculator.convert(
-        ConversionType.FROM, currency, currency_date, value, decimals=decimals
+    rounding: Optional[RoundingMode] = None,
+) -> Optional[Decimal]:
+    return await run_single(
+        calculator.convert,
+        ConversionType.FROM,
+        currency,
+        currency_date,
+        value,
+        decimals=decimals,
+        rounding=rounding,
     )
 
 
-@app.post("/to-{currency}")
-def convert_multi_to_currency(
+async def convert_batch(
+    request: Request,
+    convert_frame: Callable[[pl.DataFrame], pl.DataFrame],
+    fast_json: bool,
+):
+    request_format = get_request_frame_format(request.headers.get("content-type"))
+    response_format = get_response_frame_format(request.headers.get("accept"))
+    body = await request.body()
+
+    def convert():
+        with metrics.operation("batch_request"):
+            with metrics.stage("read"):
+                if request_format is FrameFormat.JSON:
+                    data = read_json_frame(body)
+                else:
+                    data = read_frame(body, request_format)
+            result = convert_frame(data)
+            with metrics.stage("write"):
+                if response_format is FrameFormat.JSON:
+                    if fast_json:
+                        return get_json_response(result)
+                    return get_model_response(RESULTS_ADAPTER, get_result_list(result))
+                return Response(
+                    write_frame(result.rename({"result": "value"}), response_format),
+                    media_type=response_format.value,
+                )
+
+    try:
+        return await executor.run(convert)
+    except FormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post(
+    "/to-{currency}",
+    response_model=list[tuple[date, Optional[Decimal]]],
+    openapi_extra=BATCH_OPENAPI,
+)
+async def convert_multi_to_currency(
     currency: str,
-    dates_values: list[tuple[date, Decimal]],
+    request: Request,
     keep_order: Optional[bool] = True,
     decimals: Optional[int] = 3,
-) -> list[tuple[date, Decimal]]:
-    return calculator.convert_multiple(
+    rounding: Optional[RoundingMode] = None,
+    fast_json: Optional[bool] = False,
+):
+    convert_frame = partial(
+        calculator.convert_frame,
         ConversionType.TO,
         currency,
-        dates_values,
         keep_order=keep_order,
         decimals=decimals,
+        rounding=rounding,
     )
+    return await convert_batch(request, convert_frame, fast_json)
 
 
-@app.post("/from-{currency}")
-def convert_multi_from_currency(
+@app.post(
+    "/from-{currency}",
+    response_model=list[tuple[date, Optional[Decimal]]],
+    openapi_extra=BATCH_OPENAPI,
+)
+async def convert_multi_from_currency(
     currency: str,
-    dates_values: list[tuple[date, Decimal]],
+    request: Request,
     keep_order: Optional[bool] = True,
     decimals: Optional[int] = 3,
-) -> list[tuple[date, Decimal]]:
-    return calculator.convert_multiple(
+    rounding: Optional[RoundingMode] = None,
+    fast_json: Optional[bool] = False,
+):
+    convert_frame = partial(
+        calculator.convert_frame,
         ConversionType.FROM,
         currency,
-        dates_values,
         keep_order=keep_order,
         decimals=decimals,
+        rounding=rounding,
     )
+    return await convert_batch(request, convert_frame, fast_json)
+
+
+async def convert_stream(
+    conversion_type: ConversionType,
+    currency: str,
+    request: Request,
+    decimals: Optional[int],
+    rounding: Optional[RoundingMode],
+) -> BodyStreamingResponse:
+    stream_format = get_stream_format(request.headers.get("content-type"))
+    read_chunk = CHUNK_READERS[stream_format]
+    write_chunk = CHUNK_WRITERS[stream_format]
+
+    def convert_chunk(chunk: LineChunk) -> bytes:
+        if not chunk.lines:
+            return b""
+        with metrics.operation("stream_chunk"):
+            with metrics.stage("read"):
+                data = read_chunk(chunk.lines, chunk.line_numbers)
+            result = calculator.convert_frame(
+                conversion_type, currency, data, decimals=decimals, rounding=rounding
+            )
+            with metrics.stage("write"):
+                return write_chunk(result)
+
+    line_chunks = iter_line_chunks(request.stream())
+    first_chunk = await anext(line_chunks, LineChunk([], []))
+    if (
+        stream_format is StreamFormat.CSV
+        and first_chunk.lines
+        and is_csv_header(first_chunk.lines[0])
+    ):
+        first_chunk = LineChunk(first_chunk.lines[1:], first_chunk.line_numbers[1:])
+    try:
+        # Errors in the first chunk can still be reported with a status code.
+        first_result = await executor.run(convert_chunk, first_chunk)
+    except FormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def generate_results():
+        if stream_format is StreamFormat.CSV:
+            yield CSV_HEADER
+        yield first_result
+        async for chunk in line_chunks:
+            try:
+                result = await executor.run(convert_chunk, chunk)
+            except (FormatError, RatesUnavailableError, UnknownCurrencyError) as e:
+                yield write_stream_error(stream_format, str(e))
+                return
+            yield result
+
+    return BodyStreamingResponse(generate_results(), media_type=stream_format.value)
+
+
+@app.post("/to-{currency}/stream")
+async def convert_stream_to_currency(
+    currency: str,
+    request: Request,
+    decimals: Optional[int] = 3,
+    rounding: Optional[RoundingMode] = None,
+) -> BodyStreamingResponse:
+    return await convert_stream(
+        ConversionType.TO, currency, request, decimals, rounding
+    )
+
+
+@app.post("/from-{currency}/stream")
+async def convert_stream_from_currency(
+    currency: str,
+    request: Request,
+    decimals: Optional[int] = 3,
+    rounding: Optional[RoundingMode] = None,
+) -> BodyStreamingResponse:
+    return await convert_stream(
+        ConversionType.FROM, currency, request, decimals, rounding
+    )
+
+
+@app.get("/rates/{currency}", response_model=list[tuple[date, Decimal]])
+async def get_rates(
+    currency: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    def get_response() -> Optional[Response]:
+        rates = calculator.get_rates(currency, start, end)
+        if rates is None:
+            return None
+        return get_model_response(RATES_ADAPTER, rates)
+
+    response = await executor.run(get_response)
+    if response is None:
+        raise HTTPException(status_code=404, detail=f"Unknown currency: {currency}")
+    return response
+
+
+@app.get(
+    "/rates/{currency}/{period}",
+    response_model=list[tuple[date, Decimal, Decimal, Decimal]],
+)
+async def get_rate_aggregates(
+    currency: str,
+    period: AggregatePeriod,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    def get_response() -> Optional[Response]:
+        aggregates = calculator.get_rate_aggregates(currency, period, start, end)
+        if aggregates is None:
+            return None
+        return get_model_response(AGGREGATES_ADAPTER, aggregates)
+
+    response = await executor.run(get_response)
+    if response is None:
+        raise HTTPException(status_code=404, detail=f"Unknown currency: {currency}")
+    return response
+
+
+@app.get("/from-{source_currency}/to-{target_currency}/{currency_date}/{value}")
+async def convert_cross_currency(
+    source_currency: str,
+    target_currency: str,
+    currency_date: date,
+    value: Decimal,
+    decimals: Optional[int] = 3,
+    rounding: Optional[RoundingMode] = None,
+) -> Optional[Decimal]:
+    return await run_single(
+        calculator.convert_cross,
+        source_currency,
+        target_currency,
+        currency_date,
+        value,
+        decimals=decimals,
+        rounding=rounding,
+    )
+
+
+@app.post(
+    "/from-{source_currency}/to-{target_currency}",
+    response_model=list[tuple[date, Optional[Decimal]]],
+    openapi_extra=BATCH_OPENAPI,
+)
+async def convert_multi_cross_currency(
+    source_currency: str,
+    target_currency: str,
+    request: Request,
+    keep_order: Optional[bool] = True,
+    decimals: Optional[int] = 3,
+    rounding: Optional[RoundingMode] = None,
+    fast_json: Optional[bool] = False,
+):
+    convert_frame = partial(
+        calculator.convert_frame_cross,
+        source_currency,
+        target_currency,
+        keep_order=keep_order,
+        decimals=decimals,
+        rounding=rounding,
+    )
+    return await convert_batch(request, convert_frame, fast_json)
+
+
+@app.post("/convert", response_model=list[tuple[date, Optional[Decimal]]])
+async def convert_mixed(
+    conversions: list[tuple[ConversionType, str, date, BatchValue]],
+    decimals: Optional[int] = 3,
+    rounding: Optional[RoundingMode] = None,
+    fast_json: Optional[bool] = False,
+):
+    def convert() -> Response:
+        if fast_json:
+            result = calculator.convert_mixed_frame(
+                conversions, decimals=decimals, rounding=rounding
+            )
+            return get_json_response(result)
+        results = calculator.convert_mixed(
+            conversions, decimals=decimals, rounding=rounding
+        )
+        return get_model_response(RESULTS_ADAPTER, results)
+
+    return await executor.run(convert)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,315 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from .profiling import get_profile
+
+# Metrics are collected per process, in the text format read by Prometheus.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+TIME_BUCKETS = (
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+)
+BYTES_BUCKETS = tuple(1024 * 4**exponent for exponent in range(11))
+ROWS_BUCKETS = tuple(10**exponent for exponent in range(8))
+
+_operation: ContextVar[Optional[str]] = ContextVar("operation", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    formatted = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return f"{{{formatted}}}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _get_key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Expected labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _get_samples(
+        self, key: tuple[str, ...], value
+    ) -> list[tuple[str, dict, float]]:
+        return [(self.name, dict(zip(self.label_names, key)), value)]
+
+    def write(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        with self._lock:
+            values = [(key, self._copy(value)) for key, value in self._values.items()]
+        for key, value in sorted(values):
+            for name, labels, sample in self._get_samples(key, value):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(sample)}")
+        return lines
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._get_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple = (),
+        buckets: tuple = TIME_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = (*buckets, math.inf)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._get_key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # Counts per bucket, followed by the sum of all values.
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    @staticmethod
+    def _copy(value):
+        return list(value)
+
+    def _get_samples(
+        self, key: tuple[str, ...], value
+    ) -> list[tuple[str, dict, float]]:
+        labels = dict(zip(self.label_names, key))
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, value):
+            cumulative += count
+            samples.append(
+                (
+                    f"{self.name}_bucket",
+                    {**labels, "le": _format_value(bound)},
+                    cumulative,
+                )
+            )
+        samples.append((f"{self.name}_sum", labels, value[-1]))
+        samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self.enabled = True
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def write(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.write())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self.metrics:
+            metric.clear()
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "euro_converter_stage_seconds",
+        "Duration of the stages of calculator operations.",
+        ("operation", "stage"),
+    )
+)
+BATCH_ROWS = REGISTRY.register(
+    Histogram(
+        "euro_converter_batch_rows",
+        "Number of rows converted in one batch.",
+        ("operation",),
+        buckets=ROWS_BUCKETS,
+    )
+)
+CACHE_SECONDS = REGISTRY.register(
+    Histogram(
+        "euro_converter_cache_seconds",
+        "Duration of loading from and saving to the cache.",
+        ("backend", "action"),
+    )
+)
+CACHE_BYTES = REGISTRY.register(
+    Histogram(
+        "euro_converter_cache_bytes",
+        "Size of the rates read from or written to the cache.",
+        ("backend", "action"),
+        buckets=BYTES_BUCKETS,
+    )
+)
+CACHE_RELOADS = REGISTRY.register(
+    Counter(
+        "euro_converter_cache_reloads_total",
+        "Number of times that changed data was loaded from the cache.",
+        ("backend",),
+    )
+)
+ECB_RESPONSES = REGISTRY.register(
+    Counter(
+        "euro_converter_ecb_responses_total",
+        "Responses to update requests to the ECB, by status code.",
+        ("update_type", "status"),
+    )
+)
+RATES_MEMO = REGISTRY.register(
+    Gauge(
+        "euro_converter_rates_memo",
+        "Statistics of the memoized single rate lookups.",
+        ("stat",),
+    )
+)
+
+
+def get_operation() -> Optional[str]:
+    return _operation.get()
+
+
+@contextmanager
+def operation(name: str, on_event_loop: bool = False) -> Iterator[None]:
+    # Stages are recorded for the innermost operation. Operations on the event loop are not
+    # profiled, as the profile of the thread would include all other tasks.
+    token = _operation.set(name)
+    profile = get_profile()
+    try:
+        if profile is None or on_event_loop:
+            yield
+        else:
+            with profile.profile_thread():
+                yield
+    finally:
+        _operation.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    current = _operation.get()
+    profile = get_profile()
+    if current is None or (not REGISTRY.enabled and profile is None):
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        if REGISTRY.enabled:
+            STAGE_SECONDS.observe(seconds, operation=current, stage=name)
+        if profile is not None:
+            profile.add_stage(current, name, seconds)
+
+
+def observe_batch(rows: int) -> None:
+    current = _operation.get()
+    if current is not None and REGISTRY.enabled:
+        BATCH_ROWS.observe(rows, operation=current)
+
+
+@contextmanager
+def cache_action(backend: str, action: str) -> Iterator[None]:
+    if not REGISTRY.enabled:
+        yield
+        return
+    with CACHE_SECONDS.time(backend=backend, action=action):
+        yield
+
+
+def observe_cache_bytes(backend: str, action: str, size: int) -> None:
+    if REGISTRY.enabled:
+        CACHE_BYTES.observe(size, backend=backend, action=action)
+
+
+def count_cache_reload(backend: str) -> None:
+    if REGISTRY.enabled:
+        CACHE_RELOADS.inc(backend=backend)
+
+
+def count_ecb_response(update_type: str, status: int) -> None:
+    if REGISTRY.enabled:
+        ECB_RESPONSES.inc(update_type=update_type, status=str(status))
+
+
+def set_memo_stats(stats: dict[str, Optional[int]]) -> None:
+    for stat, value in stats.items():
+        if value is not None:
+            RATES_MEMO.set(value, stat=stat)
@@ -0,0 +1,201 @@
+import cProfile
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+import polars as pl
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+DEFAULT_MAX_PROFILES = 50
+HOT_SPOTS = 25
+PROFILER_BUSY_NOTE = (
+    "Python functions were not profiled for some operations, while another operation was "
+    "being profiled."
+)
+PROFILER_UNAVAILABLE_NOTE = (
+    "Python functions were not profiled, because another profiler is active."
+)
+# From Python 3.12, cProfile uses sys.monitoring, which observes all threads.
+ALL_THREADS_NOTE = (
+    "Python functions of other requests running at the same time may be included."
+)
+
+_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("profile", default=None)
+# Only one profiler can be active in a process from Python 3.12, so operations are profiled
+# one at a time, also on older versions.
+_profiler_lock = threading.Lock()
+
+
+def get_profile() -> Optional["RequestProfile"]:
+    return _profile.get()
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.duration: Optional[float] = None
+        self.stages: list[tuple[Optional[str], str, float]] = []
+        self.plans: list[dict] = []
+        self.stats: Optional[pstats.Stats] = None
+        self.notes: list[str] = []
+        self._started = time.perf_counter()
+        self._profiled_threads: set[int] = set()
+        self._lock = threading.Lock()
+
+    def add_note(self, note: str) -> None:
+        with self._lock:
+            if note not in self.notes:
+                self.notes.append(note)
+
+    def add_stage(self, operation: Optional[str], stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.append((operation, stage, seconds))
+
+    def collect(self, frame: pl.LazyFrame, operation: Optional[str]) -> pl.DataFrame:
+        # Same result as `collect`, with the optimized plan and the time spent in each node.
+        plan = frame.explain()
+        df, timings = frame.profile()
+        with self._lock:
+            self.plans.append(
+                {
+                    "operation": operation,
+                    "plan": plan,
+                    "nodes": [
+                        {"node": node, "start_us": start, "end_us": end}
+                        for node, start, end in timings.rows()
+                    ],
+                }
+            )
+        return df
+
+    @contextmanager
+    def profile_thread(self) -> Iterator[None]:
+        # Calculator operations run in worker threads, and only one of them is profiled at a
+        # time. Nested operations are included in the outermost one.
+        thread_id = threading.get_ident()
+        with self._lock:
+            nested = thread_id in self._profiled_threads
+        if nested:
+            yield
+            return
+        if not _profiler_lock.acquire(blocking=False):
+            self.add_note(PROFILER_BUSY_NOTE)
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            _profiler_lock.release()
+            self.add_note(PROFILER_UNAVAILABLE_NOTE)
+            yield
+            return
+        if sys.version_info >= (3, 12):
+            self.add_note(ALL_THREADS_NOTE)
+        with self._lock:
+            self._profiled_threads.add(thread_id)
+        try:
+            yield
+        finally:
+            profiler.disable()
+            _profiler_lock.release()
+            with self._lock:
+                self._profiled_threads.discard(thread_id)
+                if self.stats is None:
+                    self.stats = pstats.Stats(profiler)
+                else:
+                    self.stats.add(profiler)
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._started
+
+    def get_stage_totals(self) -> dict[str, float]:
+        totals = {}
+        with self._lock:
+            for operation, stage, seconds in self.stages:
+                name = f"{operation}.{stage}" if operation else stage
+                totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def get_server_timing(self) -> str:
+        entries = [
+            f"{name.replace('.', '-')};dur={seconds * 1000:.3f}"
+            for name, seconds in self.get_stage_totals().items()
+        ]
+        if self.duration is not None:
+            entries.append(f"total;dur={self.duration * 1000:.3f}")
+        return ", ".join(entries)
+
+    def get_hot_spots(self, limit: int = HOT_SPOTS) -> list[dict]:
+        with self._lock:
+            if self.stats is None:
+                return []
+            entries = sorted(
+                self.stats.stats.items(), key=lambda item: item[1][2], reverse=True
+            )
+        return [
+            {
+                "function": pstats.func_std_string(function),
+                "calls": calls,
+                "own_seconds": own_time,
+                "cumulative_seconds": cumulative_time,
+            }
+            for function, (_, calls, own_time, cumulative_time, _) in entries[:limit]
+        ]
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = [
+                {"operation": operation, "stage": stage, "seconds": seconds}
+                for operation, stage, seconds in self.stages
+            ]
+            plans = list(self.plans)
+            notes = list(self.notes)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "seconds": self.duration,
+            "stages": stages,
+            "stage_totals": self.get_stage_totals(),
+            "query_plans": plans,
+            "hot_spots": self.get_hot_spots(),
+            "notes": notes,
+        }
+
+
+@contextmanager
+def activate(profile: RequestProfile) -> Iterator[RequestProfile]:
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+        profile.finish()
+
+
+class ProfileStore:
+    # Most recent profiles by id; the oldest ones are dropped.
+    def __init__(self, max_size: int = DEFAULT_MAX_PROFILES):
+        self.max_size = max_size
+        self._profiles: OrderedDict[str, RequestProfile] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_size:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator, Optional
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class LocalPipeline:
+    def __init__(self, client: "LocalRedis", transaction: bool):
+        self.client = client
+        self.transaction = transaction
+        self.calls = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self.client, name)
+
+        def queue(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> list:
+        calls, self.calls = self.calls, []
+        if not self.transaction:
+            return [method(*args, **kwargs) for method, args, kwargs in calls]
+        # Commands of a transaction are not interleaved with any others.
+        with self.client._lock:
+            return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+class LocalRedis:
+    # In-process stand-in for the commands used by RedisRatesCache, with the same bytes
+    # semantics. Published messages are only recorded, and do not reach any subscribers.
+    def __init__(self):
+        self.values: dict[str, bytes] = {}
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.published: list[tuple[str, bytes]] = []
+        self._lock = threading.RLock()
+        self._update_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self.values.get(key)
+
+    def set(self, key: str, value) -> bool:
+        with self._lock:
+            self.values[key] = _encode(value)
+        return True
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self.values.get(key, b"0")) + 1
+            self.values[key] = _encode(value)
+        return value
+
+    def hset(self, key: str, mapping: dict) -> int:
+        with self._lock:
+            values = self.hashes.setdefault(key, {})
+            values.update({_encode(k): _encode(v) for k, v in mapping.items()})
+        return len(mapping)
+
+    def hgetall(self, key: str) -> dict[bytes, bytes]:
+        with self._lock:
+            return dict(self.hashes.get(key, {}))
+
+    def publish(self, channel: str, message) -> int:
+        self.published.append((channel, _encode(message)))
+        return 0
+
+    def pipeline(self, transaction: bool = True) -> LocalPipeline:
+        return LocalPipeline(self, transaction)
+
+    @contextmanager
+    def lock(self, name: str, timeout=None, blocking_timeout=None) -> Iterator[None]:
+        with self._update_lock:
+            yield
+
+
+class LocalAsyncPipeline:
+    def __init__(self, pipeline: LocalPipeline):
+        self.pipeline = pipeline
+
+    async def __aenter__(self) -> "LocalAsyncPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+    def __getattr__(self, name: str):
+        # Commands are queued without awaiting them, like in redis.asyncio.
+        queue = getattr(self.pipeline, name)
+
+        def queue_async(*args, **kwargs):
+            queue(*args, **kwargs)
+            return self
+
+        return queue_async
+
+    async def execute(self) -> list:
+        return self.pipeline.execute()
+
+
+class LocalAsyncRedis:
+    # Async interface to the same data as a LocalRedis instance, like redis.asyncio.Redis.
+    def __init__(self, client: LocalRedis):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    async def publish(self, channel: str, message) -> int:
+        return self.client.publish(channel, message)
+
+    def pipeline(self, transaction: bool = True) -> LocalAsyncPipeline:
+        return LocalAsyncPipeline(self.client.pipeline(transaction))
+
+    @asynccontextmanager
+    async def lock(
+        self, name: str, timeout=None, blocking_timeout=None
+    ) -> AsyncIterator[None]:
+        # Polls like the Redis lock, without blocking the event loop.
+        while not self.client._update_lock.acquire(blocking=False):
+            await asyncio.sleep(0.001)
+        try:
+            yield
+        finally:
+            self.client._update_lock.release()
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime
+
+from euro_converter.cache import filecache
+from euro_converter.cache.filecache import FileCache
+from tests.calculator.fixtures import rates_data  # noqa
+
+
+def test_update_lock(tmp_path):
+    lock_name = str(tmp_path / "update.lock")
+    events = []
+    acquired = threading.Event()
+
+    def hold_lock():
+        with FileCache(lock_name=lock_name).update_lock():
+            acquired.set()
+            time.sleep(0.2)
+            events.append("first released")
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    acquired.wait()
+    with FileCache(lock_name=lock_name).update_lock():
+        events.append("second acquired")
+    thread.join()
+    assert events == ["first released", "second acquired"]
+
+
+def test_update_lock_async(tmp_path):
+    lock_name = str(tmp_path / "update.lock")
+    events = []
+
+    async def hold_lock():
+        async with FileCache(lock_name=lock_name).update_lock_async():
+            events.append("first acquired")
+            await asyncio.sleep(0.2)
+            events.append("first released")
+
+    async def wait_for_lock():
+        await asyncio.sleep(0.05)
+        # Waiting does not block the event loop, so the first task can release the lock.
+        async with FileCache(lock_name=lock_name).update_lock_async():
+            events.append("second acquired")
+
+    async def run():
+        await asyncio.gather(hold_lock(), wait_for_lock())
+
+    asyncio.run(run())
+    assert events == ["first acquired", "first released", "second acquired"]
+
+
+def get_file_cache(tmp_path) -> FileCache:
+    return FileCache(
+        data_name=str(tmp_path / "data.parquet"),
+        timestamps_name=str(tmp_path / "last_timestamps.json"),
+    )
+
+
+def test_save_load(rates_data, tmp_path):
+    cache = get_file_cache(tmp_path)
+    cache.data = rates_data
+    cache.save()
+    assert sorted(os.listdir(tmp_path)) == ["data.parquet", "last_timestamps.json"]
+
+    loaded_cache = get_file_cache(tmp_path)
+    loaded_cache.load()
+    assert loaded_cache.data.last_update == rates_data.last_update
+    assert loaded_cache.data.rates.equals(rates_data.rates)
+
+
+def test_save_load_async(rates_data, tmp_path):
+    cache = get_file_cache(tmp_path)
+    cache.data = rates_data
+    asyncio.run(cache.save_async())
+
+    loaded_cache = get_file_cache(tmp_path)
+    asyncio.run(loaded_cache.load_async())
+    assert loaded_cache.data.last_update == rates_data.last_update
+    assert loaded_cache.data.rates.equals(rates_data.rates)
+
+
+def test_load_unchanged(rates_data, tmp_path, monkeypatch):
+    cache = get_file_cache(tmp_path)
+    cache.data = rates_data
+    cache.save()
+    loaded_cache = get_file_cache(tmp_path)
+    load_calls = []
+    load_data = loaded_cache.load_data
+    monkeypatch.setattr(
+        loaded_cache, "load_data", lambda: load_calls.append(1) or load_data()
+    )
+    loaded_cache.load()
+    loaded_cache.load()
+    assert len(load_calls) == 1
+
+    cache.data = replace(rates_data, last_update=datetime(2023, 1, 6, 12))
+    cache.save()
+    loaded_cache.load()
+    assert len(load_calls) == 2
+    assert loaded_cache.data.last_update == datetime(2023, 1, 6, 12)
+
+
+def test_load_mismatched_timestamps(rates_data, tmp_path, monkeypatch):
+    delays = []
+    monkeypatch.setattr(filecache.time, "sleep", delays.append)
+    cache = get_file_cache(tmp_path)
+    cache.data = rates_data
+    cache.save()
+    # Simulates reading while another process has replaced the data, but not the timestamps.
+    other_cache = get_file_cache(tmp_path)
+    other_cache.save_data(rates_data.rates.head(2))
+
+    loaded_cache = get_file_cache(tmp_path)
+    loaded_cache.load()
+    assert loaded_cache.data is None
+    assert delays == [0.05, 0.1, 0.2]
+
+
+def test_load_while_saving(rates_data, tmp_path, monkeypatch):
+    cache = get_file_cache(tmp_path)
+    cache.data = rates_data
+    cache.save()
+    other_cache = get_file_cache(tmp_path)
+    other_cache.data = replace(rates_data, last_update=datetime(2023, 1, 6, 12))
+    other_cache.save_data(rates_data.rates.head(2))
+    delays = []
+
+    def sleep(seconds):
+        # The other process finishes saving while this one waits.
+        delays.append(seconds)
+        other_cache.save_timestamps(other_cache.get_timestamp_dict(other_cache.data))
+
+    monkeypatch.setattr(filecache.time, "sleep", sleep)
+    loaded_cache = get_file_cache(tmp_path)
+    loaded_cache.load()
+    assert delays == [0.05]
+    assert loaded_cache.data.last_update == datetime(2023, 1, 6, 12)
+    assert len(loaded_cache.data.rates) == 2
@@ -0,0 +1,124 @@
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+import polars as pl
+import pytest
+
+from euro_converter.cache import RatesCache, RatesCacheData
+from euro_converter.cache.data import DECIMAL_TYPE, SCALED_RATE_TYPE, get_decimal_rate
+from euro_converter.cache.mapped import MappedFileCache
+from euro_converter.calculator import CurrencyCalculator, ConversionType
+from tests.calculator.fixtures import RATES_ROWS, rates_data  # noqa
+
+
+def test_save_load(rates_data, tmp_path):
+    cache = MappedFileCache(
+        data_name=str(tmp_path / "data.arrow"),
+        timestamps_name=str(tmp_path / "last_timestamps.json"),
+    )
+    cache.data = rates_data
+    cache.save()
+    assert sorted(os.listdir(tmp_path)) == ["data.arrow", "last_timestamps.json"]
+
+    loaded_cache = MappedFileCache(
+        data_name=str(tmp_path / "data.arrow"),
+        timestamps_name=str(tmp_path / "last_timestamps.json"),
+    )
+    loaded_cache.load()
+    loaded_data = loaded_cache.data
+    assert loaded_data.last_update == rates_data.last_update
+    assert loaded_data.rates.schema == {
+        "date": pl.Date,
+        "CAA": SCALED_RATE_TYPE,
+        "CBB": SCALED_RATE_TYPE,
+        "CCC": SCALED_RATE_TYPE,
+    }
+    assert loaded_data.rates.row(1) == (date(2023, 1, 4), 2010000, 6000001, 500001)
+
+
+def test_save_maps_data(rates_data, tmp_path):
+    cache = MappedFileCache(
+        data_name=str(tmp_path / "data.arrow"),
+        timestamps_name=str(tmp_path / "last_timestamps.json"),
+    )
+    cache.data = rates_data
+    cache.save()
+    assert cache.data is not rates_data
+    assert cache.data.last_update == rates_data.last_update
+    assert cache.data.rates["CAA"].dtype == SCALED_RATE_TYPE
+    assert cache.data.rates.row(1) == (date(2023, 1, 4), 2010000, 6000001, 500001)
+
+
+def test_convert_mapped(rates_data, tmp_path):
+    cache = MappedFileCache(
+        data_name=str(tmp_path / "data.arrow"),
+        timestamps_name=str(tmp_path / "last_timestamps.json"),
+    )
+    cache.data = rates_data
+    cache.save()
+    cache.load()
+    calc = CurrencyCalculator(cache, refresh_in_background=True)
+    values = [(date(2023, 1, 4), Decimal("1")), (date(2023, 1, 1), Decimal("-2.5"))]
+    assert calc.convert_multiple(ConversionType.FROM, "CBB", values) == [
+        (date(2023, 1, 4), Decimal("0.1666666388")),
+        (date(2023, 1, 1), Decimal("-0.8333333334")),
+    ]
+    assert calc.convert(
+        ConversionType.FROM, "CBB", date(2023, 1, 4), Decimal("1")
+    ) == Decimal("0.1666666388")
+
+
+def _get_calculator(rates: pl.DataFrame) -> CurrencyCalculator:
+    cache = RatesCache()
+    cache.data = RatesCacheData(
+        rates=rates, last_update=datetime(2017, 10, 16), last_timestamps={}
+    )
+    return CurrencyCalculator(cache, refresh_in_background=True)
+
+
+def _get_anonymous_memory() -> int:
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Anonymous:"):
+                return int(line.split()[1]) * 1024
+
+
+@pytest.mark.skipif(
+    not os.path.exists("/proc/self/smaps_rollup"), reason="Linux memory statistics"
+)
+def test_prepare_index_shares_mapping(tmp_path):
+    dates = pl.date_range(date(2000, 1, 3), date(2017, 10, 16), eager=True)
+    rates = pl.DataFrame({"date": dates}).with_columns(
+        get_decimal_rate(pl.int_range(0, len(dates)) * 7 + 1000000 + i).alias(
+            f"C{i:02d}"
+        )
+        for i in range(41)
+    )
+    cache = MappedFileCache(
+        data_name=str(tmp_path / "data.arrow"),
+        timestamps_name=str(tmp_path / "last_timestamps.json"),
+    )
+    cache.data = RatesCacheData(
+        rates=rates, last_update=datetime(2017, 10, 16), last_timestamps={}
+    )
+    # The saving process maps the file it wrote, like the other ones.
+    cache.save()
+    calc = CurrencyCalculator(cache, refresh_in_background=True)
+    before = _get_anonymous_memory()
+    calc.prepare_index()
+    # Rates are read from the mapped file, instead of being copied into each process.
+    assert _get_anonymous_memory() - before < os.path.getsize(tmp_path / "data.arrow")
+    assert (
+        calc._index.get_scaled_column("C01")._get_buffer_info()
+        == cache.data.rates["C01"]._get_buffer_info()
+    )
+
+    decimal_calc = _get_calculator(rates)
+    for size in [10, 20_000]:
+        values = pl.DataFrame(
+            {"date": dates.gather(pl.int_range(0, size, eager=True) % len(dates))}
+        ).with_columns(value=pl.lit("1.5").cast(DECIMAL_TYPE))
+        assert calc.convert_frame(ConversionType.FROM, "C01", values).equals(
+            decimal_calc.convert_frame(ConversionType.FROM, "C01", values)
+        )
@@ -0,0 +1,85 @@
+import os
+from dataclasses import replace
+from datetime import date, datetime
+from decimal import Decimal
+
+import polars as pl
+
+from euro_converter.cache.partitioned import PartitionedFileCache
+from tests.calculator.fixtures import RATES_SCHEMA, rates_data  # noqa
+
+UPDATED_ROWS = [
+    {
+        "date": date(2023, 1, 5),
+        "CAA": Decimal("2.030000"),
+        "CBB": None,
+        "CCC": Decimal("0.500003"),
+    },
+    {
+        "date": date(2024, 1, 2),
+        "CAA": Decimal("2.100000"),
+        "CBB": Decimal("3.100000"),
+        "CCC": Decimal("0.510000"),
+    },
+]
+
+
+def get_partitioned_cache(tmp_path, **kwargs) -> PartitionedFileCache:
+    return PartitionedFileCache(
+        data_name=str(tmp_path / "data"),
+        timestamps_name=str(tmp_path / "last_timestamps.json"),
+        **kwargs,
+    )
+
+
+def save_update(cache: PartitionedFileCache) -> pl.DataFrame:
+    updated = pl.DataFrame(UPDATED_ROWS, schema=RATES_SCHEMA)
+    cache.data = replace(
+        cache.data,
+        rates=cache.data.rates.update(updated, on="date", how="outer").sort("date"),
+        last_update=datetime(2024, 1, 2, 16),
+    )
+    cache.save(updated)
+    return cache.data.rates
+
+
+def test_save_load(rates_data, tmp_path):
+    cache = get_partitioned_cache(tmp_path)
+    cache.data = rates_data
+    cache.save()
+    assert os.listdir(tmp_path / "data") == ["2023.1.parquet"]
+
+    expected_rates = save_update(cache)
+    assert sorted(os.listdir(tmp_path / "data")) == [
+        "2023.1.parquet",
+        "log.2.parquet",
+    ]
+    assert expected_rates.row(2) == (
+        date(2023, 1, 5),
+        Decimal("2.030000"),
+        Decimal("3.000002"),
+        Decimal("0.500003"),
+    )
+
+    loaded_cache = get_partitioned_cache(tmp_path)
+    loaded_cache.load()
+    assert loaded_cache.data.last_update == datetime(2024, 1, 2, 16)
+    assert loaded_cache.data.rates.equals(expected_rates)
+
+
+def test_compact(rates_data, tmp_path):
+    cache = get_partitioned_cache(tmp_path, compact_after=1)
+    cache.data = rates_data
+    cache.save()
+    expected_rates = save_update(cache)
+
+    compacting_cache = get_partitioned_cache(tmp_path, compact_after=1)
+    compacting_cache.compact()
+    assert sorted(os.listdir(tmp_path / "data")) == [
+        "2023.3.parquet",
+        "2024.3.parquet",
+    ]
+
+    cache.load()
+    assert cache.partitions["log"] == []
+    assert cache.data.rates.equals(expected_rates)
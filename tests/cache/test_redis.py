@@ -0,0 +1,205 @@
+import asyncio
+import threading
+from dataclasses import replace
+from datetime import datetime
+
+from tests.cache.local_redis import LocalAsyncRedis, LocalRedis
+from euro_converter.cache import redis as redis_cache
+from euro_converter.cache.redis import RedisRatesCache
+from euro_converter.calculator import CurrencyCalculator
+from euro_converter.ecb import UpdateTimestamps, UpdateType
+from tests.calculator.fixtures import rates_data  # noqa
+
+
+class TransactionRedis(LocalRedis):
+    def __init__(self):
+        super().__init__()
+        self.transactions: list[list[str]] = []
+
+    def pipeline(self, transaction: bool = True):
+        pipeline = super().pipeline(transaction)
+        if transaction:
+            # Same list as the queued commands, until the pipeline is executed.
+            self.transactions.append(pipeline.calls)
+        return pipeline
+
+
+def get_redis_cache(client: LocalRedis) -> RedisRatesCache:
+    cache = RedisRatesCache()
+    cache.cache = client
+    cache.async_cache = LocalAsyncRedis(client)
+    return cache
+
+
+def test_save_load(rates_data):
+    client = TransactionRedis()
+    cache = get_redis_cache(client)
+    cache.data = replace(
+        rates_data,
+        last_timestamps={"incremental-daily": UpdateTimestamps(etag='"abc"')},
+    )
+    cache.save()
+    (transaction,) = client.transactions
+    assert [method.__name__ for method, _, _ in transaction] == [
+        "set",
+        "set",
+        "hset",
+        "incr",
+    ]
+    assert client.published == [("rates_updates", b"1")]
+    assert cache.loaded_generation == b"1"
+
+    loaded_cache = get_redis_cache(client)
+    loaded_cache.load()
+    assert loaded_cache.loaded_generation == b"1"
+    assert loaded_cache.data.last_update == rates_data.last_update
+    assert loaded_cache.data.last_timestamps == {
+        "incremental-daily": UpdateTimestamps(etag='"abc"')
+    }
+    assert loaded_cache.data.rates.equals(rates_data.rates)
+
+
+def test_load_generation(rates_data):
+    client = TransactionRedis()
+    cache = get_redis_cache(client)
+    cache.data = rates_data
+    cache.save()
+
+    loaded_cache = get_redis_cache(client)
+    loaded_cache.load()
+    # Generation, data and timestamps are read in one transaction.
+    assert [method.__name__ for method, _, _ in client.transactions[-1]] == [
+        "get",
+        "get",
+        "get",
+        *["hgetall"] * len(UpdateType),
+    ]
+    loaded_data = loaded_cache.data
+    transactions = len(client.transactions)
+    loaded_cache.load()
+    assert len(client.transactions) == transactions
+    assert loaded_cache.data is loaded_data
+
+    cache.data = replace(rates_data, last_update=datetime(2023, 1, 6))
+    cache.save()
+    assert client.published[-1] == ("rates_updates", b"2")
+    loaded_cache.load()
+    assert len(client.transactions) == transactions + 2
+    assert loaded_cache.loaded_generation == b"2"
+    assert loaded_cache.data.last_update == datetime(2023, 1, 6)
+
+
+def test_save_load_async(rates_data):
+    client = TransactionRedis()
+    cache = get_redis_cache(client)
+    cache.data = rates_data
+    asyncio.run(cache.save_async())
+    (transaction,) = client.transactions
+    assert [method.__name__ for method, _, _ in transaction] == ["set", "set", "incr"]
+    assert client.published == [("rates_updates", b"1")]
+    assert cache.loaded_generation == b"1"
+
+    # Same data as with the blocking client.
+    loaded_cache = get_redis_cache(client)
+    loaded_cache.load()
+    assert loaded_cache.data.rates.equals(rates_data.rates)
+    async_cache = get_redis_cache(client)
+    asyncio.run(async_cache.load_async())
+    assert async_cache.loaded_generation == b"1"
+    assert async_cache.data.last_update == rates_data.last_update
+    assert async_cache.data.rates.equals(rates_data.rates)
+    loaded_data = async_cache.data
+    transactions = len(client.transactions)
+    asyncio.run(async_cache.load_async())
+    assert len(client.transactions) == transactions
+    assert async_cache.data is loaded_data
+
+
+class FakePubSub:
+    def __init__(self, messages: list[dict]):
+        self.messages = messages
+        self.channels = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def subscribe(self, channel: str):
+        self.channels.append(channel)
+
+    async def listen(self):
+        for message in self.messages:
+            yield message
+        await asyncio.Event().wait()
+
+
+class FakeAsyncRedis:
+    def __init__(self, pubsub: FakePubSub):
+        self._pubsub = pubsub
+        self.closed = False
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> FakePubSub:
+        return self._pubsub
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_listen(rates_data, monkeypatch):
+    client = LocalRedis()
+    cache = get_redis_cache(client)
+    cache.data = rates_data
+    cache.save()
+
+    listening_cache = get_redis_cache(client)
+    calc = CurrencyCalculator(listening_cache, refresh_in_background=True)
+    threads = []
+    load_async = listening_cache.load_async
+    prepare_index = calc.prepare_index
+
+    async def record_load():
+        threads.append(("load", threading.get_ident()))
+        await load_async()
+
+    monkeypatch.setattr(listening_cache, "load_async", record_load)
+    monkeypatch.setattr(
+        calc,
+        "prepare_index",
+        lambda: threads.append(("prepare", threading.get_ident())) or prepare_index(),
+    )
+    pubsub = FakePubSub(
+        [
+            {"type": "message", "data": b"1"},
+            # Already loaded, therefore skipped.
+            {"type": "message", "data": b"1"},
+        ]
+    )
+    async_client = FakeAsyncRedis(pubsub)
+    monkeypatch.setattr(redis_cache.async_redis, "Redis", lambda **_: async_client)
+
+    async def run():
+        task = asyncio.create_task(listening_cache.listen(calc.prepare_index))
+        for _ in range(100):
+            if len(threads) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(run())
+    assert pubsub.channels == ["rates_updates"]
+    assert async_client.closed
+    # Data is read on the event loop, and lookups are prepared in a thread.
+    assert [name for name, _ in threads] == ["load", "prepare"]
+    assert threads[0][1] == loop_thread
+    assert threads[1][1] != loop_thread
+    assert listening_cache.loaded_generation == b"1"
+    assert listening_cache.data.rates.equals(rates_data.rates)
+    assert calc.index_ready
@@ -1,3 +1,6 @@
+import asyncio
+from contextlib import contextmanager
+from dataclasses import replace
 from datetime import datetime, date
 from decimal import Decimal
 
@@ -7,7 +10,15 @@ import polars as pl
 from freezegun import freeze_time
 
 from euro_converter.cache import RatesCache, RatesCacheData
-from euro_converter.calculator import CurrencyCalculator, ConversionType
+from euro_converter.calculator import (
+    AggregatePeriod,
+    CurrencyCalculator,
+    ConversionType,
+    NumericMode,
+    RatesUnavailableError,
+    UnknownCurrencyError,
+)
+from euro_converter.calculator.utils import get_values_df
 from euro_converter.ecb import UpdateTimestamps, UpdateType
 from tests.calculator.fixtures import (
     RATES_ROWS,
@@ -24,6 +35,9 @@ from tests.calculator.fixtures import (
         pytest.param(
             RATES_ROWS[:1], datetime(2022, 1, 1), RATES_DATA, UpdateType.FULL, id="full"
         ),
+        pytest.param(
+            RATES_ROWS[:1], datetime(2022, 1, 1), None, UpdateType.FULL, id="full-none"
+        ),
         pytest.param(
             RATES_ROWS[:1],
             datetime(2023, 1, 1),
@@ -47,19 +61,32 @@ from tests.calculator.fixtures import (
         ),
     ],
 )
+@pytest.mark.parametrize("asynchronous", [False, True], ids=["sync", "async"])
 def test_update(
-    init_rates, last_update, update_rates, expected_update_type, monkeypatch
+    init_rates,
+    last_update,
+    update_rates,
+    expected_update_type,
+    asynchronous,
+    monkeypatch,
 ):
     update_args = []
 
-    def update_func(*args):
+    def update_func(*args, **kwargs):
         update_args.extend(args)
         return update_rates, UpdateTimestamps(modified_since="test2")
 
+    async def update_func_async(*args, **kwargs):
+        return update_func(*args, **kwargs)
+
     monkeypatch.setattr(
         "euro_converter.calculator.calc.update_from_ecb",
         update_func,
     )
+    monkeypatch.setattr(
+        "euro_converter.calculator.calc.update_from_ecb_async",
+        update_func_async,
+    )
     update_time = datetime.fromisoformat("2023-01-05T12:01:00")
     cache = RatesCache()
     cache.data = RatesCacheData(
@@ -71,11 +98,11 @@ def test_update(
     )
     with freeze_time(update_time):
         calc = CurrencyCalculator(cache)
-        update_done = calc.update()
-    if expected_update_type is UpdateType.FULL:
-        assert update_args == [UpdateType.FULL, None]
-    else:
-        assert update_args == [expected_update_type, UpdateTimestamps(modified_since="test1")]
+        if asynchronous:
+            update_done = asyncio.run(calc.update_async())
+        else:
+            update_done = calc.update()
+    assert update_args == [expected_update_type, UpdateTimestamps(modified_since="test1")]
 
     assert calc.data.rates is not None
     if update_rates is not None:
@@ -87,12 +114,9 @@ def test_update(
         assert calc.data.rates.rows(named=True) == RATES_ROWS[:1]
         assert calc.data.last_update == last_update
     assert calc.last_cache_check == update_time
-    if expected_update_type is UpdateType.FULL:
-        assert calc.data.last_timestamps == {}
-    else:
-        assert calc.data.last_timestamps == {
-            expected_update_type.value: UpdateTimestamps(modified_since="test2")
-        }
+    assert calc.data.last_timestamps == {
+        expected_update_type.value: UpdateTimestamps(modified_since="test2")
+    }
 
 
 @pytest.mark.parametrize(
@@ -277,3 +301,403 @@ def test_convert_multiple(
         conversion_type, input_currency, input_values, keep_order, input_decimals
     )
     assert result == expected_result
+
+
+@pytest.mark.parametrize("conversion_type", [ConversionType.TO, ConversionType.FROM])
+@pytest.mark.parametrize("input_currency", ["CAA", "CBB", "CCC"])
+@pytest.mark.parametrize(
+    "input_date",
+    [
+        date(2022, 12, 31),
+        date(2023, 1, 1),
+        date(2023, 1, 3),
+        date(2023, 1, 5),
+        date(2024, 1, 1),
+    ],
+)
+@pytest.mark.parametrize(
+    "input_value",
+    [
+        Decimal("1"),
+        Decimal("-2"),
+        Decimal("0.123456"),
+        Decimal("-1.999999"),
+        Decimal("123456.5"),
+    ],
+)
+@pytest.mark.parametrize("input_decimals", [None, 3, -1, -2])
+def test_convert_single_matches_multiple(
+    conversion_type,
+    input_currency,
+    input_date,
+    input_value,
+    input_decimals,
+    updated_calculator,
+):
+    result = updated_calculator.convert(
+        conversion_type, input_currency, input_date, input_value, input_decimals
+    )
+    [(_, expected_result)] = updated_calculator.convert_multiple(
+        conversion_type,
+        input_currency,
+        [(input_date, input_value)],
+        decimals=input_decimals,
+    )
+    assert str(result) == str(expected_result)
+
+
+@pytest.mark.parametrize("numeric_mode", list(NumericMode))
+@pytest.mark.parametrize(
+    "input_value, expected_result",
+    [
+        (Decimal("-0.0002"), "0.000"),
+        (Decimal("-0.0003"), "-0.001"),
+        (Decimal("-0"), "0.000"),
+    ],
+)
+def test_convert_negative_zero(numeric_mode, input_value, expected_result, rates_data):
+    cache = RatesCache()
+    cache.data = rates_data
+    calc = CurrencyCalculator(
+        cache, refresh_in_background=True, numeric_mode=numeric_mode
+    )
+    # Rounds to zero from a negative result, which is returned without a sign.
+    result = calc.convert(
+        ConversionType.TO, "CAA", date(2023, 1, 1), input_value, decimals=3
+    )
+    [(_, multiple_result)] = calc.convert_multiple(
+        ConversionType.TO, "CAA", [(date(2023, 1, 1), input_value)], decimals=3
+    )
+    assert str(result) == expected_result
+    assert str(multiple_result) == expected_result
+
+
+@pytest.mark.parametrize("keep_order", [True, False])
+def test_convert_frame_calendar(updated_calculator, keep_order):
+    data = get_values_df(
+        [
+            (date(2023, 2, 1), Decimal("1")),
+            (date(2023, 1, 3), Decimal("1")),
+            (date(2022, 12, 31), Decimal("1")),
+            (date(2023, 1, 4), Decimal("2")),
+        ]
+    )
+    result = updated_calculator.convert_frame(
+        ConversionType.TO, "CBB", data, keep_order=keep_order, decimals=2
+    )
+    expected = [
+        (date(2023, 2, 1), Decimal("3.00")),
+        (date(2023, 1, 3), Decimal("3.00")),
+        (date(2022, 12, 31), None),
+        (date(2023, 1, 4), Decimal("12.00")),
+    ]
+    if not keep_order:
+        expected.sort()
+    assert result.rows() == expected
+
+
+def test_convert_single_rebuilds_index(rates_data):
+    calc = CurrencyCalculator(cache=RatesCache())
+    calc.data = RatesCacheData(
+        rates=rates_data.rates.head(1),
+        last_update=rates_data.last_update,
+        last_timestamps={},
+    )
+    assert calc.convert(
+        ConversionType.TO, "CAA", date(2023, 1, 5), Decimal("1"), 2
+    ) == Decimal("2.00")
+    assert calc.index_ready
+    calc.data = replace(calc.data, rates=rates_data.rates)
+    assert not calc.index_ready
+    assert calc.convert(
+        ConversionType.TO, "CAA", date(2023, 1, 5), Decimal("1"), 2
+    ) == Decimal("2.02")
+
+
+def test_convert_single_memo(rates_data):
+    calc = CurrencyCalculator(cache=RatesCache(), rates_memo_size=2)
+    calc.data = rates_data
+    for currency_date in [date(2023, 1, 5), date(2023, 1, 6), date(2023, 1, 5)]:
+        calc.convert(ConversionType.TO, "CAA", currency_date, Decimal("1"))
+    assert calc.rates_memo.get_stats() == {
+        "generation": calc.cache.generation,
+        "size": 2,
+        "max_size": 2,
+        "hits": 1,
+        "misses": 2,
+    }
+    calc.convert_cross("CBB", "CAA", date(2023, 1, 5), Decimal("1"))
+    assert calc.rates_memo.get_stats()["hits"] == 2
+    assert calc.rates_memo.get_stats()["size"] == 2
+    # The least recently used date was evicted.
+    calc.convert(ConversionType.TO, "CAA", date(2023, 1, 6), Decimal("1"))
+    assert calc.rates_memo.misses == 4
+
+    calc.data = replace(rates_data, rates=rates_data.rates.head(1))
+    assert calc.convert(
+        ConversionType.TO, "CAA", date(2023, 1, 5), Decimal("1")
+    ) == Decimal("2.000000000000")
+    assert calc.rates_memo.get_stats()["size"] == 1
+    assert calc.rates_memo.misses == 5
+
+
+@pytest.mark.parametrize(
+    "source_currency, target_currency, input_date, input_value, input_decimals, expected_result",
+    [
+        ("CAA", "CBB", date(2023, 1, 1), Decimal("1"), 6, Decimal("1.500000")),
+        ("CBB", "CCC", date(2023, 1, 2), Decimal("1"), 3, Decimal("0.167")),
+        ("CAA", "CBB", date(2023, 1, 4), Decimal("1"), 6, Decimal("2.985075")),
+        ("CCC", "CAA", date(2023, 1, 5), Decimal("-2"), 4, Decimal("-8.0800")),
+        ("CAA", "CAA", date(2023, 1, 5), Decimal("3.5"), 2, Decimal("3.50")),
+        ("CAA", "CBB", date(2022, 12, 31), Decimal("1"), 2, None),
+    ],
+)
+def test_convert_cross(
+    source_currency,
+    target_currency,
+    input_date,
+    input_value,
+    input_decimals,
+    expected_result,
+    updated_calculator,
+):
+    result = updated_calculator.convert_cross(
+        source_currency, target_currency, input_date, input_value, input_decimals
+    )
+    assert result == expected_result
+    [(_, multi_result)] = updated_calculator.convert_multiple_cross(
+        source_currency,
+        target_currency,
+        [(input_date, input_value)],
+        decimals=input_decimals,
+    )
+    assert multi_result == expected_result
+
+
+def test_convert_multiple_cross(updated_calculator):
+    input_values = [
+        (date(2023, 1, 4), Decimal("1")),
+        (date(2023, 1, 1), Decimal("2")),
+        (date(2023, 1, 5), Decimal("-1")),
+    ]
+    result = updated_calculator.convert_multiple_cross("CBB", "CCC", input_values)
+    assert [str(value) for _, value in result] == [
+        str(updated_calculator.convert_cross("CBB", "CCC", dt, value))
+        for dt, value in input_values
+    ]
+    frame_result = updated_calculator.convert_frame_cross(
+        "CBB", "CCC", get_values_df(input_values)
+    )
+    assert frame_result.rows() == result
+
+
+def test_convert_mixed(updated_calculator):
+    input_values = [
+        (ConversionType.TO, "CAA", date(2023, 1, 4), Decimal("1")),
+        (ConversionType.FROM, "cbb", date(2023, 1, 1), Decimal("1")),
+        (ConversionType.FROM, "CAA", date(2023, 1, 5), Decimal("-3")),
+        (ConversionType.TO, "CBB", date(2022, 12, 31), Decimal("1")),
+        (ConversionType.TO, "CCC", date(2023, 1, 2), Decimal("5")),
+    ]
+    result = updated_calculator.convert_mixed(input_values, decimals=4)
+    assert result == [
+        (date(2023, 1, 4), Decimal("2.0100")),
+        (date(2023, 1, 1), Decimal("0.3333")),
+        (date(2023, 1, 5), Decimal("-1.4851")),
+        (date(2022, 12, 31), None),
+        (date(2023, 1, 2), Decimal("2.5000")),
+    ]
+    assert updated_calculator.convert_mixed([]) == []
+    assert updated_calculator.convert_mixed_frame([]).columns == ["date", "result"]
+
+
+def test_get_rates(updated_calculator):
+    assert updated_calculator.get_rates("caa", date(2023, 1, 2), date(2023, 1, 5)) == [
+        (date(2023, 1, 4), Decimal("2.01")),
+        (date(2023, 1, 5), Decimal("2.02")),
+    ]
+    assert updated_calculator.get_rates("CAA", end=date(2023, 1, 3)) == [
+        (date(2023, 1, 1), Decimal("2.0")),
+    ]
+    assert updated_calculator.get_rates("CAA", date(2023, 1, 5), date(2023, 1, 4)) == []
+    assert updated_calculator.get_rates("CXX") is None
+
+
+def test_get_rate_aggregates(updated_calculator):
+    expected = [
+        (date(2023, 1, 1), Decimal("3.0"), Decimal("6.000001"), Decimal("4.000001")),
+    ]
+    for period in AggregatePeriod:
+        assert (
+            updated_calculator.get_rate_aggregates(
+                "CBB", period, date(2023, 1, 4), date(2023, 1, 4)
+            )
+            == expected
+        )
+    assert (
+        updated_calculator.get_rate_aggregates(
+            "CBB", AggregatePeriod.MONTH, date(2023, 2, 1)
+        )
+        == []
+    )
+    assert updated_calculator.get_rate_aggregates("CXX", AggregatePeriod.YEAR) is None
+
+
+def test_update_replaces_snapshot(monkeypatch):
+    monkeypatch.setattr(
+        "euro_converter.calculator.calc.update_from_ecb",
+        lambda *args, **kwargs: (RATES_DATA[1:], UpdateTimestamps(etag="test2")),
+    )
+    cache = RatesCache()
+    initial_data = cache.data = RatesCacheData(
+        rates=pl.DataFrame(RATES_ROWS[:1], schema=RATES_SCHEMA),
+        last_update=datetime(2023, 1, 5),
+        last_timestamps={},
+    )
+    calc = CurrencyCalculator(cache)
+    with freeze_time(datetime(2023, 1, 5, 12)):
+        assert calc.update()
+    assert calc.data is not initial_data
+    assert calc.data.rates.rows(named=True) == RATES_ROWS
+    assert initial_data.rates.rows(named=True) == RATES_ROWS[:1]
+    assert initial_data.last_timestamps == {}
+
+
+@pytest.mark.parametrize(
+    "refresh_update, expected_calls",
+    [(True, ["update"]), (False, ["load"])],
+)
+def test_refresh(refresh_update, expected_calls, rates_data, monkeypatch):
+    calls = []
+
+    class LoadingCache(RatesCache):
+        def load(self):
+            calls.append("load")
+            self.data = rates_data
+
+    def update_func(self):
+        calls.append("update")
+        self.data = rates_data
+        return True
+
+    monkeypatch.setattr(CurrencyCalculator, "update", update_func)
+    calc = CurrencyCalculator(LoadingCache(), refresh_in_background=True)
+    calc.refresh(refresh_update)
+    assert calls == expected_calls
+    calls.clear()
+    with freeze_time(datetime(2030, 1, 1)):
+        calc.convert(ConversionType.TO, "CAA", date(2023, 1, 1), Decimal("1"))
+    assert calls == []
+
+
+def test_update_published_by_other_process(rates_data, monkeypatch):
+    class PublishingCache(RatesCache):
+        stored_data = None
+
+        def load(self):
+            if self.stored_data:
+                self.data = self.stored_data
+
+        @contextmanager
+        def update_lock(self):
+            # Another process publishes its update while this one is waiting.
+            self.stored_data = replace(rates_data, last_update=datetime.utcnow())
+            yield
+
+    def update_func(*args, **kwargs):
+        raise AssertionError("Unexpected download.")
+
+    monkeypatch.setattr("euro_converter.calculator.calc.update_from_ecb", update_func)
+    cache = PublishingCache()
+    calc = CurrencyCalculator(cache)
+    assert not calc.update()
+    assert calc.data is cache.stored_data
+
+
+@pytest.mark.parametrize(
+    "cached, load_update, expected_calls, expected_ready",
+    [
+        pytest.param(True, True, ["load"], True, id="cached"),
+        pytest.param(False, True, ["load", "update"], True, id="update"),
+        pytest.param(False, False, ["load"], False, id="empty"),
+    ],
+)
+def test_load(
+    cached, load_update, expected_calls, expected_ready, rates_data, monkeypatch
+):
+    calls = []
+
+    class LoadingCache(RatesCache):
+        def load(self):
+            calls.append("load")
+            if cached:
+                self.data = rates_data
+
+    def update_func(self):
+        calls.append("update")
+        self.data = rates_data
+        return True
+
+    monkeypatch.setattr(CurrencyCalculator, "update", update_func)
+    calc = CurrencyCalculator(LoadingCache(), refresh_in_background=True)
+    assert not calc.ready
+    assert calc.load(load_update) is expected_ready
+    assert calls == expected_calls
+    assert calc.ready is expected_ready
+    if expected_ready:
+        # Lookups were prepared, so that conversions do not build them.
+        index = calc._index
+        assert set(index._scaled_columns) == {"CAA", "CBB", "CCC"}
+
+
+def test_convert_without_rates(monkeypatch):
+    updates = []
+
+    def update_func(self):
+        updates.append(1)
+        raise ConnectionError("ECB not reachable")
+
+    monkeypatch.setattr(CurrencyCalculator, "update", update_func)
+    calc = CurrencyCalculator(RatesCache(), refresh_in_background=True)
+    assert not calc.load(update=False)
+    # Checked again on every request, until rates are loaded.
+    assert calc.needs_cache_check
+    with pytest.raises(RatesUnavailableError):
+        calc.convert(ConversionType.TO, "CAA", date(2023, 1, 4), Decimal("1"))
+    with pytest.raises(RatesUnavailableError):
+        calc.convert_multiple(
+            ConversionType.TO, "CAA", [(date(2023, 1, 4), Decimal("1"))]
+        )
+    assert updates == [1, 1]
+
+
+def test_convert_unknown_currency(updated_calculator):
+    values = [(date(2023, 1, 4), Decimal("1"))]
+    with pytest.raises(UnknownCurrencyError, match="Unknown currency: CXX"):
+        updated_calculator.convert(
+            ConversionType.TO, "cxx", date(2023, 1, 4), Decimal("1")
+        )
+    with pytest.raises(UnknownCurrencyError, match="Unknown currency: CXX"):
+        updated_calculator.convert_cross("CAA", "CXX", date(2023, 1, 4), Decimal("1"))
+    with pytest.raises(UnknownCurrencyError, match="Unknown currency: CXX"):
+        updated_calculator.convert_multiple(ConversionType.FROM, "CXX", values)
+    with pytest.raises(UnknownCurrencyError, match="Unknown currency: CXX, CYY"):
+        updated_calculator.convert_multiple_cross("CYY", "CXX", values)
+
+
+def test_convert_mixed_unknown_currency(updated_calculator, monkeypatch):
+    merged = []
+    merge_result = updated_calculator._merge_result
+    monkeypatch.setattr(
+        updated_calculator,
+        "_merge_result",
+        lambda *args, **kwargs: merged.append(1) or merge_result(*args, **kwargs),
+    )
+    values = [
+        (ConversionType.TO, "CAA", date(2023, 1, 4), Decimal("1")),
+        (ConversionType.FROM, "cxx", date(2023, 1, 4), Decimal("1")),
+        (ConversionType.TO, "CBB", date(2023, 1, 4), Decimal("1")),
+    ]
+    with pytest.raises(UnknownCurrencyError, match="Unknown currency: CXX"):
+        updated_calculator.convert_mixed(values)
+    assert merged == []
@@ -0,0 +1,155 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import polars as pl
+import pytest
+
+from euro_converter.cache import RatesCache, RatesCacheData
+from euro_converter.cache.data import get_scaled_rate
+from euro_converter.calculator import CurrencyCalculator, ConversionType, NumericMode
+from euro_converter.calculator.scaled import (
+    get_decimal_result,
+    with_scaled_cross,
+    with_scaled_product,
+    with_scaled_quotient,
+)
+from euro_converter.calculator.utils import (
+    DECIMAL_ROUNDING,
+    DECIMAL_TYPE,
+    RoundingMode,
+)
+from tests.calculator.fixtures import rates_data, updated_calculator  # noqa
+
+VALUES = [
+    "0",
+    "1",
+    "-1",
+    "2.5",
+    "-2.5",
+    "0.000001",
+    "-0.000125",
+    "1234.5",
+    "-98765.432109",
+    "999999.999999",
+    "-999999.999999",
+]
+RATES = ["1", "3", "0.000001", "0.5", "1.25", "7.4582", "159.123456", "999999.999999"]
+CONVERSIONS = [
+    pytest.param(
+        pl.col("value") * pl.col("rate"),
+        lambda frame, decimals, rounding: with_scaled_product(
+            frame, "result", "value", "rate", decimals, rounding
+        ),
+        id="product",
+    ),
+    pytest.param(
+        pl.col("value") / pl.col("rate"),
+        lambda frame, decimals, rounding: with_scaled_quotient(
+            frame, "result", "value", "rate", decimals, rounding
+        ),
+        id="quotient",
+    ),
+    pytest.param(
+        pl.col("value") * pl.col("target_rate") / pl.col("rate"),
+        lambda frame, decimals, rounding: with_scaled_cross(
+            frame, "result", "value", "rate", "target_rate", decimals, rounding
+        ),
+        id="cross",
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def values_rates():
+    return pl.DataFrame(
+        [
+            (value, rate, target_rate)
+            for value in VALUES
+            for rate in RATES
+            for target_rate in RATES[:4]
+        ],
+        schema={"value": pl.Utf8, "rate": pl.Utf8, "target_rate": pl.Utf8},
+        orient="row",
+    ).select(pl.all().cast(DECIMAL_TYPE))
+
+
+@pytest.mark.parametrize("expression, with_scaled_result", CONVERSIONS)
+@pytest.mark.parametrize("decimals", [0, 1, 3, 6])
+@pytest.mark.parametrize("rounding", list(RoundingMode))
+def test_scaled_conversion(
+    values_rates, expression, with_scaled_result, decimals, rounding
+):
+    expected = [
+        value.quantize(Decimal(1).scaleb(-decimals), DECIMAL_ROUNDING[rounding])
+        for value in values_rates.select(expression).to_series().to_list()
+    ]
+    scaled = values_rates.select(get_scaled_rate(pl.all()).name.keep()).lazy()
+    result = with_scaled_result(scaled, decimals, rounding).collect()
+    overflow = result["result_overflow"].to_list()
+    converted = result.select(get_decimal_result(pl.col("result"), decimals))
+    assert [
+        value if not row_overflow else expected_value
+        for value, row_overflow, expected_value in zip(
+            converted.to_series().to_list(), overflow, expected
+        )
+    ] == expected
+    assert sum(overflow) < len(overflow) / 10
+
+
+@pytest.mark.parametrize("decimals", [None, 0, 3, 6, 8])
+@pytest.mark.parametrize("rounding", list(RoundingMode))
+def test_scaled_mode(updated_calculator, decimals, rounding):
+    calc = CurrencyCalculator(
+        updated_calculator.cache,
+        refresh_in_background=True,
+        numeric_mode=NumericMode.SCALED,
+        rounding_mode=rounding,
+    )
+    values = [
+        (date(2023, 1, 4), Decimal("1")),
+        (date(2023, 1, 1), Decimal("-2.5")),
+        (date(2022, 1, 1), Decimal("1")),
+        (date(2023, 1, 6), Decimal("999999.999999")),
+    ]
+    for conversion_type in ConversionType:
+        assert calc.convert_multiple(
+            conversion_type, "CBB", values, decimals=decimals
+        ) == updated_calculator.convert_multiple(
+            conversion_type, "CBB", values, decimals=decimals, rounding=rounding
+        )
+    assert calc.convert_multiple_cross(
+        "CBB", "CAA", values, decimals=decimals
+    ) == updated_calculator.convert_multiple_cross(
+        "CBB", "CAA", values, decimals=decimals, rounding=rounding
+    )
+    mixed_values = [
+        (conversion_type, currency, value_date, value)
+        for conversion_type in ConversionType
+        for currency in ["CAA", "ccc"]
+        for value_date, value in values
+    ]
+    assert calc.convert_mixed(
+        mixed_values, decimals=decimals
+    ) == updated_calculator.convert_mixed(
+        mixed_values, decimals=decimals, rounding=rounding
+    )
+
+
+def test_scaled_mode_overflow():
+    cache = RatesCache()
+    cache.data = RatesCacheData(
+        rates=pl.DataFrame(
+            [(date(2023, 1, 1), Decimal("0.000001"), Decimal("999999.999999"))],
+            schema={"date": pl.Date, "CAA": DECIMAL_TYPE, "CBB": DECIMAL_TYPE},
+            orient="row",
+        ),
+        last_update=datetime(2023, 1, 1),
+        last_timestamps={},
+    )
+    calc = CurrencyCalculator(
+        cache, refresh_in_background=True, numeric_mode=NumericMode.SCALED
+    )
+    values = [(date(2023, 1, 1), Decimal("999999.999999"))]
+    assert calc.convert_multiple_cross("CAA", "CBB", values, decimals=6) == [
+        (date(2023, 1, 1), Decimal("999999999998000000.000001"))
+    ]
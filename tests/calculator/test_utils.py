@@ -0,0 +1,53 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+import polars as pl
+import pytest
+
+from euro_converter.calculator.utils import (
+    RoundingMode,
+    get_rounded,
+    get_single_result,
+)
+
+VALUES = [
+    "0",
+    "2.5",
+    "-2.5",
+    "3.5",
+    "0.125",
+    "-0.135",
+    "1.0005",
+    "-1.0015",
+    "123456.123456789012",
+    "-98765.987654321098",
+]
+
+
+@pytest.mark.parametrize("decimals", [0, 1, 2, 3, 6, 12, 14])
+def test_get_rounded(decimals):
+    df = pl.DataFrame({"value": VALUES}).select(
+        pl.col("value").cast(pl.Decimal(None, 12))
+    )
+    result = df.select(get_rounded(pl.col("value"), decimals)).to_series().to_list()
+    assert result == [round(value, decimals) for value in df["value"].to_list()]
+
+
+@pytest.mark.parametrize("decimals", [-2, 0, 2, 3])
+def test_get_rounded_half_up(decimals):
+    df = pl.DataFrame({"value": VALUES}).select(
+        pl.col("value").cast(pl.Decimal(None, 12))
+    )
+    result = (
+        df.select(get_rounded(pl.col("value"), decimals, RoundingMode.HALF_UP))
+        .to_series()
+        .to_list()
+    )
+    expected = [
+        value.quantize(Decimal(1).scaleb(-decimals), rounding=ROUND_HALF_UP)
+        for value in df["value"].to_list()
+    ]
+    assert result == expected
+    assert [
+        get_single_result(value, decimals, RoundingMode.HALF_UP)
+        for value in df["value"].to_list()
+    ] == expected
@@ -1,9 +1,12 @@
+import zipfile
+from io import BytesIO
 from pathlib import Path
 
+import httpx
 import pytest
 
-from euro_converter.ecb import UpdateType
-from euro_converter.ecb.download import URLS
+from euro_converter.ecb import UpdateType, download
+from euro_converter.ecb.download import FULL_CSV_URL, URLS
 
 
 TEST_RESPONSES = [
@@ -11,6 +14,15 @@ TEST_RESPONSES = [
     (UpdateType.INCREMENTAL_90_DAYS, {"Last-Modified": "test"}),
     (UpdateType.INCREMENTAL_DAILY, {"ETag": "test"}),
 ]
+# Same rates as the XML test data, in the format of the published CSV history.
+TEST_CSV = (
+    "Date, USD, JPY, BGN, CYP, CZK, DKK, GBP, HUF, PLN, RON, SEK, CHF, ISK, NOK, TRY, "
+    "AUD, BRL, CAD, CNY, HKD, IDR, ILS, INR, KRW, MXN, MYR, NZD, PHP, SGD, THB, ZAR, \n"
+    "2024-01-10, 1.0946, 159.00, 1.9558, N/A, 24.562, 7.4582, 0.86023, 378.35, 4.3410, "
+    "4.9728, 11.1970, 0.9336, 150.10, 11.2915, 32.8087, 1.6334, 5.3508, 1.4649, 7.8476, "
+    "8.5602, 17032.14, 4.1184, 90.8755, 1443.77, 18.5983, 5.0806, 1.7567, 61.593, "
+    "1.4573, 38.338, 20.4139, \n"
+)
 
 
 @pytest.fixture(scope="session")
@@ -25,3 +37,44 @@ def ecb_request_mock(request_data, requests_mock):
     for update_type, headers in TEST_RESPONSES:
         requests_mock.get(URLS[update_type], text=request_data, headers=headers)
     return requests_mock
+
+
+@pytest.fixture(scope="session")
+def request_csv_zip() -> bytes:
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("eurofxref-hist.csv", TEST_CSV)
+    return buffer.getvalue()
+
+
+@pytest.fixture()
+def ecb_csv_request_mock(request_csv_zip, requests_mock):
+    requests_mock.get(
+        FULL_CSV_URL,
+        content=request_csv_zip,
+        headers={"Content-Type": "application/zip", "ETag": "test"},
+    )
+    return requests_mock
+
+
+@pytest.fixture()
+def ecb_async_mock(request_data, request_csv_zip, monkeypatch) -> list[httpx.Request]:
+    # Same responses as the request mocks, for the async client. Returns the requests sent.
+    responses = {
+        URLS[update_type]: (request_data.encode(), headers)
+        for update_type, headers in TEST_RESPONSES
+    }
+    responses[FULL_CSV_URL] = (
+        request_csv_zip,
+        {"Content-Type": "application/zip", "ETag": "test"},
+    )
+    requests = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        content, headers = responses[str(request.url)]
+        return httpx.Response(200, content=content, headers=headers)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    monkeypatch.setattr(download, "default_async_client", client)
+    return requests
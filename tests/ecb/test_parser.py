@@ -0,0 +1,40 @@
+from io import BytesIO
+
+import pytest
+
+from euro_converter.calculator.utils import get_parsed_rates_df
+from euro_converter.ecb.parser import parse_xml, parse_xml_df
+from .fixtures import request_data  # noqa
+
+GAP_DATA = b"""<?xml version="1.0" encoding="UTF-8"?>
+<gesmes:Envelope xmlns:gesmes="http://www.gesmes.org/xml/2002-08-01"
+    xmlns="http://www.ecb.int/vocabulary/2002-08-01/eurofxref">
+<Cube>
+<Cube time="2024-01-10"><Cube currency="USD" rate="1.0946"/></Cube>
+<Cube time="2024-01-09"><Cube currency="USD" rate="1.0940"/><Cube currency="JPY" rate="158.5"/></Cube>
+<Cube time="2024-01-08"><Cube currency="JPY" rate="159"/></Cube>
+</Cube>
+</gesmes:Envelope>
+"""
+
+
+def test_parse_xml_df(request_data):
+    data = request_data.encode()
+    expected = get_parsed_rates_df(parse_xml(BytesIO(data)))
+    assert get_parsed_rates_df(parse_xml_df(BytesIO(data))).equals(expected)
+
+
+def test_parse_xml_df_gaps():
+    df = parse_xml_df(BytesIO(GAP_DATA))
+    assert df.to_dicts() == [
+        {"date": "2024-01-10", "USD": "1.0946", "JPY": None},
+        {"date": "2024-01-09", "USD": "1.0940", "JPY": "158.5"},
+        {"date": "2024-01-08", "USD": None, "JPY": "159"},
+    ]
+    expected = get_parsed_rates_df(parse_xml(BytesIO(GAP_DATA)))
+    assert get_parsed_rates_df(df).equals(expected)
+
+
+def test_parse_xml_df_malformed():
+    with pytest.raises(ValueError):
+        parse_xml_df(BytesIO(GAP_DATA[:-20]))
@@ -1,17 +1,31 @@
+import asyncio
+
+import httpx
 import pytest
 
 from .fixtures import (
     request_data,  # noqa
+    request_csv_zip,  # noqa
     ecb_request_mock,
+    ecb_csv_request_mock,
+    ecb_async_mock,
+)
+from euro_converter.calculator.utils import get_parsed_rates_df
+from euro_converter.ecb import (
+    update_from_ecb,
+    update_from_ecb_async,
+    UpdateType,
+    UpdateTimestamps,
 )
-from euro_converter.ecb import update_from_ecb, UpdateType, UpdateTimestamps
+from euro_converter.ecb import download
+from euro_converter.ecb.download import FULL_CSV_URL, URLS
 
 
 EXPECTED_RESPONSE = [
     {
         "date": "2024-01-10",
         "USD": "1.0946",
-        "JPY": "159.0",
+        "JPY": "159",
         "BGN": "1.9558",
         "CZK": "24.562",
         "DKK": "7.4582",
@@ -83,4 +97,106 @@ def test_update(update_type, input_timestamps, expected_timestamp, ecb_request_m
     else:
         assert "If-None-Match" not in request.headers
     assert response_timestamps == expected_timestamp
-    assert list(data) == EXPECTED_RESPONSE
+    assert data.to_dicts() == EXPECTED_RESPONSE
+
+
+def test_update_csv(ecb_csv_request_mock):
+    data, response_timestamps = update_from_ecb(
+        UpdateType.FULL, None, full_update_csv=True
+    )
+    assert ecb_csv_request_mock.request_history[0].url == FULL_CSV_URL
+    assert response_timestamps == UpdateTimestamps(etag="test")
+    assert data["CYP"].null_count() == 1
+    assert get_parsed_rates_df(data.drop("CYP")).equals(
+        get_parsed_rates_df(EXPECTED_RESPONSE)
+    )
+
+
+def test_update_csv_not_modified(requests_mock):
+    requests_mock.get(FULL_CSV_URL, status_code=304, headers={"ETag": "test"})
+    data, response_timestamps = update_from_ecb(
+        UpdateType.FULL, UpdateTimestamps(etag="test"), full_update_csv=True
+    )
+    assert requests_mock.request_history[0].headers["If-None-Match"] == "test"
+    assert data is None
+    assert response_timestamps == UpdateTimestamps(etag="test")
+
+
+@pytest.mark.parametrize(
+    "update_type, input_timestamps, expected_timestamp",
+    [
+        pytest.param(
+            UpdateType.FULL,
+            UpdateTimestamps(modified_since="test"),
+            UpdateTimestamps(),
+            id="full",
+        ),
+        pytest.param(
+            UpdateType.INCREMENTAL_90_DAYS,
+            None,
+            UpdateTimestamps(modified_since="test"),
+            id="inc-90",
+        ),
+        pytest.param(
+            UpdateType.INCREMENTAL_DAILY,
+            UpdateTimestamps(etag="test"),
+            UpdateTimestamps(etag="test"),
+            id="inc-daily",
+        ),
+    ],
+)
+def test_update_async(
+    update_type, input_timestamps, expected_timestamp, ecb_async_mock
+):
+    data, response_timestamps = asyncio.run(
+        update_from_ecb_async(update_type, input_timestamps)
+    )
+    (request,) = ecb_async_mock
+    assert str(request.url) == URLS[update_type]
+    expected_headers = {
+        "If-Modified-Since": input_timestamps and input_timestamps.modified_since,
+        "If-None-Match": input_timestamps and input_timestamps.etag,
+    }
+    for header, value in expected_headers.items():
+        assert request.headers.get(header) == (value or None)
+    assert response_timestamps == expected_timestamp
+    assert data.to_dicts() == EXPECTED_RESPONSE
+
+
+def test_update_async_csv(ecb_async_mock):
+    data, response_timestamps = asyncio.run(
+        update_from_ecb_async(UpdateType.FULL, None, full_update_csv=True)
+    )
+    assert str(ecb_async_mock[0].url) == FULL_CSV_URL
+    assert response_timestamps == UpdateTimestamps(etag="test")
+    assert get_parsed_rates_df(data.drop("CYP")).equals(
+        get_parsed_rates_df(EXPECTED_RESPONSE)
+    )
+
+
+def test_update_async_not_modified(monkeypatch):
+    requests = []
+
+    def handle(request):
+        requests.append(request)
+        return httpx.Response(304, headers={"ETag": "test"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    monkeypatch.setattr(download, "default_async_client", client)
+    data, response_timestamps = asyncio.run(
+        update_from_ecb_async(
+            UpdateType.FULL, UpdateTimestamps(etag="test"), full_update_csv=True
+        )
+    )
+    assert requests[0].headers["If-None-Match"] == "test"
+    assert data is None
+    assert response_timestamps == UpdateTimestamps(etag="test")
+
+
+def test_update_async_error(monkeypatch):
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(500))
+    )
+    monkeypatch.setattr(download, "default_async_client", client)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(update_from_ecb_async(UpdateType.INCREMENTAL_DAILY, None))
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+from contextvars import ContextVar
+
+from euro_converter.executor import CalculationExecutor
+
+request_id: ContextVar[str] = ContextVar("request_id", default="")
+
+
+def test_run_in_thread_with_context():
+    executor = CalculationExecutor(max_workers=1)
+
+    def get_thread_and_context(suffix: str) -> tuple[int, str]:
+        return threading.get_ident(), request_id.get() + suffix
+
+    async def run():
+        request_id.set("request")
+        return await executor.run(get_thread_and_context, suffix="-1")
+
+    thread_id, context_value = asyncio.run(run())
+    executor.shutdown()
+    assert thread_id != threading.get_ident()
+    assert context_value == "request-1"
+
+
+def test_bounded_workers():
+    executor = CalculationExecutor(max_workers=2)
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def work():
+        with lock:
+            running.append(1)
+            max_running.append(len(running))
+        threading.Event().wait(0.01)
+        with lock:
+            running.pop()
+
+    async def run():
+        await asyncio.gather(*(executor.run(work) for _ in range(8)))
+
+    asyncio.run(run())
+    executor.shutdown()
+    assert max(max_running) <= 2
+    # Usable again after a shutdown.
+    asyncio.run(run())
+    executor.shutdown()
@@ -0,0 +1,286 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import polars as pl
+import pytest
+from fastapi.exceptions import RequestValidationError
+
+from euro_converter.calculator.utils import DECIMAL_TYPE
+from euro_converter.formats import (
+    FormatError,
+    FrameFormat,
+    LineChunk,
+    StreamFormat,
+    get_request_frame_format,
+    get_response_frame_format,
+    get_stream_format,
+    iter_line_chunks,
+    read_csv_chunk,
+    read_frame,
+    read_json_frame,
+    read_ndjson_chunk,
+    write_csv_chunk,
+    write_frame,
+    write_json_results,
+    write_ndjson_chunk,
+    write_stream_error,
+)
+
+
+async def _collect_chunks(blocks, chunk_rows):
+    async def byte_stream():
+        for block in blocks:
+            yield block
+
+    return [chunk async for chunk in iter_line_chunks(byte_stream(), chunk_rows)]
+
+
+@pytest.mark.parametrize(
+    "blocks, chunk_rows, expected_chunks",
+    [
+        pytest.param(
+            [b"a\nb\nc\n"],
+            2,
+            [LineChunk([b"a", b"b"], [1, 2]), LineChunk([b"c"], [3])],
+            id="single-block",
+        ),
+        pytest.param(
+            [b"a\nb", b"b\n\nc"],
+            5,
+            [LineChunk([b"a", b"bb", b"c"], [1, 2, 4])],
+            id="split-line",
+        ),
+        pytest.param([b"", b"\n"], 5, [], id="empty"),
+    ],
+)
+def test_iter_line_chunks(blocks, chunk_rows, expected_chunks):
+    assert asyncio.run(_collect_chunks(blocks, chunk_rows)) == expected_chunks
+
+
+@pytest.mark.parametrize(
+    "content_type, expected_format",
+    [
+        ("text/csv; charset=utf-8", StreamFormat.CSV),
+        ("application/x-ndjson", StreamFormat.NDJSON),
+        (None, StreamFormat.NDJSON),
+    ],
+)
+def test_get_stream_format(content_type, expected_format):
+    assert get_stream_format(content_type) is expected_format
+
+
+def test_read_ndjson_chunk():
+    df = read_ndjson_chunk(
+        [
+            b'{"date": "2023-01-01", "value": 1.5}',
+            b'["2023-01-02", "123456.123456"]',
+            b'["2023-01-03", 2E2]',
+        ]
+    )
+    assert df.rows() == [
+        (date(2023, 1, 1), Decimal("1.500000")),
+        (date(2023, 1, 2), Decimal("123456.123456")),
+        (date(2023, 1, 3), Decimal("200.000000")),
+    ]
+
+
+def test_read_csv_chunk():
+    df = read_csv_chunk([b"2023-01-01,1.5", b"2023-01-02, 2"])
+    assert df.rows() == [
+        (date(2023, 1, 1), Decimal("1.500000")),
+        (date(2023, 1, 2), Decimal("2.000000")),
+    ]
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        [b'{"date": "2023-01-01"}'],
+        [b'{"date": "2023-01-01", "value": "x"}'],
+        [b'["01/01/2023", 1]'],
+        [b"not json"],
+    ],
+)
+def test_read_ndjson_chunk_invalid(lines):
+    with pytest.raises(FormatError):
+        read_ndjson_chunk(lines)
+
+
+def test_read_chunk_line_numbers():
+    lines = [b'["2023-01-01", 1]', b'["2023-01-02", "x"]']
+    with pytest.raises(FormatError, match="at line 12:"):
+        read_ndjson_chunk(lines, [10, 12])
+    with pytest.raises(FormatError, match="at line 12:"):
+        read_ndjson_chunk([lines[0], b"not json"], [10, 12])
+    with pytest.raises(FormatError, match="at line 8:"):
+        read_csv_chunk([b"2023-01-01,1", b"2023-02-30,1"], [7, 8])
+
+
+def test_write_stream_error():
+    assert write_stream_error(StreamFormat.NDJSON, 'Invalid "x"') == (
+        b'{"error": "Invalid \\"x\\""}\n'
+    )
+    assert write_stream_error(StreamFormat.CSV, 'Invalid "x"') == (
+        b'error,"Invalid ""x"""\n'
+    )
+
+
+def test_read_json_frame():
+    df = read_json_frame(
+        b'{"dates": ["2023-01-02", " 2023-01-01"], "values": [1.5, "-2"]}'
+    )
+    assert df.schema == {"date": pl.Date, "value": DECIMAL_TYPE}
+    assert df.rows() == [
+        (date(2023, 1, 2), Decimal("1.5")),
+        (date(2023, 1, 1), Decimal("-2")),
+    ]
+    assert read_json_frame(b'[["2023-01-02", 1.5]]').rows() == [
+        (date(2023, 1, 2), Decimal("1.5"))
+    ]
+    assert read_json_frame(b'{"dates": [], "values": []}').is_empty()
+    # Numbers in exponent notation, as accepted by pydantic.
+    assert read_json_frame(
+        b'{"dates": ["2023-01-02", "2023-01-03", "2023-01-04"], '
+        b'"values": [1e3, 1.5E-2, "-2.5e+1"]}'
+    ).rows() == [
+        (date(2023, 1, 2), Decimal("1000")),
+        (date(2023, 1, 3), Decimal("0.015")),
+        (date(2023, 1, 4), Decimal("-25")),
+    ]
+
+
+@pytest.mark.parametrize(
+    "body, message",
+    [
+        (b'{"dates": ["2023-01-01"]}', "Expected lists"),
+        (b'{"dates": ["2023-01-01"], "values": []}', "Got 1 dates, but 0 values"),
+        (b'{"dates": [20230101], "values": [1]}', "Invalid date at index 0"),
+        (
+            b'{"dates": ["2023-01-01", "2023-02-30"], "values": [1, 2]}',
+            "Invalid date at index 1: '2023-02-30'",
+        ),
+        (b'{"dates": ["2023-01-01"], "values": [null]}', "Invalid value at index 0"),
+        (b'{"dates": ["2023-01-01"], "values": ["x"]}', "Invalid value at index 0"),
+        (
+            b'{"dates": ["2023-01-01", "2023-01-02"], "values": [1, "NaN"]}',
+            "Invalid value at index 1: 'NaN'",
+        ),
+        (b'{"dates": ["2023-01-01"], "values": [1e300]}', "Invalid value at index 0"),
+        (
+            b'{"dates": ["2023-01-01", "2023-01-02"], "values": [1, 1.1234567]}',
+            "Value at index 1 has more than 6 decimal places: '1.1234567'",
+        ),
+        (
+            b'{"dates": ["2023-01-01"], "values": ["-1e-7"]}',
+            "Value at index 0 has more than 6 decimal places: '-1e-7'",
+        ),
+        (b'{"dates": ', "Invalid JSON data"),
+    ],
+)
+def test_read_json_frame_invalid(body, message):
+    with pytest.raises(FormatError, match=message):
+        read_json_frame(body)
+
+
+def test_read_json_frame_scale():
+    # Digits beyond the scale are accepted if they are zeros.
+    assert read_json_frame(
+        b'{"dates": ["2023-01-01"], "values": ["1.12345600"]}'
+    ).rows() == [(date(2023, 1, 1), Decimal("1.123456"))]
+    assert read_json_frame(
+        b'[["2023-01-01", 1.12345600], ["2023-01-02", "1.12345600"]]'
+    ).rows() == [
+        (date(2023, 1, 1), Decimal("1.123456")),
+        (date(2023, 1, 2), Decimal("1.123456")),
+    ]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'[["2023-01-01", 1.1234567]]',
+        b'[["2023-01-01", 1e-7]]',
+        b'[["2023-01-01", 1234567]]',
+    ],
+)
+def test_read_json_frame_invalid_values(body):
+    with pytest.raises(RequestValidationError):
+        read_json_frame(body)
+
+
+def test_write_chunks():
+    results = pl.DataFrame(
+        {
+            "date": [date(2023, 1, 1), date(2023, 1, 2), date(2023, 1, 3)],
+            "result": [Decimal("1.50"), None, Decimal("-2.00")],
+        },
+        schema={"date": pl.Date, "result": pl.Decimal(None, 2)},
+    )
+    assert write_ndjson_chunk(results) == (
+        b'{"date": "2023-01-01", "value": "1.50"}\n'
+        b'{"date": "2023-01-02", "value": null}\n'
+        b'{"date": "2023-01-03", "value": "-2.00"}\n'
+    )
+    assert write_csv_chunk(results) == (
+        b"2023-01-01,1.50\n2023-01-02,\n2023-01-03,-2.00\n"
+    )
+    assert write_csv_chunk(results.clear()) == b""
+
+
+def test_write_json_results():
+    results = pl.DataFrame(
+        {
+            "date": [date(2023, 1, 1), date(2023, 1, 2), date(2023, 1, 3)],
+            "result": [Decimal("0"), None, Decimal("-2.5")],
+        },
+        schema={"date": pl.Date, "result": pl.Decimal(None, 3)},
+    )
+    assert write_json_results(results) == (
+        b'[["2023-01-01","0.000"],["2023-01-02",null],["2023-01-03","-2.500"]]'
+    )
+    assert write_json_results(results.clear()) == b"[]"
+
+
+@pytest.mark.parametrize(
+    "header, expected_request_format, expected_response_format",
+    [
+        (None, FrameFormat.JSON, FrameFormat.JSON),
+        ("application/json", FrameFormat.JSON, FrameFormat.JSON),
+        (
+            "application/vnd.apache.arrow.stream",
+            FrameFormat.ARROW_STREAM,
+            FrameFormat.ARROW_STREAM,
+        ),
+        (
+            "text/html, application/vnd.apache.parquet;q=0.9",
+            FrameFormat.JSON,
+            FrameFormat.PARQUET,
+        ),
+    ],
+)
+def test_get_frame_format(header, expected_request_format, expected_response_format):
+    assert get_request_frame_format(header) is expected_request_format
+    assert get_response_frame_format(header) is expected_response_format
+
+
+@pytest.mark.parametrize(
+    "frame_format",
+    [FrameFormat.ARROW_STREAM, FrameFormat.ARROW_FILE, FrameFormat.PARQUET],
+)
+def test_read_write_frame(frame_format):
+    df = pl.DataFrame({"date": ["2023-01-01", "2023-01-02"], "value": [1.5, 2]})
+    result = read_frame(write_frame(df, frame_format), frame_format)
+    assert result.rows() == [
+        (date(2023, 1, 1), Decimal("1.500000")),
+        (date(2023, 1, 2), Decimal("2.000000")),
+    ]
+    assert read_frame(write_frame(result, frame_format), frame_format).equals(result)
+
+
+def test_read_frame_invalid():
+    with pytest.raises(FormatError):
+        read_frame(b"invalid", FrameFormat.PARQUET)
+    data = write_frame(pl.DataFrame({"date": ["2023-01-01"]}), FrameFormat.PARQUET)
+    with pytest.raises(FormatError, match="Missing columns: value"):
+        read_frame(data, FrameFormat.PARQUET)
@@ -0,0 +1,97 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import polars as pl
+import pytest
+
+from euro_converter import metrics
+from euro_converter.cache import RatesCache, RatesCacheData
+from euro_converter.calculator import ConversionType, CurrencyCalculator
+from tests.calculator.fixtures import RATES_ROWS, RATES_SCHEMA
+
+
+@pytest.fixture
+def registry():
+    metrics.REGISTRY.clear()
+    yield metrics.REGISTRY
+    metrics.REGISTRY.clear()
+    metrics.REGISTRY.enabled = True
+
+
+def test_counter():
+    counter = metrics.Counter("test_total", "Test counter.", ("status",))
+    counter.inc(status="200")
+    counter.inc(2, status="200")
+    counter.inc(status='3"4')
+    assert counter.write() == [
+        "# HELP test_total Test counter.",
+        "# TYPE test_total counter",
+        'test_total{status="200"} 3',
+        'test_total{status="3\\"4"} 1',
+    ]
+
+
+def test_counter_labels():
+    counter = metrics.Counter("test_total", "Test counter.", ("status",))
+    with pytest.raises(ValueError):
+        counter.inc(code="200")
+
+
+def test_histogram():
+    histogram = metrics.Histogram(
+        "test_seconds", "Test histogram.", ("stage",), buckets=(0.1, 1.0)
+    )
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(2.0, stage="a")
+    assert histogram.write()[2:] == [
+        'test_seconds_bucket{stage="a",le="0.1"} 1',
+        'test_seconds_bucket{stage="a",le="1.0"} 2',
+        'test_seconds_bucket{stage="a",le="+Inf"} 3',
+        'test_seconds_sum{stage="a"} 2.55',
+        'test_seconds_count{stage="a"} 3',
+    ]
+
+
+def test_stage_without_operation(registry):
+    with metrics.stage("check_cache"):
+        pass
+    assert "euro_converter_stage_seconds_count" not in registry.write()
+
+
+def test_calculator_stages(registry):
+    cache = RatesCache()
+    cache.data = RatesCacheData(
+        rates=pl.DataFrame(RATES_ROWS, schema=RATES_SCHEMA),
+        last_update=datetime(2023, 1, 5),
+        last_timestamps={},
+    )
+    calculator = CurrencyCalculator(cache, refresh_in_background=True)
+    calculator.convert(ConversionType.TO, "CAA", date(2023, 1, 3), Decimal("1"))
+    calculator.convert_multiple(
+        ConversionType.TO, "CAA", [(date(2023, 1, 3), Decimal("1"))] * 3
+    )
+    output = registry.write()
+    for operation, stage in [
+        ("convert", "check_cache"),
+        ("convert", "lookup"),
+        ("convert", "calculate"),
+        ("convert_multiple", "read"),
+        ("convert_multiple", "write"),
+        ("convert_frame", "join"),
+        ("convert_frame", "calculate"),
+        ("convert_frame", "sort"),
+    ]:
+        assert (
+            f'euro_converter_stage_seconds_count{{operation="{operation}",'
+            f'stage="{stage}"}} 1'
+        ) in output
+    assert 'euro_converter_batch_rows_sum{operation="convert_frame"} 3' in output
+
+
+def test_disabled(registry):
+    registry.enabled = False
+    with metrics.operation("convert"), metrics.stage("lookup"):
+        metrics.observe_batch(10)
+    metrics.count_ecb_response("full", 200)
+    assert " 1" not in registry.write()
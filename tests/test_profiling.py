@@ -0,0 +1,99 @@
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+import polars as pl
+
+from euro_converter import metrics, profiling
+from euro_converter.cache import RatesCache, RatesCacheData
+from euro_converter.calculator import ConversionType, CurrencyCalculator
+from tests.calculator.fixtures import RATES_ROWS, RATES_SCHEMA
+
+
+def _get_calculator() -> CurrencyCalculator:
+    cache = RatesCache()
+    cache.data = RatesCacheData(
+        rates=pl.DataFrame(RATES_ROWS, schema=RATES_SCHEMA),
+        last_update=datetime(2023, 1, 5),
+        last_timestamps={},
+    )
+    return CurrencyCalculator(cache, refresh_in_background=True)
+
+
+def test_profile_conversion():
+    calculator = _get_calculator()
+    values = [(date(2023, 1, 3), Decimal("1")), (date(2023, 1, 2), Decimal("2"))]
+    expected = calculator.convert_multiple(ConversionType.TO, "CAA", values)
+    with profiling.activate(profiling.RequestProfile("POST", "/to-CAA")) as profile:
+        result = calculator.convert_multiple(ConversionType.TO, "CAA", values)
+    assert profiling.get_profile() is None
+    assert result == expected
+    profile_dict = profile.to_dict()
+    assert profile_dict["seconds"] > 0
+    assert {
+        (stage["operation"], stage["stage"]) for stage in profile_dict["stages"]
+    } == {
+        ("convert_multiple", "read"),
+        ("convert_multiple", "write"),
+        ("convert_frame", "check_cache"),
+        ("convert_frame", "join"),
+        ("convert_frame", "calculate"),
+        ("convert_frame", "sort"),
+    }
+    (plan,) = profile_dict["query_plans"]
+    assert plan["operation"] == "convert_frame"
+    assert plan["plan"]
+    assert plan["nodes"]
+    assert profile_dict["hot_spots"]
+    server_timing = profile.get_server_timing()
+    assert "convert_frame-join;dur=" in server_timing
+    assert "total;dur=" in server_timing
+
+
+def test_profile_store():
+    store = profiling.ProfileStore(max_size=2)
+    profiles = [profiling.RequestProfile("GET", "/") for _ in range(3)]
+    for profile in profiles:
+        store.add(profile)
+    assert store.get(profiles[0].id) is None
+    assert store.get(profiles[2].id) is profiles[2]
+
+
+def test_profile_concurrent_operations():
+    calculator = _get_calculator()
+    values = [(date(2023, 1, 3), Decimal("1"))]
+    first = profiling.RequestProfile("POST", "/to-CAA")
+    second = profiling.RequestProfile("POST", "/to-CBB")
+    started = threading.Event()
+    finish = threading.Event()
+
+    def run_first():
+        with profiling.activate(first):
+            with metrics.operation("batch_request"):
+                started.set()
+                finish.wait(5)
+                calculator.convert_multiple(ConversionType.TO, "CAA", values)
+
+    thread = threading.Thread(target=run_first)
+    thread.start()
+    started.wait(5)
+    try:
+        # Only one profiler can be active in a process, so this one is not profiled.
+        with profiling.activate(second):
+            result = calculator.convert_multiple(ConversionType.TO, "CBB", values)
+    finally:
+        finish.set()
+        thread.join()
+    assert result == [(date(2023, 1, 3), Decimal("3.000000"))]
+    first_dict = first.to_dict()
+    second_dict = second.to_dict()
+    assert first_dict["hot_spots"]
+    assert profiling.PROFILER_BUSY_NOTE not in first_dict["notes"]
+    assert not second_dict["hot_spots"]
+    assert second_dict["notes"] == [profiling.PROFILER_BUSY_NOTE]
+    assert second_dict["query_plans"]
+
+    # Profiled again once the first operation has finished.
+    with profiling.activate(profiling.RequestProfile("POST", "/to-CBB")) as third:
+        calculator.convert_multiple(ConversionType.TO, "CBB", values)
+    assert third.to_dict()["hot_spots"]